@@ -0,0 +1,9 @@
+# app/__main__.py
+# `python -m app ...`: línea de comandos sin interfaz gráfica (ver app/cli.py).
+# La UI sigue arrancando con `python main.py`.
+import sys
+
+from app.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+# app/cli.py
+"""
+Línea de comandos sin interfaz gráfica (servidores sin display, jobs nocturnos).
+No importa tkinter: usa los mismos servicios que la UI y escribe JSON por stdout.
+Cada servicio se importa dentro de su comando (pandas sólo carga si se importan Excel).
+
+Uso:
+  python -m app import-inventory data/inputs/suc1.xlsx --sucursal-id 1
+  python -m app import-inventory data/inputs/semana            (carpeta: un archivo por sucursal)
+  python -m app import-sales data/ventas_2025_08.xlsx --mode upsert
+  python -m app expiries --sucursal-id 1 --estado CRITICO PROXIMO
+  python -m app expiries --no-expired --out vencimientos.csv
+  python -m app expiries --export --by-branch              (xlsx en data/outputs, una hoja por sucursal)
+  python -m app stock --sucursal-id 1 --out stock.xlsx
+  python -m app reset rebuild-sales-daily
+  python -m app reset delete-inventory 35 36 37        (deshace esas importaciones, todo o nada)
+
+Salida: un documento JSON. Código de salida 0 si todo anduvo, 1 si hubo errores.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+def _emit(data: Any) -> None:
+    json.dump(data, sys.stdout, ensure_ascii=False, indent=2, default=str)
+    sys.stdout.write("\n")
+
+
+# ---------------------------------------------------------------- comandos
+def cmd_import_inventory(args) -> int:
+    from app.services.import_service import DuplicateInventoryError, importar_carpeta, importar_excel_bulk
+
+    results: List[Dict[str, Any]] = []
+    for p in args.paths:
+        if Path(p).is_dir():
+            results += importar_carpeta(p, sucursal_nombre=args.sucursal,
+                                        responsable_nombre=args.responsable, workers=args.workers)
+            continue
+        res = {"file": p, "status": None, "inventory_id": None, "rows": 0, "error": None}
+        try:
+            res.update(importar_excel_bulk(p, sucursal_nombre=args.sucursal, sucursal_id=args.sucursal_id,
+                                           responsable_nombre=args.responsable))
+        except DuplicateInventoryError as e:
+            res.update(status="duplicado", error=str(e))
+        except Exception as e:
+            res.update(status="error", error=str(e))
+        results.append(res)
+
+    _emit(results)
+    return 1 if any(r["status"] == "error" for r in results) else 0
+
+
+def cmd_import_sales(args) -> int:
+    from app.services.sales_service import import_sales_from_excel
+
+    res = import_sales_from_excel(args.path, import_name=args.name,
+                                  allow_multi_month=args.multi_month, mode=args.mode)
+    _emit(res)
+    return 0
+
+
+def cmd_expiries(args) -> int:
+    if args.out or args.export:
+        # Exportación en streaming (no arma la lista completa)
+        from app.services import stock_service
+
+        res = stock_service.export_expiries(args.out, args.sucursal_id, args.q,
+                                            include_expired=not args.no_expired,
+                                            by_branch=args.by_branch, estados=args.estado,
+                                            limit=args.limit)
+        _emit(res)
+        return 0
+
+    from app.services import expiry_service
+
+    rows = expiry_service.get_expiries(args.sucursal_id, args.q, include_expired=not args.no_expired)
+    if args.estado:
+        estados = set(args.estado)
+        rows = [r for r in rows if r["estado"] in estados]
+    por_estado: Dict[str, int] = {}
+    for r in rows:
+        por_estado[r["estado"]] = por_estado.get(r["estado"], 0) + 1
+    if args.limit is not None:
+        rows = rows[: args.limit]
+    _emit({"rows": len(rows), "by_estado": por_estado, "items": rows})
+    return 0
+
+
+def cmd_stock(args) -> int:
+    from app.services import stock_service
+
+    _emit(stock_service.export_stock(args.out, args.sucursal_id, args.q, by_branch=args.by_branch))
+    return 0
+
+
+def cmd_reset(args) -> int:
+    from app.services import maintenance_service
+
+    op = args.op
+    if op in ("all", "inventories") and not args.yes:
+        raise ValueError(f"'reset {op}' borra datos: confirmar con --yes.")
+    if op == "all":
+        res = maintenance_service.reset_all()
+    elif op == "inventories":
+        res = maintenance_service.clear_inventories_and_stock()
+    elif op == "delete-inventory":
+        if not args.id:
+            raise ValueError("Falta el ID del inventario a eliminar.")
+        res = maintenance_service.delete_inventory(*args.id)
+    elif op == "rebuild-lot-summary":
+        res = maintenance_service.rebuild_lot_summary()
+    else:
+        res = maintenance_service.rebuild_sales_daily()
+    _emit({"status": "ok", "op": op, **res})
+    return 0
+
+
+# ------------------------------------------------------------------ parser
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="python -m app",
+                                 description="Logística de depósitos sin interfaz gráfica (salida JSON)")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("import-inventory", help="Importar inventarios (archivos o carpetas)")
+    p.add_argument("paths", nargs="+", help="Excel (resumen + vencimientos) o carpetas con Excel")
+    p.add_argument("--sucursal", help="Nombre de sucursal (carpetas: por defecto el nombre del archivo)")
+    p.add_argument("--sucursal-id", type=int, help="ID de sucursal (sólo archivos sueltos)")
+    p.add_argument("--responsable", default="Sistema")
+    p.add_argument("--workers", type=int, default=None, help="Procesos de parseo para carpetas")
+    p.set_defaults(func=cmd_import_inventory)
+
+    p = sub.add_parser("import-sales", help="Importar un Excel de ventas")
+    p.add_argument("path")
+    p.add_argument("--name", help="Nombre de la importación (por defecto la ruta)")
+    p.add_argument("--multi-month", action="store_true", help="Permitir varios meses en el archivo")
+    p.add_argument("--mode", choices=["replace", "upsert"], default="replace")
+    p.set_defaults(func=cmd_import_sales)
+
+    p = sub.add_parser("expiries", help="Listar o exportar la vista de vencimientos")
+    p.add_argument("--sucursal-id", type=int, help="Sólo esta sucursal (por defecto todas)")
+    p.add_argument("--q", help="Búsqueda por código, EAN o descripción")
+    p.add_argument("--no-expired", action="store_true", help="Excluir lotes ya vencidos")
+    p.add_argument("--estado", nargs="+", choices=["CRITICO", "PROXIMO", "OK", "SIN_FECHA"])
+    p.add_argument("--limit", type=int, help="Máximo de filas a listar/exportar")
+    p.add_argument("--out", help="Exportar a este archivo (.xlsx o .csv) en vez de listar")
+    p.add_argument("--export", action="store_true", help="Exportar a data/outputs (.xlsx)")
+    p.add_argument("--by-branch", action="store_true", help="Al exportar: una hoja/archivo por sucursal")
+    p.set_defaults(func=cmd_expiries)
+
+    p = sub.add_parser("stock", help="Exportar el stock actual")
+    p.add_argument("--sucursal-id", type=int, help="Sólo esta sucursal (por defecto todas)")
+    p.add_argument("--q", help="Búsqueda por código, EAN o descripción")
+    p.add_argument("--out", help="Archivo .xlsx o .csv (por defecto data/outputs/stock_<fecha>.xlsx)")
+    p.add_argument("--by-branch", action="store_true", help="Una hoja/archivo por sucursal")
+    p.set_defaults(func=cmd_stock)
+
+    p = sub.add_parser("reset", help="Mantenimiento (mismas operaciones que tools/dev_reset.py)")
+    p.add_argument("op", choices=["all", "inventories", "delete-inventory",
+                                  "rebuild-lot-summary", "rebuild-sales-daily"])
+    p.add_argument("id", nargs="*", type=int, help="ID(s) de inventario (delete-inventory)")
+    p.add_argument("--yes", action="store_true", help="Confirmar operaciones que borran datos")
+    p.set_defaults(func=cmd_reset)
+    return ap
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    from app.dao.connection import init_db
+
+    try:
+        init_db()
+        return args.func(args)
+    except Exception as e:
+        _emit({"status": "error", "command": args.command, "error": str(e)})
+        return 1
@@ -1,8 +1,45 @@
 # app/dao/connection.py
+import os
 import sqlite3
+import threading
+import zlib
+from contextlib import closing, contextmanager
+from functools import lru_cache
 from pathlib import Path
 
-def get_db_path() -> str:
+from app.dao import profiler
+from app.utils.normalize import search_text
+
+# Callbacks a ejecutar cuando transaction() hace rollback
+# (p.ej. caches en memoria que pudieron ver ids que ya no existen).
+_ROLLBACK_HOOKS = []
+
+def on_rollback(fn):
+    """Registra fn() para que se llame después de cada rollback de transaction()."""
+    _ROLLBACK_HOOKS.append(fn)
+    return fn
+
+# Pragmas de cada conexión nueva
+PRAGMAS = (
+    ("journal_mode", "WAL"),     # los lectores no bloquean al escritor (ni al revés)
+    ("synchronous", "NORMAL"),   # seguro con WAL; fsync sólo en los checkpoints
+    ("cache_size", -65536),      # ~64 MB de páginas en memoria (negativo = KiB)
+    ("mmap_size", 268435456),    # 256 MB de lectura por mmap
+    ("temp_store", "MEMORY"),    # tablas temporales y ordenamientos en RAM
+    ("busy_timeout", 5000),      # ms esperando un lock antes de "database is locked"
+)
+# Sentencias preparadas que guarda cada conexión (sqlite3 trae 128); DB_STATEMENT_CACHE la cambia
+DEFAULT_STATEMENT_CACHE = 256
+
+_local = threading.local()
+
+if hasattr(os, "register_at_fork"):
+    # Un proceso hijo (fork) no debe usar la conexión heredada del padre
+    os.register_at_fork(after_in_child=lambda: setattr(_local, "conn", None))
+
+@lru_cache(maxsize=1)
+def _env_file_db_path() -> str:
+    """DB_PATH de .env (o la ruta por defecto); se lee una vez por proceso."""
     base = Path(__file__).resolve().parents[2]
     env_path = base / ".env"
     if env_path.exists():
@@ -11,17 +48,253 @@ def get_db_path() -> str:
                 return line.split("=", 1)[1].strip()
     return str(base / "db" / "logistica.db")
 
-def get_conn():
-    conn = sqlite3.connect(get_db_path())
+def get_db_path() -> str:
+    # La variable de entorno DB_PATH tiene prioridad sobre .env (jobs, benchmarks)
+    if os.environ.get("DB_PATH"):
+        return os.environ["DB_PATH"]
+    return _env_file_db_path()
+
+def statement_cache_size() -> int:
+    try:
+        return int(os.environ.get("DB_STATEMENT_CACHE", DEFAULT_STATEMENT_CACHE))
+    except ValueError:
+        return DEFAULT_STATEMENT_CACHE
+
+# Callback opcional que recibe cada sentencia SQL ejecutada (diagnóstico/benchmarks)
+_TRACE = None
+
+def set_trace(fn) -> None:
+    """Instala (o quita con None) un callback de trazas; se aplica en el próximo get_conn()."""
+    global _TRACE
+    _TRACE = fn
+
+_BUMP_SQL = "UPDATE data_version SET version = version + 1 WHERE id = 1"
+
+class _Conn(sqlite3.Connection):
+    """
+    Conexión de larga vida de un hilo. Se usa como siempre (`with get_conn() as conn:`
+    confirma al salir), salvo que:
+      - con una transaction() abierta, `with` y commit() no confirman ni revierten:
+        lo hace transaction() al terminar;
+      - close() no cierra (la conexión se reusa); para cerrarla, close_conn();
+      - cada commit con escrituras incrementa data_version (ver data_version()).
+    """
+    path = None
+    trace = None
+    tx_depth = 0
+    seen_changes = 0  # total_changes al último commit/rollback
+
+    def _bump_version(self):
+        """Si hubo escrituras sin confirmar, incrementa data_version en la misma transacción."""
+        if self.total_changes != self.seen_changes:
+            self.execute(_BUMP_SQL)
+            self.seen_changes = self.total_changes
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.tx_depth:
+            return False
+        if exc_type is None:
+            self._bump_version()
+        try:
+            return super().__exit__(exc_type, exc, tb)
+        finally:
+            self.seen_changes = self.total_changes
+
+    def commit(self):
+        if not self.tx_depth:
+            self._bump_version()
+            super().commit()
+
+    def rollback(self):
+        super().rollback()
+        self.seen_changes = self.total_changes
+
+    def close(self):
+        pass
+
+class _ProfiledConn(profiler.ProfiledConnectionMixin, _Conn):
+    """_Conn que registra cada sentencia en app.dao.profiler (DB_PROFILE=1)."""
+
+def _open(path: str, factory=sqlite3.Connection):
+    conn = sqlite3.connect(path, factory=factory, cached_statements=statement_cache_size())
     conn.row_factory = sqlite3.Row
+    # La usa item_dao al llenar items_fts: búsqueda sin acentos ni mayúsculas
+    conn.create_function("search_text", 1, search_text, deterministic=True)
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+def get_conn():
+    """
+    Conexión del hilo actual: se abre (con PRAGMAS) la primera vez y después se
+    reusa. Si cambió la ruta de la base (DB_PATH) o se prendió/apagó el
+    perfilado (profiler.enable/disable) se reabre.
+    """
+    path = get_db_path()
+    factory = _ProfiledConn if profiler.enabled() else _Conn
+    conn = getattr(_local, "conn", None)
+    if conn is None or conn.path != path or type(conn) is not factory:
+        close_conn()
+        conn = _local.conn = _open(path, factory=factory)
+        conn.path = path
+        conn.seen_changes = conn.total_changes
+    if conn.trace is not _TRACE:
+        conn.set_trace_callback(_TRACE)
+        conn.trace = _TRACE
     return conn
 
+def close_conn() -> None:
+    """Cierra la conexión del hilo actual (p.ej. antes de borrar el archivo de la base)."""
+    conn = getattr(_local, "conn", None)
+    _local.conn = None
+    if conn is not None:
+        sqlite3.Connection.close(conn)
+
+@contextmanager
+def transaction():
+    """
+    Agrupa escrituras en una sola transacción sobre la conexión del hilo.
+    Commit al salir; ante cualquier error hace rollback completo y relanza.
+    Los DAO llamados adentro (con o sin conn=) escriben en la misma transacción.
+    Anidada, usa un SAVEPOINT: si la interna falla se revierte sólo lo suyo.
+    """
+    conn = get_conn()
+    depth = conn.tx_depth
+    sp = f"sp_{depth}"
+    conn.execute("BEGIN" if depth == 0 else f"SAVEPOINT {sp}")
+    conn.tx_depth = depth + 1
+    try:
+        yield conn
+    except BaseException:
+        conn.tx_depth = depth
+        if depth == 0:
+            conn.rollback()
+        else:
+            conn.execute(f"ROLLBACK TO {sp}")
+            conn.execute(f"RELEASE {sp}")
+        for fn in _ROLLBACK_HOOKS:
+            fn()
+        raise
+    conn.tx_depth = depth
+    if depth == 0:
+        conn._bump_version()
+        sqlite3.Connection.commit(conn)
+    else:
+        conn.execute(f"RELEASE {sp}")
+
+def data_version(conn=None) -> int:
+    """
+    Contador de cambios de la base: lo incrementa cada commit con escrituras
+    (de cualquier proceso que use get_conn). Sirve de clave para caches de lecturas.
+    """
+    with conn_scope(conn) as conn:
+        row = conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()
+        return row[0] if row else 0
+
+def bump_data_version(conn=None) -> None:
+    """Fuerza un cambio de versión (DDL como DROP TABLE no cuenta como escritura)."""
+    with conn_scope(conn) as conn:
+        conn.execute(_BUMP_SQL)
+
+@contextmanager
+def conn_scope(conn=None):
+    """
+    Usa la conexión del llamador (p.ej. la de transaction()) si viene;
+    si no, la del hilo con el comportamiento de siempre (commit al salir).
+    """
+    if conn is not None:
+        yield conn
+        return
+    with get_conn() as own:
+        yield own
+
+def _table_columns(conn, table: str) -> set:
+    return {r[1] for r in conn.execute(f"PRAGMA table_xinfo({table})")}
+
+def _migrate_stock_keys(conn):
+    """
+    Bases viejas: agrega lote_key/venc_key a stock y consolida los duplicados
+    que el UNIQUE original dejaba pasar con lote/fecha NULL (antes del índice único).
+    """
+    cols = _table_columns(conn, "stock")
+    if not cols or "lote_key" in cols:
+        return
+    conn.execute("ALTER TABLE stock ADD COLUMN lote_key TEXT GENERATED ALWAYS AS (IFNULL(lote, '')) VIRTUAL")
+    conn.execute("ALTER TABLE stock ADD COLUMN venc_key TEXT GENERATED ALWAYS AS (IFNULL(fecha_venc, '')) VIRTUAL")
+    conn.execute(
+        """
+        UPDATE stock
+           SET cantidad = (SELECT SUM(s2.cantidad) FROM stock s2
+                            WHERE s2.item_id = stock.item_id AND s2.location_id = stock.location_id
+                              AND s2.lote_key = stock.lote_key AND s2.venc_key = stock.venc_key)
+         WHERE id IN (SELECT MIN(id) FROM stock
+                       GROUP BY item_id, location_id, lote_key, venc_key HAVING COUNT(*) > 1)
+        """
+    )
+    conn.execute(
+        """
+        DELETE FROM stock
+         WHERE id NOT IN (SELECT MIN(id) FROM stock
+                           GROUP BY item_id, location_id, lote_key, venc_key)
+        """
+    )
+
+def _migrate_orden_venc(conn):
+    """
+    Índices de orden de vencimientos con la expresión anterior (IFNULL, que ponía
+    las fechas '' primero): se borran y el schema los vuelve a crear.
+    """
+    for name, sql in conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+        "AND name IN ('idx_stock_orden_venc', 'idx_stock_loc_orden_venc')"
+    ).fetchall():
+        if "NULLIF" not in (sql or ""):
+            conn.execute(f"DROP INDEX {name}")
+
+def _migrate(conn):
+    """Ajustes de esquema que CREATE ... IF NOT EXISTS no cubre (bases ya creadas)."""
+    _migrate_stock_keys(conn)
+    _migrate_orden_venc(conn)
+
+SCHEMA_PATH = Path(__file__).resolve().parents[2] / "db" / "schema.sql"
+
+@lru_cache(maxsize=1)
+def schema_version() -> int:
+    """
+    Versión del schema = crc32 de db/schema.sql (cambia sola al editar el archivo).
+    init_db la guarda en PRAGMA user_version.
+    """
+    return (zlib.crc32(SCHEMA_PATH.read_bytes()) & 0x7FFFFFFF) or 1
+
 def init_db():
-    base = Path(__file__).resolve().parents[2]
-    schema_path = base / "db" / "schema.sql"
+    """
+    Crea/actualiza el schema, arma las tablas derivadas faltantes y siembra los
+    maestros mínimos. Si PRAGMA user_version ya coincide con schema_version()
+    no hace nada (arranque rápido): la base ya pasó por acá con este schema.
+    """
+    version = schema_version()
+    if get_conn().execute("PRAGMA user_version").fetchone()[0] == version:
+        return
+
+    # Conexión aparte: el PRAGMA foreign_keys del schema no debe quedar en la del hilo
+    with closing(_open(get_db_path())) as conn:
+        _migrate(conn)
+        had_lot_summary = bool(_table_columns(conn, "lot_summary"))
+        had_items_fts = bool(_table_columns(conn, "items_fts"))
+        had_sales_daily = bool(_table_columns(conn, "sales_daily"))
+        conn.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
+        conn.commit()
 
-    with get_conn() as conn, open(schema_path, "r", encoding="utf-8") as f:
-        conn.executescript(f.read())
+    # Tablas derivadas que la base todavía no tenía: se arman una vez desde los datos
+    if not had_lot_summary:
+        from .stock_dao import rebuild_lot_summary
+        rebuild_lot_summary()
+    if not had_items_fts:
+        from .item_dao import rebuild_search_index
+        rebuild_search_index()
+    if not had_sales_daily:
+        from .sales_dao import rebuild_daily
+        rebuild_daily()
 
     with get_conn() as conn:
         cur = conn.cursor()
@@ -39,3 +312,5 @@ def init_db():
                 ("Sistema", ""),
             )
         conn.commit()
+        # Recién con todo aplicado: el próximo arranque saltea init_db
+        conn.execute(f"PRAGMA user_version = {version}")
@@ -1,6 +1,7 @@
 # app/dao/inventory_dao.py
 from __future__ import annotations
-from .connection import get_conn
+from typing import Dict, Iterable, List, Tuple
+from .connection import get_conn, conn_scope
 
 
 def insert_inventory(
@@ -13,8 +14,9 @@ def insert_inventory(
     sucursal_id: int,
     responsable_id: int,
     archivo_hash: str,
+    conn=None,
 ) -> int:
-    with get_conn() as conn:
+    with conn_scope(conn) as conn:
         cur = conn.cursor()
         cur.execute(
             """
@@ -38,8 +40,8 @@ def insert_inventory(
         return cur.lastrowid
 
 
-def find_duplicate(nombre: str, fecha_creacion, fecha_exportacion):
-    with get_conn() as conn:
+def find_duplicate(nombre: str, fecha_creacion, fecha_exportacion, conn=None):
+    with conn_scope(conn) as conn:
         cur = conn.cursor()
         cur.execute(
             """
@@ -51,29 +53,27 @@ def find_duplicate(nombre: str, fecha_creacion, fecha_exportacion):
         return cur.fetchone()
 
 
-def insert_inventory_row(
+def bulk_insert_rows(
     inventory_id: int,
-    item_id: int,
-    upb: float,
-    bultos: float,
-    cantidad: float,
-    cantidad_total: float,
-    fecha_venc,
-    fecha_ingreso,
-) -> int:
-    with get_conn() as conn:
+    rows: Iterable[Tuple[int, float, float, float, float, object, object]],
+    conn=None,
+) -> None:
+    """
+    rows: iterable de (item_id, upb, bultos, cantidad, cantidad_total, fecha_venc, fecha_ingreso)
+    Un solo executemany (pensado para correr dentro de transaction()).
+    """
+    with conn_scope(conn) as conn:
         cur = conn.cursor()
-        cur.execute(
+        cur.executemany(
             """
             INSERT INTO inventory_rows
             (inventory_id, item_id, unidades_por_bulto, bultos, cantidad, cantidad_total,
              fecha_vencimiento, fecha_ingreso)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """,
-            (inventory_id, item_id, upb, bultos, cantidad,
-             cantidad_total, fecha_venc, fecha_ingreso),
+            ((inventory_id, item, upb, bultos, cant, total, fv, fi)
+             for (item, upb, bultos, cant, total, fv, fi) in rows),
         )
-        return cur.lastrowid
 
 
 def list_recent_inventories(limit: int = 20):
@@ -95,3 +95,31 @@ def list_recent_inventories(limit: int = 20):
             (limit,),
         )
         return cur.fetchall()
+
+
+def _in_list(ids: List[int]) -> str:
+    return ",".join("?" * len(ids))
+
+
+def inventory_locations(inv_ids: Iterable[int], conn=None) -> Dict[int, int]:
+    """{inventory_id: sucursal_id} de los inventarios que existen entre inv_ids."""
+    ids = list(inv_ids)
+    if not ids:
+        return {}
+    with conn_scope(conn) as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT id, sucursal_id FROM inventories WHERE id IN ({_in_list(ids)})", ids)
+        return {r[0]: r[1] for r in cur.fetchall()}
+
+
+def delete_inventories(inv_ids: Iterable[int], conn=None) -> int:
+    """Borra las filas y la cabecera de esos inventarios. Devuelve cuántas filas borró."""
+    ids = list(inv_ids)
+    if not ids:
+        return 0
+    with conn_scope(conn) as conn:
+        cur = conn.cursor()
+        cur.execute(f"DELETE FROM inventory_rows WHERE inventory_id IN ({_in_list(ids)})", ids)
+        n = cur.rowcount
+        cur.execute(f"DELETE FROM inventories WHERE id IN ({_in_list(ids)})", ids)
+        return n
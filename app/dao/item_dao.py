@@ -1,33 +1,213 @@
 # app/dao/item_dao.py
 from __future__ import annotations
-from .connection import get_conn
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+from app.utils.normalize import search_text
+from .connection import conn_scope, on_rollback
 
 
-def get_or_create(codigo: str | None, descripcion: str, ean: str | None) -> int:
+def get_or_create(codigo: str | None, descripcion: str, ean: str | None, conn=None) -> int:
     """
     Busca un item por (codigo, ean). Si no existe, lo inserta.
     Retorna el id del item.
     - codigo y ean se normalizan a string sin espacios; si vienen vacíos → None.
     - descripcion siempre se guarda aunque esté duplicada; lo importante es la clave.
+    Es resolve_many de una sola clave: un único camino de alta de items.
     """
-    codigo = (str(codigo).strip() if codigo not in (None, "", "nan") else None)
-    ean = (str(ean).strip() if ean not in (None, "", "nan") else None)
+    return resolve_many([(codigo, ean, descripcion)], conn=conn)[0]
 
-    with get_conn() as conn:
+
+# ---------------------------------------------------------------------------
+# Resolución masiva: (codigo, ean) -> item_id para una columna completa
+# ---------------------------------------------------------------------------
+
+CACHE_MAX = 200_000
+# Compartida por todos los hilos (cada uno con su conexión): todo acceso con _lock.
+_lock = threading.Lock()
+_ID_CACHE: "OrderedDict[tuple, int]" = OrderedDict()
+_cache_tag = None  # (ruta de la base, items_epoch) de los ids cacheados
+
+
+def _norm_key(v) -> str | None:
+    return str(v).strip() if v not in (None, "", "nan") else None
+
+
+def clear_cache() -> None:
+    """Vacía la cache de claves conocidas (tras un rollback o un reset de la base)."""
+    global _cache_tag
+    with _lock:
+        _ID_CACHE.clear()
+        _cache_tag = None
+
+
+on_rollback(clear_cache)
+
+
+def _cache_tag_of(cur) -> tuple:
+    """
+    Clave de validez de los ids cacheados: archivo de la base + items_epoch.
+    La época cambia si se borran items o se recrea la tabla, también desde otro proceso.
+    """
+    path = next(r[2] for r in cur.execute("PRAGMA database_list") if r[1] == "main")
+    epoch = cur.execute("SELECT epoch FROM items_epoch WHERE id = 1").fetchone()
+    return (path, epoch[0] if epoch else None)
+
+
+def _cache_put_locked(key: tuple, item_id: int) -> None:
+    _ID_CACHE[key] = item_id
+    _ID_CACHE.move_to_end(key)
+    while len(_ID_CACHE) > CACHE_MAX:
+        _ID_CACHE.popitem(last=False)
+
+
+def _index_items(cur, first_id: int, last_id: int) -> None:
+    """Agrega a items_fts los items con id en [first_id, last_id] (recién creados)."""
+    cur.execute(
+        """
+        INSERT INTO items_fts(rowid, codigo, ean, descripcion)
+        SELECT id, search_text(codigo), search_text(ean), search_text(descripcion)
+          FROM items
+         WHERE id BETWEEN ? AND ?
+        """,
+        (first_id, last_id),
+    )
+
+
+def resolve_many(
+    keys: Iterable[Tuple[str | None, str | None, str | None]],
+    conn=None,
+) -> List[int]:
+    """
+    keys: iterable de (codigo, ean, descripcion), uno por fila.
+    Devuelve la lista de item_id en el mismo orden (mismas reglas que get_or_create).
+    - Las claves ya vistas en la sesión salen de una cache LRU en memoria, válida
+      mientras no cambien la base ni items_epoch (borrado o reset de items).
+    - El resto se carga en una tabla temporal; los items faltantes se insertan
+      con un solo INSERT ... SELECT y los ids se leen con un solo JOIN.
+    """
+    global _cache_tag
+    norm = [(_norm_key(c), _norm_key(e), d) for (c, e, d) in keys]
+
+    with conn_scope(conn) as conn:
         cur = conn.cursor()
+        tag = _cache_tag_of(cur)
 
-        # Buscar
-        cur.execute(
-            "SELECT id FROM items WHERE codigo IS ? AND ean IS ?",
-            (codigo, ean),
+        found: Dict[tuple, int] = {}
+        missing: Dict[tuple, str | None] = {}
+        with _lock:
+            if _cache_tag != tag:
+                # Otra base, o items borrados/recreados: los ids cacheados no sirven
+                _ID_CACHE.clear()
+                _cache_tag = tag
+            for c, e, d in norm:
+                k = (c, e)
+                if k in found or k in missing:
+                    continue
+                item_id = _ID_CACHE.get(k)
+                if item_id is not None:
+                    _ID_CACHE.move_to_end(k)
+                    found[k] = item_id
+                else:
+                    missing[k] = d
+
+        if missing:
+            cur.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS _item_keys "
+                "(codigo TEXT, ean TEXT, descripcion TEXT)"
+            )
+            cur.execute("DELETE FROM _item_keys")
+            cur.executemany(
+                "INSERT INTO _item_keys (codigo, ean, descripcion) VALUES (?, ?, ?)",
+                ((c, e, d) for (c, e), d in missing.items()),
+            )
+            cur.execute(
+                """
+                INSERT INTO items (codigo, descripcion, ean)
+                SELECT k.codigo, k.descripcion, k.ean
+                  FROM _item_keys k
+                 WHERE NOT EXISTS (
+                        SELECT 1 FROM items i
+                         WHERE i.codigo IS k.codigo AND i.ean IS k.ean)
+                """
+            )
+            if cur.rowcount > 0:
+                # Un solo INSERT: los ids nuevos son los rowcount últimos
+                _index_items(cur, cur.lastrowid - cur.rowcount + 1, cur.lastrowid)
+            cur.execute(
+                """
+                SELECT k.codigo, k.ean, MIN(i.id)
+                  FROM _item_keys k
+                  JOIN items i ON i.codigo IS k.codigo AND i.ean IS k.ean
+                 GROUP BY k.codigo, k.ean
+                """
+            )
+            rows = cur.fetchall()
+            with _lock:
+                for c, e, item_id in rows:
+                    found[(c, e)] = item_id
+                    if _cache_tag == tag:
+                        _cache_put_locked((c, e), item_id)
+            cur.execute("DELETE FROM _item_keys")
+
+    return [found[(c, e)] for c, e, _ in norm]
+
+
+# ---------------------------------------------------------------------------
+# Búsqueda de texto (items_fts, trigram sin acentos)
+# ---------------------------------------------------------------------------
+
+SEARCH_MIN_CHARS = 3  # trigram: con menos caracteres no hay trigramas que buscar
+
+
+def search_filter(q: str) -> Tuple[str, list]:
+    """
+    (sql, params) de un SELECT rowid FROM items_fts con los items que contienen q
+    en codigo, ean o descripcion, sin distinguir acentos ni mayúsculas.
+    - q con 3+ caracteres: MATCH por frase (índice trigram).
+    - q más corto: LIKE sobre el texto normalizado del índice.
+    Pensado para usarse como subconsulta (item_id IN (...)).
+    """
+    t = search_text(q.strip())
+    if len(t) >= SEARCH_MIN_CHARS:
+        return (
+            "SELECT rowid FROM items_fts WHERE items_fts MATCH ?",
+            ['"' + t.replace('"', '""') + '"'],
         )
-        row = cur.fetchone()
-        if row:
-            return row["id"] if isinstance(row, dict) else row[0]
+    like = f"%{t}%"
+    return (
+        "SELECT rowid FROM items_fts WHERE codigo LIKE ? OR ean LIKE ? OR descripcion LIKE ?",
+        [like, like, like],
+    )
+
 
-        # Crear
+def search_item_ids(q: str, limit: int | None = None, conn=None) -> List[int]:
+    """
+    Ids de los items que coinciden con q, de más a menos relevante (bm25).
+    Con menos de 3 caracteres no hay ranking: salen por id.
+    """
+    sql, params = search_filter(q)
+    ranked = len(search_text(q.strip())) >= SEARCH_MIN_CHARS
+    sql += " ORDER BY rank" if ranked else " ORDER BY rowid"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    with conn_scope(conn) as conn:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        return [r[0] for r in cur.fetchall()]
+
+
+def rebuild_search_index(conn=None) -> int:
+    """Regenera items_fts desde items (bases previas al índice o reparaciones)."""
+    with conn_scope(conn) as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM items_fts")
         cur.execute(
-            "INSERT INTO items (codigo, descripcion, ean) VALUES (?, ?, ?)",
-            (codigo, descripcion, ean),
+            """
+            INSERT INTO items_fts(rowid, codigo, ean, descripcion)
+            SELECT id, search_text(codigo), search_text(ean), search_text(descripcion)
+              FROM items
+            """
         )
-        return cur.lastrowid
+        return cur.rowcount
@@ -1,9 +1,9 @@
 # app/dao/location_dao.py 
 from __future__ import annotations
-from .connection import get_conn
+from .connection import get_conn, conn_scope
 
-def ensure_location(nombre: str, tipo: str = "sucursal") -> int:
-    with get_conn() as conn:
+def ensure_location(nombre: str, tipo: str = "sucursal", conn=None) -> int:
+    with conn_scope(conn) as conn:
         cur = conn.cursor()
         cur.execute(
             "INSERT OR IGNORE INTO locations(nombre, tipo) VALUES(?, ?)", (nombre, tipo))
@@ -24,6 +24,18 @@ def create_with_id(loc_id: int, nombre: str, tipo: str = "sucursal") -> int:
         )
         return loc_id
 
+def ensure_ids(loc_ids, tipo: str = "sucursal", conn=None) -> None:
+    """
+    create_with_id para muchas sucursales de una vez ("Suc <id>" como nombre).
+    No pisa las que ya existen.
+    """
+    with conn_scope(conn) as conn:
+        cur = conn.cursor()
+        cur.executemany(
+            "INSERT OR IGNORE INTO locations(id, nombre, tipo) VALUES(?, ?, ?)",
+            ((int(i), f"Suc {int(i)}", tipo) for i in loc_ids)
+        )
+
 def get_by_id(loc_id: int):
     with get_conn() as conn:
         cur = conn.cursor()
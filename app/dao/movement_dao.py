@@ -1,28 +1,59 @@
 # app/dao/movement_dao.py
 from __future__ import annotations
-from .connection import get_conn
+from typing import Iterable, List, Optional, Tuple
+from .connection import conn_scope
 
 
-def insert_movement(
-    tipo: str,
-    item_id: int,
-    location_id: int,
-    delta: float,
-    lote: str | None,
-    fecha_venc: str | None,
-    origen: str,
-) -> int:
+def bulk_insert_movements(
+    rows: Iterable[Tuple[str, int, int, float, Optional[str], Optional[str], str]],
+    conn=None,
+) -> None:
     """
-    Inserta un movimiento (import, ajuste, recepción).
-    Guarda delta (positivo o negativo), ligado a item + sucursal.
+    rows: iterable de (tipo, item_id, location_id, delta, lote, fecha_venc, origen)
+    Un solo executemany (pensado para correr dentro de transaction()).
     """
-    with get_conn() as conn:
+    with conn_scope(conn) as conn:
         cur = conn.cursor()
-        cur.execute(
+        cur.executemany(
             """
             INSERT INTO movements (tipo, item_id, location_id, delta, lote, fecha_venc, origen)
             VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
-            (tipo, item_id, location_id, delta, lote, fecha_venc, origen),
+            rows,
         )
-        return cur.lastrowid
+
+
+def insert_inventory_reversals(inv_ids: Iterable[int], conn=None) -> int:
+    """
+    Un movimiento 'reversa' (delta negativo, origen 'reversa:<id>') por cada fila
+    de esos inventarios, con un solo INSERT ... SELECT. Devuelve cuántos insertó.
+    """
+    ids = list(inv_ids)
+    if not ids:
+        return 0
+    with conn_scope(conn) as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"""
+            INSERT INTO movements (tipo, item_id, location_id, delta, lote, fecha_venc, origen)
+            SELECT 'reversa', ir.item_id, inv.sucursal_id, -COALESCE(ir.cantidad_total, 0),
+                   NULL, ir.fecha_vencimiento, 'reversa:' || ir.inventory_id
+              FROM inventory_rows ir
+              JOIN inventories inv ON inv.id = ir.inventory_id
+             WHERE ir.inventory_id IN ({",".join("?" * len(ids))})
+             ORDER BY ir.inventory_id, ir.id
+            """,
+            ids,
+        )
+        return cur.rowcount
+
+
+def delete_by_origen(origenes: Iterable[str], conn=None) -> int:
+    """Borra los movimientos de esos orígenes (p.ej. 'import:35'). Devuelve cuántos borró."""
+    vals: List[str] = list(origenes)
+    if not vals:
+        return 0
+    with conn_scope(conn) as conn:
+        cur = conn.cursor()
+        cur.execute(f"DELETE FROM movements WHERE origen IN ({','.join('?' * len(vals))})", vals)
+        return cur.rowcount
@@ -0,0 +1,297 @@
+# app/dao/profiler.py
+"""
+Perfilado opcional de las consultas SQL de la app (apagado por defecto).
+- Se activa con DB_PROFILE=1 (o profiler.enable()); get_conn abre entonces una
+  conexión instrumentada. Apagado no cuesta nada: la conexión es la de siempre.
+- Por sentencia normalizada (espacios colapsados, listas IN (?, ?, ...) unidas)
+  acumula llamadas, tiempo total/promedio/p95, filas devueltas y qué función
+  la ejecutó. El tiempo incluye los fetch (SQLite resuelve la consulta a medida
+  que se leen las filas).
+- Con DB_PROFILE_SLOW_MS guarda el EXPLAIN QUERY PLAN de las sentencias que
+  superan ese tiempo (una vez por sentencia), medido igual que en el reporte:
+  execute + fetch.
+- Al salir del proceso vuelca todo a DB_PROFILE_OUT (por defecto
+  db/query_profile.json); tools/query_report.py lo muestra.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SAMPLES = 1000  # duraciones que se guardan por sentencia para el p95
+DEFAULT_OUT = Path(__file__).resolve().parents[2] / "db" / "query_profile.json"
+
+_lock = threading.Lock()
+_STATS: Dict[str, "_Stat"] = {}
+_enabled = os.environ.get("DB_PROFILE", "").strip().lower() in ("1", "true", "yes", "on")
+_atexit_registered = False
+
+
+def _env_float(name: str) -> Optional[float]:
+    try:
+        return float(os.environ[name])
+    except (KeyError, ValueError):
+        return None
+
+
+_slow_ms = _env_float("DB_PROFILE_SLOW_MS")
+_out = os.environ.get("DB_PROFILE_OUT") or str(DEFAULT_OUT)
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(slow_ms: Optional[float] = None, out: Optional[str] = None) -> None:
+    """Activa el perfilado para las conexiones que se abran de acá en más."""
+    global _enabled, _slow_ms, _out
+    _enabled = True
+    if slow_ms is not None:
+        _slow_ms = slow_ms
+    if out is not None:
+        _out = out
+    _register_dump()
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def reset() -> None:
+    with _lock:
+        _STATS.clear()
+
+
+# ---------------------------------------------------------------- registro
+_WS = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_VALUES_LIST = re.compile(r"(\(\?\.\.\.\))(?:\s*,\s*\(\?\.\.\.\))+")
+
+
+def normalize(sql: str) -> str:
+    """Texto de la sentencia sin espacios de más y con las listas de ? colapsadas."""
+    s = _WS.sub(" ", sql).strip()
+    s = _IN_LIST.sub("?...", s)
+    return _VALUES_LIST.sub(r"\1...", s)
+
+
+class _Stat:
+    __slots__ = ("calls", "seconds", "rows", "samples", "callers", "plan")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=SAMPLES)  # [segundos] de cada llamada (mutable por los fetch)
+        self.callers = Counter()
+        self.plan = None
+
+
+# Archivos que no cuentan como "quién llamó" (la propia capa de conexión)
+_SKIP_FILES = {os.path.normcase(__file__), os.path.normcase(os.path.join(os.path.dirname(__file__), "connection.py"))}
+
+
+def _caller() -> str:
+    f = sys._getframe(2)
+    while f is not None:
+        fn = os.path.normcase(f.f_code.co_filename)
+        if fn not in _SKIP_FILES and "contextlib" not in fn:
+            mod = f.f_globals.get("__name__", "?").rsplit(".", 1)[-1]
+            return f"{mod}.{f.f_code.co_name}"
+        f = f.f_back
+    return "?"
+
+
+def _start(sql: str, many: bool = False):
+    """Alta de una llamada; devuelve (stat, muestra) para ir sumando tiempo y filas."""
+    key = normalize(sql) + (" [executemany]" if many else "")
+    caller = _caller()
+    with _lock:
+        st = _STATS.get(key)
+        if st is None:
+            st = _STATS[key] = _Stat()
+        st.calls += 1
+        st.callers[caller] += 1
+        sample = [0.0]
+        st.samples.append(sample)
+    return st, sample
+
+
+def _add(call, secs: float, rows: int = 0) -> None:
+    st, sample = call
+    with _lock:
+        st.seconds += secs
+        st.rows += rows
+        sample[0] += secs
+
+
+def _maybe_explain(conn, call, sql: str, params) -> None:
+    st, sample = call
+    if _slow_ms is None or st.plan is not None or sample[0] * 1000 < _slow_ms:
+        return
+    head = sql.lstrip()[:10].upper()
+    if not head.startswith(("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")):
+        return
+    try:
+        cur = sqlite3.Cursor(conn)
+        plan = [r[-1] for r in cur.execute("EXPLAIN QUERY PLAN " + sql, params)]
+    except sqlite3.Error as e:
+        plan = [f"(sin plan: {e})"]
+    with _lock:
+        st.plan = plan
+
+
+# ------------------------------------------------------------ instrumentación
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor que mide execute y los fetch posteriores de cada sentencia."""
+
+    _call = None
+    _stmt = None  # (sql, params) de la sentencia en curso, para el EXPLAIN
+
+    def _fetched(self, t0: float, rows: int, done: bool) -> None:
+        """
+        Suma un fetch a la llamada en curso. El EXPLAIN se decide con el total
+        acumulado (execute + fetch), el mismo que muestra el reporte: en una
+        sentencia con ORDER BY o un scan grande casi todo el tiempo está acá.
+        """
+        if self._call is None:
+            return
+        _add(self._call, time.perf_counter() - t0, rows)
+        if self._stmt is not None:
+            _maybe_explain(self.connection, self._call, *self._stmt)
+            if done:
+                self._stmt = None
+
+    def execute(self, sql, params=()):
+        self._call = _start(sql)
+        self._stmt = (sql, params)
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self._fetched(t0, 0, self.description is None)
+
+    def executemany(self, sql, seq):
+        self._call = _start(sql, many=True)
+        self._stmt = None
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, seq)
+        finally:
+            _add(self._call, time.perf_counter() - t0)
+
+    def executescript(self, script):
+        self._call = _start(script)
+        self._stmt = None
+        t0 = time.perf_counter()
+        try:
+            return super().executescript(script)
+        finally:
+            _add(self._call, time.perf_counter() - t0)
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(t0, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        t0 = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(t0, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(t0, len(rows), True)
+        return rows
+
+    def __next__(self):
+        t0 = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(t0, 0, True)
+            raise
+        self._fetched(t0, 1, False)
+        return row
+
+
+class ProfiledConnectionMixin:
+    """Para una subclase de sqlite3.Connection: todo pasa por ProfiledCursor."""
+
+    profiled = True
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq):
+        return self.cursor().executemany(sql, seq)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+
+# ------------------------------------------------------------------ salida
+def _p95(samples) -> float:
+    vals = sorted(s[0] for s in samples)
+    if not vals:
+        return 0.0
+    return vals[min(len(vals) - 1, int(round(0.95 * (len(vals) - 1))))]
+
+
+def snapshot() -> List[dict]:
+    """Estadísticas por sentencia, ordenadas por tiempo total (mayor primero)."""
+    with _lock:
+        items = list(_STATS.items())
+        out = [{
+            "sql": sql,
+            "calls": st.calls,
+            "total_ms": round(st.seconds * 1000, 3),
+            "avg_ms": round(st.seconds * 1000 / st.calls, 4) if st.calls else 0.0,
+            "p95_ms": round(_p95(st.samples) * 1000, 4),
+            "rows": st.rows,
+            "callers": dict(st.callers.most_common()),
+            "plan": st.plan,
+        } for sql, st in items]
+    out.sort(key=lambda r: r["total_ms"], reverse=True)
+    return out
+
+
+def dump(path: Optional[str] = None) -> Optional[str]:
+    """Vuelca snapshot() a JSON (si hubo consultas). Devuelve la ruta escrita."""
+    stats = snapshot()
+    if not stats:
+        return None
+    path = Path(path or _out)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"pid": os.getpid(), "when": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "slow_ms": _slow_ms, "statements": stats}
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    return str(path)
+
+
+def _register_dump() -> None:
+    global _atexit_registered
+    if not _atexit_registered:
+        atexit.register(dump)
+        _atexit_registered = True
+
+
+if _enabled:
+    _register_dump()
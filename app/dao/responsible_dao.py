@@ -1,14 +1,14 @@
 # app/dao/responsible_dao.py
 from __future__ import annotations
-from .connection import get_conn
+from .connection import get_conn, conn_scope
 
 
-def ensure_responsible(nombre: str, contacto: str = "") -> int:
+def ensure_responsible(nombre: str, contacto: str = "", conn=None) -> int:
     """
     Se asegura de que el responsable exista.
     Si no existe, lo crea. Devuelve el id.
     """
-    with get_conn() as conn:
+    with conn_scope(conn) as conn:
         cur = conn.cursor()
         cur.execute(
             "INSERT OR IGNORE INTO responsibles(nombre, contacto) VALUES(?, ?)",
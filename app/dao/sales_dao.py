@@ -1,12 +1,12 @@
 # app/dao/sales_dao.py
 from __future__ import annotations
 from datetime import date
-from typing import Iterable, Optional, Tuple
-from .connection import get_conn
+from typing import Dict, Iterable, List, Optional, Tuple
+from .connection import get_conn, conn_scope
 from app.dao import item_dao
 
-def create_sales_import(nombre: str, archivo_hash: str) -> Optional[int]:
-    with get_conn() as con:
+def create_sales_import(nombre: str, archivo_hash: str, conn=None) -> Optional[int]:
+    with conn_scope(conn) as con:
         cur = con.cursor()
         try:
             cur.execute(
@@ -17,11 +17,7 @@ def create_sales_import(nombre: str, archivo_hash: str) -> Optional[int]:
         except Exception:
             return None  # hash duplicado
 
-def delete_month(year: int, month: int, location_ids: Optional[Iterable[int]] = None):
-    """
-    Borra ventas del rango [primer día del mes, último día del mes] (inclusive).
-    Si location_ids es None, borra para todas las sucursales.
-    """
+def _month_where(year: int, month: int, location_ids: Optional[Iterable[int]] = None):
     from calendar import monthrange
     d1 = date(year, month, 1)
     d2 = date(year, month, monthrange(year, month)[1])
@@ -31,36 +27,179 @@ def delete_month(year: int, month: int, location_ids: Optional[Iterable[int]] =
         ids = tuple(int(x) for x in location_ids)
         where += f" AND location_id IN ({','.join('?'*len(ids))})"
         params.extend(ids)
-    with get_conn() as con:
+    return where, params
+
+def delete_month(year: int, month: int, location_ids: Optional[Iterable[int]] = None, conn=None):
+    """
+    Borra ventas del rango [primer día del mes, último día del mes] (inclusive).
+    Si location_ids es None, borra para todas las sucursales.
+    También borra las huellas por día de ese rango.
+    """
+    where, params = _month_where(year, month, location_ids)
+    with conn_scope(conn) as con:
         cur = con.cursor()
         cur.execute(f"DELETE FROM sales WHERE {where}", params)
+        cur.execute(f"DELETE FROM sales_day_digests WHERE {where}", params)
+
+def month_days(year: int, month: int, location_ids: Optional[Iterable[int]] = None, conn=None) -> Dict[Tuple[int, str], Optional[str]]:
+    """
+    Días con ventas grabadas en el mes: {(location_id, fecha_iso): digest}.
+    digest es None para días cargados antes de que existieran las huellas.
+    """
+    where, params = _month_where(year, month, location_ids)
+    with conn_scope(conn) as con:
+        cur = con.cursor()
+        cur.execute(
+            f"""
+            SELECT d.location_id, d.fecha, g.digest
+              FROM (SELECT DISTINCT location_id, fecha FROM sales WHERE {where}) d
+              LEFT JOIN sales_day_digests g
+                ON g.location_id = d.location_id AND g.fecha = d.fecha
+            """,
+            params,
+        )
+        return {(loc, fecha): dig for loc, fecha, dig in cur.fetchall()}
+
+def delete_days(days: Iterable[Tuple[int, str]], conn=None):
+    """Borra las ventas (y la huella) de cada (location_id, fecha_iso)."""
+    days = list(days)
+    with conn_scope(conn) as con:
+        cur = con.cursor()
+        cur.executemany("DELETE FROM sales WHERE location_id=? AND fecha=?", days)
+        cur.executemany("DELETE FROM sales_day_digests WHERE location_id=? AND fecha=?", days)
 
-def resolve_item_id(codigo: str, ean: Optional[str] = None) -> int:
-    return item_dao.get_or_create(codigo or None, "", ean or None)
+def save_day_digests(rows: Iterable[Tuple[int, str, str, int]], conn=None):
+    """rows: iterable de (location_id, fecha_iso, digest, filas)."""
+    with conn_scope(conn) as con:
+        cur = con.cursor()
+        cur.executemany(
+            "INSERT OR REPLACE INTO sales_day_digests (location_id, fecha, digest, filas) VALUES (?, ?, ?, ?)",
+            rows
+        )
 
-def bulk_insert_rows(import_id: int, rows: Iterable[Tuple[int,int,str,float]]):
+def resolve_item_ids(codigos: Iterable[str], conn=None) -> List[int]:
+    """Item de cada código (sin EAN), en una sola pasada contra items (item_dao.resolve_many)."""
+    return item_dao.resolve_many(((c or None, None, "") for c in codigos), conn=conn)
+
+def bulk_insert_rows(import_id: int, rows: Iterable[Tuple[int,int,str,float]], conn=None):
     """
     rows: iterable de (location_id, item_id, fecha_iso, cantidad)
     """
-    with get_conn() as con:
+    with conn_scope(conn) as con:
         cur = con.cursor()
         cur.executemany(
             "INSERT INTO sales (import_id, location_id, item_id, fecha, cantidad) VALUES (?, ?, ?, ?, ?)",
             ((import_id, loc, item, fecha, cant) for (loc, item, fecha, cant) in rows)
         )
 
+# Acumulado de (sucursal, item) al último día con ventas <= / < una fecha.
+_ACUM_HASTA = """
+    SELECT acumulado FROM sales_daily
+     WHERE location_id=? AND item_id=? AND fecha <= ?
+     ORDER BY fecha DESC LIMIT 1
+"""
+_ACUM_ANTES = """
+    SELECT acumulado FROM sales_daily
+     WHERE location_id=? AND item_id=? AND fecha < ?
+     ORDER BY fecha DESC LIMIT 1
+"""
+
+def _recompute_running(cur, start_iso: str, loc_where: str = "", loc_params=()):
+    """
+    Recalcula acumulado desde start_iso en adelante: el acumulado del último día
+    anterior (que no cambia) más la suma corrida de los días siguientes.
+    """
+    cur.execute(
+        f"""
+        UPDATE sales_daily AS d
+           SET acumulado = x.acumulado
+          FROM (
+            SELECT s.location_id, s.item_id, s.fecha,
+                   COALESCE((SELECT p.acumulado FROM sales_daily p
+                              WHERE p.location_id = s.location_id AND p.item_id = s.item_id
+                                AND p.fecha < ?
+                              ORDER BY p.fecha DESC LIMIT 1), 0)
+                   + SUM(s.cantidad) OVER (PARTITION BY s.location_id, s.item_id
+                                           ORDER BY s.fecha) AS acumulado
+              FROM sales_daily s
+             WHERE s.fecha >= ? {loc_where}
+          ) x
+         WHERE d.location_id = x.location_id AND d.item_id = x.item_id AND d.fecha = x.fecha
+        """,
+        (start_iso, start_iso, *loc_params),
+    )
+
+def refresh_daily(months: Iterable[Tuple[int, int]], location_ids: Optional[Iterable[int]] = None, conn=None):
+    """
+    Rehace sales_daily para los meses (y sucursales) tocados por una importación,
+    con la misma semántica que delete_month: se borran y se vuelven a agregar
+    desde sales los días de esos meses. Los acumulados se recalculan desde el
+    primer mes tocado (los meses posteriores corren con la diferencia).
+    """
+    months = sorted(set(months))
+    if not months:
+        return
+    location_ids = tuple(int(x) for x in location_ids) if location_ids else None
+    with conn_scope(conn) as con:
+        cur = con.cursor()
+        for (y, m) in months:
+            where, params = _month_where(y, m, location_ids)
+            cur.execute(f"DELETE FROM sales_daily WHERE {where}", params)
+            cur.execute(
+                f"""
+                INSERT INTO sales_daily (location_id, item_id, fecha, cantidad, acumulado)
+                SELECT location_id, item_id, fecha, SUM(cantidad), 0
+                  FROM sales
+                 WHERE {where}
+                 GROUP BY location_id, item_id, fecha
+                """,
+                params,
+            )
+        loc_where, loc_params = "", ()
+        if location_ids:
+            loc_where = f"AND s.location_id IN ({','.join('?' * len(location_ids))})"
+            loc_params = location_ids
+        y, m = months[0]
+        _recompute_running(cur, date(y, m, 1).isoformat(), loc_where, loc_params)
+
+def rebuild_daily(conn=None) -> int:
+    """Reconstruye sales_daily completa desde sales (bases viejas o reparaciones)."""
+    with conn_scope(conn) as con:
+        cur = con.cursor()
+        cur.execute("DELETE FROM sales_daily")
+        cur.execute(
+            """
+            INSERT INTO sales_daily (location_id, item_id, fecha, cantidad, acumulado)
+            SELECT location_id, item_id, fecha, cantidad,
+                   SUM(cantidad) OVER (PARTITION BY location_id, item_id ORDER BY fecha)
+              FROM (SELECT location_id, item_id, fecha, SUM(cantidad) AS cantidad
+                      FROM sales
+                     GROUP BY location_id, item_id, fecha)
+            """
+        )
+        return cur.rowcount
+
 def sum_sales_between(location_id: int, item_id: int, start_date_iso: str, end_date_iso: Optional[str] = None) -> float:
+    """Ventas del item en la sucursal entre las fechas (inclusive), desde sales_daily."""
+    if end_date_iso and end_date_iso < start_date_iso:
+        return 0.0
     with get_conn() as con:
         cur = con.cursor()
         if end_date_iso:
             cur.execute(
-                "SELECT COALESCE(SUM(cantidad),0) FROM sales WHERE location_id=? AND item_id=? AND fecha BETWEEN ? AND ?",
-                (location_id, item_id, start_date_iso, end_date_iso)
+                f"SELECT COALESCE(({_ACUM_HASTA}), 0) - COALESCE(({_ACUM_ANTES}), 0)",
+                (location_id, item_id, end_date_iso, location_id, item_id, start_date_iso)
             )
         else:
             cur.execute(
-                "SELECT COALESCE(SUM(cantidad),0) FROM sales WHERE location_id=? AND item_id=? AND fecha>=?",
-                (location_id, item_id, start_date_iso)
+                f"""
+                SELECT COALESCE((SELECT acumulado FROM sales_daily
+                                  WHERE location_id=? AND item_id=?
+                                  ORDER BY fecha DESC LIMIT 1), 0)
+                       - COALESCE(({_ACUM_ANTES}), 0)
+                """,
+                (location_id, item_id, location_id, item_id, start_date_iso)
             )
         (s,) = cur.fetchone()
-        return float(s or 0.0)
+        # Diferencia de acumulados: redondeo para no arrastrar restos de coma flotante
+        return round(float(s or 0.0), 6)
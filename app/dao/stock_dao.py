@@ -1,40 +1,119 @@
 # app/dao/stock_dao.py
 from __future__ import annotations
-from typing import Iterable, Optional
-from .connection import get_conn
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+from .connection import get_conn, conn_scope
+from .item_dao import search_filter
 
-def upsert_stock(item_id: int, location_id: int, lote: Optional[str], fecha_venc: Optional[str], delta: float) -> bool:
-    if delta == 0:
-        return True
-    with get_conn() as conn:
+_UPSERT_SQL = """
+    INSERT INTO stock(item_id, location_id, lote, fecha_venc, cantidad)
+    VALUES(?, ?, ?, ?, ?)
+    ON CONFLICT(item_id, location_id, lote_key, venc_key)
+    DO UPDATE SET cantidad = cantidad + excluded.cantidad
+"""
+
+def apply_deltas(
+    rows: Iterable[Tuple[int, int, Optional[str], Optional[str], float]],
+    conn=None,
+) -> int:
+    """
+    rows: iterable de (item_id, location_id, lote, fecha_venc, delta).
+    Agrupa en memoria por (item_id, location_id, lote, fecha_venc) y aplica cada
+    clave UNA vez con INSERT ... ON CONFLICT sobre el índice único ux_stock_lot_key.
+    Devuelve cuántas filas de stock se tocaron.
+    """
+    acc: Dict[tuple, float] = {}
+    for item_id, location_id, lote, fecha_venc, delta in rows:
+        if delta:
+            k = (item_id, location_id, lote or None, fecha_venc or None)
+            acc[k] = acc.get(k, 0.0) + delta
+    params = [k + (d,) for k, d in acc.items() if d != 0]
+    if not params:
+        return 0
+    with conn_scope(conn) as conn:
+        conn.cursor().executemany(_UPSERT_SQL, params)
+    return len(params)
+
+def rebuild_lot_summary(conn=None) -> int:
+    """
+    Reconstruye lot_summary desde movements (import/recepcion) en una sola pasada.
+    Los triggers la mantienen al día; esto es para bases viejas o reparaciones.
+    Devuelve cuántos lotes quedaron.
+    """
+    with conn_scope(conn) as conn:
         cur = conn.cursor()
+        cur.execute("DELETE FROM lot_summary")
         cur.execute(
             """
-            UPDATE stock
-               SET cantidad = cantidad + ?
-             WHERE item_id=? AND location_id=?
-               AND IFNULL(lote,'') = IFNULL(?, '')
-               AND IFNULL(fecha_venc,'') = IFNULL(?, '')
+            INSERT INTO lot_summary(item_id, location_id, lote_key, venc_key,
+                                    primera_carga, ultima_carga, ingresado_total)
+            SELECT item_id, location_id, IFNULL(lote, ''), IFNULL(fecha_venc, ''),
+                   MIN(ts), MAX(ts), COALESCE(SUM(delta), 0)
+              FROM movements
+             WHERE tipo IN ('import', 'recepcion')
+             GROUP BY item_id, location_id, IFNULL(lote, ''), IFNULL(fecha_venc, '')
+            """
+        )
+        return cur.rowcount
+
+def revert_inventories(inv_ids: Iterable[int], conn=None) -> int:
+    """
+    Resta del stock lo que sumaron esas importaciones, en una sola sentencia:
+    cantidad_total agrupada por (item, sucursal del inventario, vencimiento), con la
+    misma clave que usó apply_deltas al importar (lote NULL, fecha '' = NULL).
+    Devuelve cuántas claves de stock se tocaron.
+    """
+    ids = list(inv_ids)
+    if not ids:
+        return 0
+    with conn_scope(conn) as conn:
+        cur = conn.cursor()
+        cur.execute(
+            f"""
+            INSERT INTO stock(item_id, location_id, lote, fecha_venc, cantidad)
+            SELECT ir.item_id, inv.sucursal_id, NULL, NULLIF(ir.fecha_vencimiento, ''),
+                   -SUM(COALESCE(ir.cantidad_total, 0))
+              FROM inventory_rows ir
+              JOIN inventories inv ON inv.id = ir.inventory_id
+             WHERE ir.inventory_id IN ({",".join("?" * len(ids))})
+             GROUP BY ir.item_id, inv.sucursal_id, NULLIF(ir.fecha_vencimiento, '')
+            HAVING SUM(COALESCE(ir.cantidad_total, 0)) <> 0
+            ON CONFLICT(item_id, location_id, lote_key, venc_key)
+            DO UPDATE SET cantidad = cantidad + excluded.cantidad
             """,
-            (delta, item_id, location_id, lote, fecha_venc),
+            ids,
         )
-        if cur.rowcount == 0:
-            cur.execute(
-                "INSERT INTO stock(item_id, location_id, lote, fecha_venc, cantidad) VALUES(?,?,?,?,?)",
-                (item_id, location_id, lote, fecha_venc, delta),
-            )
-        return True
+        return cur.rowcount
 
-def list_expiries(location_id: Optional[int] = None, q: Optional[str] = None) -> Iterable[dict]:
+# Orden de la vista de vencimientos: por fecha (los sin fecha al final) y por id.
+# "Sin fecha" es NULL o '' (bases viejas). Los índices idx_stock_orden_venc* están
+# definidos sobre esta misma expresión.
+ORDEN_VENC = "COALESCE(NULLIF(s.fecha_venc, ''), '9999-12-31')"
+
+def list_expiries(location_id: Optional[int] = None, q: Optional[str] = None,
+                  sales_until: Optional[str] = None, after: Optional[Tuple[str, int]] = None,
+                  limit: Optional[int] = None, min_venc: Optional[str] = None,
+                  columns: bool = False):
     """
-    Devuelve stock + datos del item + fechas de primera/última carga (movements) y total ingresado del lote.
+    Devuelve stock + datos del item + fechas de primera/última carga y total ingresado del lote
+    (tomados de lot_summary, que se mantiene junto con los movimientos).
     Filtros:
       - location_id: sólo esa sucursal
-      - q: texto a buscar en codigo, ean o descripcion (LIKE %q%)
+      - q: texto a buscar en codigo, ean o descripcion (subcadena, sin acentos; índice items_fts)
+      - min_venc (ISO): excluye lotes que vencen antes (los sin fecha se mantienen)
     Columnas: id, item_id, codigo, descripcion, ean, location_id, lote, fecha_venc,
-              cantidad, ultima_carga, primera_carga, ingresado_total
+              cantidad, ultima_carga, primera_carga, ingresado_total, orden_venc
+    Con sales_until (ISO) agrega ventas_desde_recepcion: ventas del item en la sucursal
+    entre el día de primera_carga y sales_until, resuelto en la misma consulta
+    como diferencia de dos acumulados de sales_daily.
+
+    Orden: (orden_venc, id), con orden_venc = fecha_venc o '9999-12-31' si no tiene (NULL o '').
+    Paginación por clave: limit = tamaño de página y after = (orden_venc, id) de la
+    última fila de la página anterior. Cada página cuesta lo mismo sin importar cuántas
+    filas quedaron atrás.
+
+    Con columns=True devuelve {columna: lista de valores} en vez de una lista de dicts.
     """
-    sql = """
+    sql = f"""
         SELECT
             s.id,
             s.item_id,
@@ -45,48 +124,106 @@ def list_expiries(location_id: Optional[int] = None, q: Optional[str] = None) ->
             s.lote,
             s.fecha_venc,
             s.cantidad,
-            (
-              SELECT MAX(m.ts)
-                FROM movements m
-               WHERE m.item_id = s.item_id
-                 AND m.location_id = s.location_id
-                 AND IFNULL(m.fecha_venc,'') = IFNULL(s.fecha_venc,'')
-                 AND m.tipo IN ('import','recepcion')
-            ) AS ultima_carga,
-            (
-              SELECT MIN(m.ts)
-                FROM movements m
-               WHERE m.item_id = s.item_id
-                 AND m.location_id = s.location_id
-                 AND IFNULL(m.fecha_venc,'') = IFNULL(s.fecha_venc,'')
-                 AND m.tipo IN ('import','recepcion')
-            ) AS primera_carga,
-            (
-              SELECT COALESCE(SUM(m.delta),0)
-                FROM movements m
-               WHERE m.item_id = s.item_id
-                 AND m.location_id = s.location_id
-                 AND IFNULL(m.fecha_venc,'') = IFNULL(s.fecha_venc,'')
-                 AND m.tipo IN ('import','recepcion')
-            ) AS ingresado_total
+            ls.ultima_carga,
+            ls.primera_carga,
+            COALESCE(ls.ingresado_total, 0) AS ingresado_total,
+            {ORDEN_VENC} AS orden_venc
         FROM stock s
         JOIN items i ON i.id = s.item_id
+        LEFT JOIN lot_summary ls
+               ON ls.item_id = s.item_id
+              AND ls.location_id = s.location_id
+              AND ls.lote_key = s.lote_key
+              AND ls.venc_key = s.venc_key
         WHERE s.cantidad <> 0
     """
     params = []
     if location_id is not None:
         sql += " AND s.location_id = ?"
         params.append(location_id)
-    if q:
-        sql += " AND (i.codigo LIKE ? OR i.ean LIKE ? OR i.descripcion LIKE ?)"
-        like = f"%{q}%"
-        params.extend([like, like, like])
+    if q and q.strip():
+        fts_sql, fts_params = search_filter(q)
+        sql += f" AND s.item_id IN ({fts_sql})"
+        params.extend(fts_params)
+    if min_venc:
+        sql += " AND (NULLIF(s.fecha_venc, '') IS NULL OR s.fecha_venc >= ?)"
+        params.append(min_venc)
+    if after is not None:
+        # (orden_venc, id) > after, escrito así para que el índice busque por rango
+        # (con la comparación por tuplas SQLite recorre el índice desde el principio)
+        sql += f" AND {ORDEN_VENC} >= ? AND ({ORDEN_VENC} > ? OR s.id > ?)"
+        params.extend([after[0], after[0], after[1]])
+    sql += f" ORDER BY {ORDEN_VENC}, s.id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
 
-    sql += " ORDER BY s.fecha_venc IS NULL, s.fecha_venc ASC"
+    if sales_until:
+        sql = """
+            SELECT e.*,
+                   CASE WHEN e.primera_carga IS NULL OR substr(e.primera_carga, 1, 10) > ? THEN 0
+                   ELSE ROUND(
+                     COALESCE((
+                       SELECT d.acumulado FROM sales_daily d
+                        WHERE d.location_id = e.location_id AND d.item_id = e.item_id
+                          AND d.fecha <= ?
+                        ORDER BY d.fecha DESC LIMIT 1
+                     ), 0)
+                     - COALESCE((
+                       SELECT d.acumulado FROM sales_daily d
+                        WHERE d.location_id = e.location_id AND d.item_id = e.item_id
+                          AND d.fecha < substr(e.primera_carga, 1, 10)
+                        ORDER BY d.fecha DESC LIMIT 1
+                     ), 0), 6)
+                   END AS ventas_desde_recepcion
+              FROM (""" + sql + """) e
+             ORDER BY e.orden_venc, e.id
+        """
+        params[:0] = [sales_until, sales_until]
 
     with get_conn() as conn:
         cur = conn.cursor()
         cur.execute(sql, params)
         cols = [c[0] for c in cur.description]
         rows = cur.fetchall()
+    if columns:
+        data = list(zip(*rows)) if rows else [()] * len(cols)
+        return {c: list(v) for c, v in zip(cols, data)}
     return [dict(zip(cols, r)) for r in rows]
+
+def iter_stock(location_id: Optional[int] = None, q: Optional[str] = None,
+               batch: int = 5000, conn=None) -> Iterator[Dict[str, Any]]:
+    """
+    Stock actual (cantidad <> 0) con datos del item y nombre de sucursal, por
+    sucursal, código y vencimiento. Filtros como list_expiries (location_id, q).
+    Generador: lee de a `batch` filas del cursor, para exportar sin cargar todo.
+    Columnas: location_id, sucursal, item_id, codigo, descripcion, ean, lote, fecha_venc, cantidad
+    """
+    sql = """
+        SELECT s.location_id, l.nombre AS sucursal, s.item_id, i.codigo, i.descripcion, i.ean,
+               s.lote, s.fecha_venc, s.cantidad
+          FROM stock s
+          JOIN items i ON i.id = s.item_id
+          JOIN locations l ON l.id = s.location_id
+         WHERE s.cantidad <> 0
+    """
+    params = []
+    if location_id is not None:
+        sql += " AND s.location_id = ?"
+        params.append(location_id)
+    if q and q.strip():
+        fts_sql, fts_params = search_filter(q)
+        sql += f" AND s.item_id IN ({fts_sql})"
+        params.extend(fts_params)
+    sql += f" ORDER BY s.location_id, i.codigo, {ORDEN_VENC}, s.id"
+
+    with conn_scope(conn) as conn:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        cols = [c[0] for c in cur.description]
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            for r in rows:
+                yield dict(zip(cols, r))
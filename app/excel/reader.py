@@ -0,0 +1,140 @@
+# app/excel/reader.py
+"""
+Lectura de Excel por lotes, con memoria acotada al tamaño del lote.
+- Motor: python-calamine si está instalado (más rápido), si no openpyxl en modo read_only.
+- La cabecera (primera fila) se normaliza UNA vez con canonicalize_columns.
+- Cada lote es un DataFrame con las columnas canónicas.
+"""
+from __future__ import annotations
+
+from typing import Iterator, List, Optional
+
+import pandas as pd
+
+from app.utils.normalize import canonicalize_columns
+
+DEFAULT_BATCH = 5000
+
+
+def _has_calamine() -> bool:
+    try:
+        import python_calamine  # noqa: F401
+        return True
+    except Exception:
+        return False
+
+
+def resolve_engine(engine: str = "auto") -> str:
+    """'auto' → 'calamine' si está disponible, si no 'openpyxl'."""
+    if engine == "auto":
+        return "calamine" if _has_calamine() else "openpyxl"
+    if engine not in ("calamine", "openpyxl"):
+        raise ValueError(f"Motor de lectura desconocido: '{engine}'.")
+    return engine
+
+
+def sheet_names(path: str, engine: str = "auto") -> List[str]:
+    engine = resolve_engine(engine)
+    if engine == "calamine":
+        from python_calamine import CalamineWorkbook
+        return list(CalamineWorkbook.from_path(path).sheet_names)
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+def _iter_raw_rows(path: str, sheet_name: Optional[str], engine: str) -> Iterator[tuple]:
+    """Filas crudas (tuplas) de la hoja; sheet_name=None → primera hoja."""
+    if engine == "calamine":
+        from python_calamine import CalamineWorkbook
+        wb = CalamineWorkbook.from_path(path)
+        name = sheet_name if sheet_name is not None else wb.sheet_names[0]
+        if name not in wb.sheet_names:
+            raise ValueError(f"No existe la hoja '{name}' en {path}.")
+        for row in wb.get_sheet_by_name(name).iter_rows():
+            # calamine devuelve "" para celdas vacías
+            yield tuple(None if v == "" else v for v in row)
+        return
+
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        if sheet_name is None:
+            ws = wb.worksheets[0]
+        elif sheet_name in wb.sheetnames:
+            ws = wb[sheet_name]
+        else:
+            raise ValueError(f"No existe la hoja '{sheet_name}' en {path}.")
+        yield from ws.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _header_cols(header) -> List[str]:
+    return canonicalize_columns(
+        [str(h) if h is not None else f"unnamed: {i}" for i, h in enumerate(header)]
+    )
+
+
+def _as_str(v):
+    """Equivalente a read_excel(dtype=str) para una celda."""
+    if v is None:
+        return None
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+
+def iter_batches(
+    path: str,
+    sheet_name: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH,
+    engine: str = "auto",
+    dtype=None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Recorre la hoja en lotes de hasta batch_size filas.
+    - dtype=str: todas las celdas como texto (como read_excel(dtype=str)).
+    - Las filas completamente vacías se descartan.
+    Si la hoja sólo tiene cabecera, no emite ningún lote.
+    """
+    engine = resolve_engine(engine)
+    rows = _iter_raw_rows(path, sheet_name, engine)
+    header = next(rows, None)
+    if header is None:
+        return
+    cols = _header_cols(header)
+    width = len(cols)
+
+    buf: list = []
+    for row in rows:
+        if not any(v is not None for v in row):
+            continue
+        row = tuple(row[:width]) + (None,) * (width - len(row))
+        if dtype is str:
+            row = tuple(_as_str(v) for v in row)
+        buf.append(row)
+        if len(buf) >= batch_size:
+            yield pd.DataFrame.from_records(buf, columns=cols)
+            buf = []
+    if buf:
+        yield pd.DataFrame.from_records(buf, columns=cols)
+
+
+def read_sheet(
+    path: str,
+    sheet_name: Optional[str] = None,
+    engine: str = "auto",
+    dtype=None,
+) -> pd.DataFrame:
+    """La hoja completa (columnas canónicas). Para hojas chicas como 'resumen'."""
+    batches = list(iter_batches(path, sheet_name, engine=engine, dtype=dtype))
+    if batches:
+        return pd.concat(batches, ignore_index=True)
+    # Sólo cabecera: DataFrame vacío con las columnas
+    engine = resolve_engine(engine)
+    header = next(_iter_raw_rows(path, sheet_name, engine), None) or ()
+    return pd.DataFrame(columns=_header_cols(header))
@@ -0,0 +1,123 @@
+# app/excel/workbook_cache.py
+"""
+Cache de libros ya parseados, compartida por vista previa, validación e importación.
+- Clave: (ruta, tamaño, mtime, md5). El md5 se calcula una vez por versión del archivo.
+- Guarda las hojas ya canonicalizadas (DataFrame), con tope de memoria y desalojo LRU.
+- get_parsed guarda en la misma LRU el resultado de un parseo propio (p.ej. las ventas
+  ya agrupadas), así la vista previa y la importación leen el archivo una sola vez.
+- Si una hoja no está en cache, iter_batches la lee en streaming sin cachearla.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+import pandas as pd
+
+from app.excel import reader
+from app.utils.hashing import md5_file
+
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+_lock = threading.Lock()
+_HASHES: Dict[Tuple[str, int, int], str] = {}
+_SHEETS: "OrderedDict[tuple, Tuple[pd.DataFrame, int]]" = OrderedDict()
+_used_bytes = 0
+
+
+def fingerprint(path: str) -> Tuple[str, int, int, str]:
+    """(ruta absoluta, tamaño, mtime_ns, md5); el md5 sólo se recalcula si cambió el archivo."""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    stat_key = (path, st.st_size, st.st_mtime_ns)
+    with _lock:
+        h = _HASHES.get(stat_key)
+    if h is None:
+        h = md5_file(path)
+        with _lock:
+            _HASHES[stat_key] = h
+    return stat_key + (h,)
+
+
+def file_hash(path: str) -> str:
+    """md5 del archivo, reutilizando el de la cache si el archivo no cambió."""
+    return fingerprint(path)[3]
+
+
+def _sheet_key(path: str, sheet_name: Optional[str], dtype) -> tuple:
+    return (fingerprint(path), sheet_name, "str" if dtype is str else None)
+
+
+def _evict_locked() -> None:
+    global _used_bytes
+    while _used_bytes > CACHE_MAX_BYTES and _SHEETS:
+        _, (_, size) = _SHEETS.popitem(last=False)
+        _used_bytes -= size
+
+
+def _cached(key: tuple, load: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    """Devuelve el DataFrame de la cache o lo carga con load() y lo guarda (si entra)."""
+    global _used_bytes
+    with _lock:
+        hit = _SHEETS.get(key)
+        if hit is not None:
+            _SHEETS.move_to_end(key)
+            return hit[0]
+
+    df = load()
+    size = int(df.memory_usage(deep=True).sum())
+    if size <= CACHE_MAX_BYTES:
+        with _lock:
+            if key not in _SHEETS:
+                _SHEETS[key] = (df, size)
+                _used_bytes += size
+                _evict_locked()
+    return df
+
+
+def get_sheet(path: str, sheet_name: Optional[str] = None, dtype=None) -> pd.DataFrame:
+    """
+    Hoja completa con columnas canónicas; se parsea una sola vez por versión del archivo.
+    El DataFrame devuelto es compartido: no modificarlo (usar .copy()).
+    """
+    return _cached(_sheet_key(path, sheet_name, dtype),
+                   lambda: reader.read_sheet(path, sheet_name, dtype=dtype))
+
+
+def get_parsed(path: str, tag: str, build: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    """
+    Resultado de build() (un parseo propio del archivo, identificado por tag), calculado
+    una sola vez por versión del archivo. Compartido: no modificarlo.
+    """
+    return _cached((fingerprint(path), tag, "parsed"), build)
+
+
+def iter_batches(
+    path: str,
+    sheet_name: Optional[str] = None,
+    batch_size: int = reader.DEFAULT_BATCH,
+    dtype=None,
+) -> Iterator[pd.DataFrame]:
+    """Como reader.iter_batches, pero si la hoja ya está en cache la recorre desde memoria."""
+    key = _sheet_key(path, sheet_name, dtype)
+    with _lock:
+        hit = _SHEETS.get(key)
+        if hit is not None:
+            _SHEETS.move_to_end(key)
+    if hit is None:
+        yield from reader.iter_batches(path, sheet_name, batch_size=batch_size, dtype=dtype)
+        return
+    df = hit[0]
+    for start in range(0, len(df), batch_size):
+        yield df.iloc[start:start + batch_size].copy()
+
+
+def clear() -> None:
+    """Vacía la cache (hojas y hashes)."""
+    global _used_bytes
+    with _lock:
+        _SHEETS.clear()
+        _HASHES.clear()
+        _used_bytes = 0
@@ -0,0 +1,194 @@
+# app/excel/writer.py
+"""
+Exportación de reportes (vencimientos, stock) en streaming, a .xlsx o .csv.
+- Las filas llegan de un iterable (generador) y se escriben a medida que llegan:
+  nunca se arma el resultado completo en memoria.
+- .xlsx: openpyxl en modo write_only (cada hoja va a su archivo temporal).
+- .csv: UTF-8 con BOM (Excel abre bien los acentos).
+- split_by: una hoja por valor de esa columna (p.ej. sucursal); en .csv, un
+  archivo por valor (<nombre>_<valor>.csv). Las filas pueden venir mezcladas.
+- fills: colores de fondo por valor de fill_column (p.ej. STATE_COLORS por estado).
+"""
+from __future__ import annotations
+
+import csv
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+PROGRESS_EVERY = 5000  # filas entre llamadas a progress
+
+_BAD_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+def _sheet_title(name: Any, used: set) -> str:
+    """Nombre válido de hoja (≤31 caracteres, sin []:*?/\\) y único en el libro."""
+    base = _BAD_SHEET_CHARS.sub("_", str(name)).strip("'") or "hoja"
+    base = base[:31]
+    title, n = base, 2
+    while title.lower() in used:
+        suffix = f" ({n})"
+        title = base[: 31 - len(suffix)] + suffix
+        n += 1
+    used.add(title.lower())
+    return title
+
+
+def _file_part(name: Any) -> str:
+    return re.sub(r"[^\w\-]+", "_", str(name)).strip("_") or "otros"
+
+
+class _XlsxOut:
+    def __init__(self, path: Path, header: List[str], fill_index: Optional[int],
+                 fills: Optional[Mapping[Any, str]]):
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font, PatternFill
+
+        self.path = path
+        self.wb = Workbook(write_only=True)
+        self._cell = WriteOnlyCell
+        self._bold = Font(bold=True)
+        self.header = header
+        self.fill_index = fill_index
+        self.fills = {k: PatternFill(fill_type="solid", start_color=v.lstrip("#").upper(),
+                                     end_color=v.lstrip("#").upper())
+                      for k, v in (fills or {}).items()}
+        self._sheets: Dict[Any, Any] = {}
+        self._used: set = set()
+
+    def sheet(self, key, title):
+        ws = self._sheets.get(key)
+        if ws is None:
+            ws = self.wb.create_sheet(_sheet_title(title, self._used))
+            ws.freeze_panes = "A2"
+            ws.append([self._styled(ws, h, self._bold) for h in self.header])
+            self._sheets[key] = ws
+        return ws
+
+    def _styled(self, ws, value, font=None, fill=None):
+        c = self._cell(ws, value=value)
+        if font is not None:
+            c.font = font
+        if fill is not None:
+            c.fill = fill
+        return c
+
+    def append(self, ws, values: list):
+        fi = self.fill_index
+        if fi is not None:
+            fill = self.fills.get(values[fi])
+            if fill is not None:
+                values[fi] = self._styled(ws, values[fi], fill=fill)
+        ws.append(values)
+
+    def close(self) -> List[str]:
+        self.wb.save(self.path)
+        return [str(self.path)]
+
+    def abort(self) -> None:
+        """Sin save() no se escribe nada; se cierran las hojas y se borran sus temporales."""
+        for ws in self._sheets.values():
+            ws.close()
+            ws._writer.cleanup()  # openpyxl los borraría recién al salir del proceso
+
+
+class _CsvOut:
+    def __init__(self, path: Path, header: List[str], delimiter: str):
+        self.path = path
+        self.header = header
+        self.delimiter = delimiter
+        self._files: Dict[Any, tuple] = {}
+
+    def sheet(self, key, title):
+        out = self._files.get(key)
+        if out is None:
+            p = self.path if key is _ALL else self.path.with_name(
+                f"{self.path.stem}_{_file_part(title)}{self.path.suffix}")
+            f = p.open("w", newline="", encoding="utf-8-sig")
+            w = csv.writer(f, delimiter=self.delimiter)
+            w.writerow(self.header)
+            out = self._files[key] = (f, w, p)
+        return out
+
+    def append(self, out, values: list):
+        out[1].writerow(["" if v is None else v for v in values])
+
+    def close(self) -> List[str]:
+        paths = []
+        for f, _, p in self._files.values():
+            f.close()
+            paths.append(str(p))
+        return paths
+
+    def abort(self) -> None:
+        """Error o cancelación: no dejar archivos a medias."""
+        for f, _, p in self._files.values():
+            f.close()
+            p.unlink(missing_ok=True)
+
+
+_ALL = object()  # clave de la única hoja cuando no hay split_by
+
+
+def write_report(
+    path,
+    rows: Iterable[Mapping[str, Any]],
+    columns: Sequence[str],
+    headers: Optional[Mapping[str, str]] = None,
+    split_by: Optional[str] = None,
+    split_names: Optional[Mapping[Any, str]] = None,
+    sheet_name: str = "datos",
+    fill_column: Optional[str] = None,
+    fills: Optional[Mapping[Any, str]] = None,
+    delimiter: str = ",",
+    progress: Optional[Callable] = None,
+) -> Dict[str, Any]:
+    """
+    Escribe rows (dicts) en path (.xlsx o .csv, según la extensión).
+    - columns: claves de cada fila, en orden; headers: {clave: título} (por defecto la clave).
+    - split_by: clave que reparte las filas en hojas/archivos; split_names: {valor: nombre}.
+    - fill_column + fills: color de fondo ("#rrggbb") de esa celda según su valor (sólo .xlsx).
+    - progress(filas): cada PROGRESS_EVERY filas (Cancelled corta la exportación).
+    Devuelve {"files": [rutas], "rows": total, "sheets": {nombre: filas}}.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix not in (".xlsx", ".csv"):
+        raise ValueError(f"Formato de exportación no soportado: '{path.suffix}' (usar .xlsx o .csv).")
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    columns = list(columns)
+    header = [(headers or {}).get(c, c) for c in columns]
+    fill_index = columns.index(fill_column) if fill_column in columns else None
+    out = (_XlsxOut(path, header, fill_index, fills) if suffix == ".xlsx"
+           else _CsvOut(path, header, delimiter))
+
+    counts: Dict[str, int] = {}
+    titles: Dict[Any, str] = {}
+    n = 0
+    try:
+        for row in rows:
+            if split_by is None:
+                key, title = _ALL, sheet_name
+            else:
+                key = row[split_by]
+                title = titles.get(key)
+                if title is None:
+                    title = titles[key] = str((split_names or {}).get(key, key))
+            target = out.sheet(key, title)
+            out.append(target, [row[c] for c in columns])
+            counts[title] = counts.get(title, 0) + 1
+            n += 1
+            if progress and n % PROGRESS_EVERY == 0:
+                progress(n)
+
+        if n == 0:
+            out.sheet(_ALL, sheet_name)  # archivo con la cabecera sola
+    except BaseException:
+        out.abort()
+        raise
+    files = out.close()
+    if progress:
+        progress(n)
+    return {"files": files, "rows": n, "sheets": counts}
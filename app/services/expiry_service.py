@@ -1,23 +1,43 @@
 # app/services/expiry_service.py  (REEMPLAZAR COMPLETO POR ESTE)
 from __future__ import annotations
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import configparser
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from datetime import date
+import numpy as np
+from app.dao.connection import data_version, get_db_path
 from app.dao.stock_dao import list_expiries
-from app.dao.sales_dao import sum_sales_between
-from app.utils.dates import to_date, days_left
+from app.utils.dates import to_date
 
 DEFAULT_CRITICO = 7
 DEFAULT_PROXIMO = 30
+PAGE_SIZE = 500  # filas por página en get_expiries_page
 
-def _load_thresholds() -> tuple[int, int]:
+RESULT_CACHE_SIZE = 32  # resultados (vistas o páginas) guardados en la LRU
+THRESHOLDS_INI = Path(__file__).resolve().parents[2] / "config" / "thresholds.ini"
+
+# Estados de la vista; classify los elige por índice (0..3)
+ESTADOS = np.array(["SIN_FECHA", "CRITICO", "PROXIMO", "OK"], dtype=object)
+# Color de fondo de cada estado (tabla de la UI y exportaciones a Excel)
+STATE_COLORS = {
+    "CRITICO": "#ffdddd",
+    "PROXIMO": "#fff3cd",
+    "OK": "#ddffdd",
+    "SIN_FECHA": "#e0e0e0"
+}
+
+_lock = threading.Lock()
+_RESULTS: "OrderedDict[tuple, Any]" = OrderedDict()
+_thresholds: Optional[Tuple[Optional[int], Tuple[int, int]]] = None  # (mtime_ns, umbrales)
+
+def _read_thresholds() -> tuple[int, int]:
     crit, prox = DEFAULT_CRITICO, DEFAULT_PROXIMO
     try:
-        ini = Path(__file__).resolve().parents[2] / "config" / "thresholds.ini"
         cfg = configparser.ConfigParser()
-        if ini.exists():
-            cfg.read(ini, encoding="utf-8")
+        if THRESHOLDS_INI.exists():
+            cfg.read(THRESHOLDS_INI, encoding="utf-8")
             crit = cfg.getint("thresholds", "critico", fallback=DEFAULT_CRITICO)
             prox = cfg.getint("thresholds", "proximo", fallback=DEFAULT_PROXIMO)
     except Exception:
@@ -26,6 +46,167 @@ def _load_thresholds() -> tuple[int, int]:
         crit, prox = prox, crit
     return crit, prox
 
+def _load_thresholds() -> tuple[int, int]:
+    """Umbrales de thresholds.ini; se vuelve a leer sólo si cambió el mtime del archivo."""
+    global _thresholds
+    try:
+        mtime = THRESHOLDS_INI.stat().st_mtime_ns
+    except OSError:
+        mtime = None  # sin archivo: valores por defecto
+    hit = _thresholds
+    if hit is not None and hit[0] == mtime:
+        return hit[1]
+    value = _read_thresholds()
+    _thresholds = (mtime, value)
+    return value
+
+def _cached(kind: str, args: tuple, compute):
+    """
+    Resultado de compute(crit, prox, today) guardado en una LRU. La clave incluye
+    base, umbrales, fecha de hoy y data_version: cualquier escritura en la base (de
+    este u otro proceso) invalida lo anterior sin tener que avisarle a la cache.
+    """
+    crit, prox = _load_thresholds()
+    today = date.today()
+    key = (get_db_path(), kind, args, crit, prox, today, data_version())
+    with _lock:
+        hit = _RESULTS.get(key)
+        if hit is not None:
+            _RESULTS.move_to_end(key)
+            return hit
+    value = compute(crit, prox, today)
+    with _lock:
+        _RESULTS[key] = value
+        while len(_RESULTS) > RESULT_CACHE_SIZE:
+            _RESULTS.popitem(last=False)
+    return value
+
+def clear_cache() -> None:
+    """Vacía la cache de resultados y la de umbrales."""
+    global _thresholds
+    with _lock:
+        _RESULTS.clear()
+    _thresholds = None
+
+def _venc_days(fechas) -> np.ndarray:
+    """Fechas de vencimiento (ISO, date o None) → datetime64[D]; NaT si no hay fecha."""
+    # Se parsea una vez por fecha distinta (muchos lotes comparten vencimiento)
+    fechas = list(fechas)
+    valores = list(dict.fromkeys(fechas))
+    pos = {f: i for i, f in enumerate(valores)}
+    codes = np.fromiter(map(pos.__getitem__, fechas), dtype=np.int64, count=len(fechas))
+    try:
+        # Camino rápido: ISO 'YYYY-MM-DD' parseado por numpy (None/'' → NaT)
+        uniq = np.array(valores, dtype="datetime64[D]")
+    except (TypeError, ValueError):
+        # Formatos mezclados: los mismos que acepta to_date
+        uniq = np.array([d.isoformat() if d else "NaT" for d in map(to_date, valores)],
+                        dtype="datetime64[D]")
+    return uniq[codes]
+
+def classify(
+    fecha_venc,
+    ingresado,
+    ventas,
+    con_recepcion,
+    crit: int,
+    prox: int,
+    include_expired: bool = True,
+    today: Optional[date] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Núcleo por columnas de la vista de vencimientos (una sola fecha de referencia).
+    Recibe secuencias paralelas (una posición por lote) y devuelve arrays:
+      - keep: máscara de filas a mostrar (include_expired=False saca los vencidos),
+      - venc: datetime64[D] (NaT sin fecha),
+      - dias: días restantes (int64; 0 donde no hay fecha, ver sin_fecha),
+      - sin_fecha: bool,
+      - estado: CRITICO/PROXIMO/OK/SIN_FECHA (los vencidos cuentan como CRITICO),
+      - ventas: ventas desde recepción (0 si el lote no tiene recepción),
+      - restante: max(0, ingresado - ventas) redondeado a 3 decimales.
+    """
+    today = np.datetime64(today or date.today(), "D")
+    venc = _venc_days(fecha_venc)
+    sin_fecha = np.isnat(venc)
+    dias = np.where(sin_fecha, 0, (venc - today).astype(np.int64))
+
+    estado = ESTADOS[np.select([sin_fecha, dias <= crit, dias <= prox], [0, 1, 2], default=3)]
+    keep = sin_fecha | (dias >= 0) if not include_expired else np.ones(len(venc), dtype=bool)
+
+    # None → NaN → 0
+    ingresado = np.nan_to_num(np.asarray(ingresado, dtype=float))
+    ventas = np.where(np.asarray(con_recepcion, dtype=bool),
+                      np.nan_to_num(np.asarray(ventas, dtype=float)), 0.0)
+    restante = np.maximum(0.0, np.round(ingresado - ventas, 3))
+    return {
+        "keep": keep, "venc": venc, "dias": dias, "sin_fecha": sin_fecha,
+        "estado": estado, "ventas": ventas, "restante": restante,
+    }
+
+def _classify_columns(cols: Dict[str, list], crit: int, prox: int, include_expired: bool,
+                      today: Optional[date] = None) -> Dict[str, np.ndarray]:
+    """classify sobre las columnas de list_expiries(columns=True)."""
+    n = len(cols["id"])
+    return classify(
+        cols["fecha_venc"],
+        cols["ingresado_total"],
+        cols.get("ventas_desde_recepcion", [0.0] * n),
+        np.fromiter(map(bool, cols["primera_carga"]), dtype=bool, count=n),
+        crit, prox, include_expired, today,
+    )
+
+# Columnas de la vista (orden de los dicts que recibe la UI)
+VIEW_COLUMNS = (
+    "id", "item_id", "codigo", "descripcion", "ean", "location_id", "lote",
+    "fecha_venc", "dias_restantes", "cantidad", "estado", "ultima_carga",
+    "recepcion", "ingresado_lote", "ventas_desde_recepcion", "restante_estimado",
+)
+# Títulos de columna para mostrar/exportar
+COLUMN_TITLES = {
+    "codigo": "Código",
+    "descripcion": "Descripción",
+    "ean": "EAN",
+    "location_id": "Sucursal",
+    "lote": "Lote",
+    "recepcion": "Recepción",
+    "fecha_venc": "Vence",
+    "dias_restantes": "Días",
+    "ingresado_lote": "Ingresado (lote)",
+    "ventas_desde_recepcion": "Ventas desde recepción",
+    "restante_estimado": "Restante estimado (lote)",
+    "cantidad": "Stock actual",
+    "estado": "Estado",
+    "ultima_carga": "Última carga",
+}
+
+def _build_rows(cols: Dict[str, list], crit: int, prox: int, include_expired: bool,
+                today: Optional[date] = None) -> List[Dict[str, Any]]:
+    """Columnas del DAO → filas de la vista (lista de dicts, como la espera la UI)."""
+    c = _classify_columns(cols, crit, prox, include_expired, today)
+    sin_fecha = c["sin_fecha"]
+    view = {
+        "fecha_venc": np.where(sin_fecha, "", np.datetime_as_string(c["venc"])).astype(object),
+        "dias_restantes": np.where(sin_fecha, "", c["dias"].astype(object)),
+        "estado": c["estado"],
+        "ultima_carga": [str(v) if v else "" for v in cols["ultima_carga"]],
+        "recepcion": [str(v) if v else "" for v in cols["primera_carga"]],
+        "ingresado_lote": np.round(np.nan_to_num(np.asarray(cols["ingresado_total"], dtype=float)), 3),
+        "ventas_desde_recepcion": np.round(c["ventas"], 3),
+        "restante_estimado": c["restante"],
+    }
+    keep = c["keep"]
+    todas = bool(keep.all())
+    idx = None if todas else np.flatnonzero(keep).tolist()
+
+    columnas = []
+    for k in VIEW_COLUMNS:
+        v = view[k] if k in view else cols[k]
+        if isinstance(v, np.ndarray):
+            columnas.append((v if todas else v[keep]).tolist())
+        else:
+            columnas.append(v if todas else [v[i] for i in idx])
+    return [dict(zip(VIEW_COLUMNS, fila)) for fila in zip(*columnas)]
+
 def get_expiries(location_id: Optional[int] = None, q: Optional[str] = None, include_expired: bool = True) -> List[Dict[str, Any]]:
     """
     Devuelve la vista de vencimientos por lote, con:
@@ -34,66 +215,92 @@ def get_expiries(location_id: Optional[int] = None, q: Optional[str] = None, inc
       - restante estimado (lote),
       - días restantes y estado (CRITICO/PROXIMO/OK/SIN_FECHA)
     Mantiene columnas previas para compatibilidad con la UI.
+    Para listas grandes usar get_expiries_page.
+    Los resultados se cachean hasta la próxima escritura en la base (data_version).
+    """
+    q = (q or "").strip() or None
+
+    def compute(crit, prox, today):
+        today_iso = today.isoformat()
+        # Una sola consulta: las ventas desde recepción vienen resueltas en SQL
+        cols = list_expiries(location_id, q, sales_until=today_iso,
+                             min_venc=None if include_expired else today_iso, columns=True)
+        return _build_rows(cols, crit, prox, include_expired, today)
+
+    return list(_cached("rows", (location_id, q, include_expired), compute))
+
+def get_expiries_columns(location_id: Optional[int] = None, q: Optional[str] = None,
+                         include_expired: bool = True) -> Dict[str, np.ndarray]:
+    """
+    get_expiries por columnas, sin armar un dict por lote: {columna: array}
+    con las columnas de list_expiries más dias_restantes (NaN sin fecha),
+    estado, ventas_desde_recepcion y restante_estimado, ya filtradas.
+    Los arrays salen de la cache y son compartidos: no modificarlos.
+    """
+    q = (q or "").strip() or None
+
+    def compute(crit, prox, today):
+        today_iso = today.isoformat()
+        cols = list_expiries(location_id, q, sales_until=today_iso,
+                             min_venc=None if include_expired else today_iso, columns=True)
+        c = _classify_columns(cols, crit, prox, include_expired, today)
+        keep = c["keep"]
+        out = {k: np.asarray(v, dtype=object)[keep] for k, v in cols.items()}
+        out["dias_restantes"] = np.where(c["sin_fecha"], np.nan, c["dias"])[keep]
+        out["estado"] = c["estado"][keep]
+        out["ventas_desde_recepcion"] = c["ventas"][keep]
+        out["restante_estimado"] = c["restante"][keep]
+        return out
+
+    return dict(_cached("columns", (location_id, q, include_expired), compute))
+
+def get_expiries_page(
+    location_id: Optional[int] = None,
+    q: Optional[str] = None,
+    include_expired: bool = True,
+    after: Optional[Tuple[str, int]] = None,
+    limit: int = PAGE_SIZE,
+) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, int]]]:
+    """
+    Una página de get_expiries, en el mismo orden (fecha de vencimiento, id).
+    Devuelve (filas, siguiente): `siguiente` se pasa como `after` para pedir la
+    página que sigue; es None cuando no hay más filas.
+    """
+    q = (q or "").strip() or None
+    after = tuple(after) if after is not None else None
+
+    def compute(crit, prox, today):
+        today_iso = today.isoformat()
+        cols = list_expiries(location_id, q, sales_until=today_iso, after=after, limit=limit,
+                             min_venc=None if include_expired else today_iso, columns=True)
+        ids = cols["id"]
+        nxt = (cols["orden_venc"][-1], ids[-1]) if len(ids) == limit else None
+        return _build_rows(cols, crit, prox, include_expired, today), nxt
+
+    rows, nxt = _cached("page", (location_id, q, include_expired, after, limit), compute)
+    return list(rows), nxt
+
+def iter_expiries(
+    location_id: Optional[int] = None,
+    q: Optional[str] = None,
+    include_expired: bool = True,
+    page_size: int = 5000,
+) -> Iterator[Dict[str, Any]]:
     """
+    Las filas de get_expiries, de a una, leídas por páginas de page_size (mismo
+    orden). Para exportaciones grandes: no pasa por la cache de resultados ni
+    arma la vista completa en memoria.
+    """
+    q = (q or "").strip() or None
     crit, prox = _load_thresholds()
-    rows = list_expiries(location_id, q)
-    out: List[Dict[str, Any]] = []
-    today_iso = date.today().isoformat()
-
-    for r in rows:
-        fv_date = to_date(r["fecha_venc"])
-        dl = days_left(fv_date)
-        if dl is None:
-            estado = "SIN_FECHA"
-        elif dl < 0:
-            estado = "CRITICO" if include_expired else None  # si no incluye vencidos, se filtrará más abajo
-        elif dl <= crit:
-            estado = "CRITICO"
-        elif dl <= prox:
-            estado = "PROXIMO"
-        else:
-            estado = "OK"
-
-        # Filtrar vencidos si include_expired = False
-        if not include_expired and dl is not None and dl < 0:
-            continue
-        if estado is None:
-            continue
-
-        # Recepción (primera_carga) y total ingresado del lote
-        primera = r.get("primera_carga")
-        primera_iso = str(primera) if primera else ""
-        ingresado = float(r.get("ingresado_total") or 0.0)
-
-        # Ventas acumuladas desde recepción (si hay fecha de recepción)
-        ventas_desde = 0.0
-        if primera_iso:
-            ventas_desde = sum_sales_between(
-                location_id=r["location_id"],
-                item_id=r["item_id"],
-                start_date_iso=primera_iso[:10],  # fecha (día) de la primera carga
-                end_date_iso=today_iso
-            )
-
-        restante_estimado = max(0.0, round(ingresado - ventas_desde, 3))
-
-        out.append({
-            "id": r["id"],
-            "item_id": r["item_id"],
-            "codigo": r["codigo"],
-            "descripcion": r["descripcion"],
-            "ean": r["ean"],
-            "location_id": r["location_id"],
-            "lote": r["lote"],
-            "fecha_venc": fv_date.isoformat() if fv_date else "",
-            "dias_restantes": dl if dl is not None else "",
-            "cantidad": r["cantidad"],                 # stock actual (tabla stock)
-            "estado": estado,
-            "ultima_carga": (str(r.get("ultima_carga")) if r.get("ultima_carga") else ""),
-            # Nuevas columnas
-            "recepcion": primera_iso,
-            "ingresado_lote": round(ingresado, 3),
-            "ventas_desde_recepcion": round(float(ventas_desde), 3),
-            "restante_estimado": restante_estimado,
-        })
-    return out
+    today = date.today()
+    today_iso = today.isoformat()
+    after = None
+    while True:
+        cols = list_expiries(location_id, q, sales_until=today_iso, after=after, limit=page_size,
+                             min_venc=None if include_expired else today_iso, columns=True)
+        ids = cols["id"]
+        yield from _build_rows(cols, crit, prox, include_expired, today)
+        if len(ids) < page_size:
+            return
+        after = (cols["orden_venc"][-1], ids[-1])
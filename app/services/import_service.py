@@ -1,8 +1,11 @@
 # app/services/import_service.py
 from __future__ import annotations
 
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
 import pandas as pd
-from typing import Optional
+from typing import Optional, Dict, Any, Callable, Iterable, List, Tuple
 
 from app.dao import (
     inventory_dao,
@@ -12,10 +15,9 @@ from app.dao import (
     location_dao,
     responsible_dao,
 )
-from app.utils.normalize import canonicalize_columns
-# e.g. mapea "Fecha de Creacion" -> "fecha de creacion"
-from app.utils.dates import to_date
-from app.utils.hashing import md5_file
+from app.dao.connection import transaction
+from app.excel import reader, workbook_cache
+from app.utils.dates import to_date_series
 
 
 VENC_REQ = [
@@ -40,6 +42,10 @@ RESUMEN_REQ = [
 ]
 
 
+class DuplicateInventoryError(ValueError):
+    """El inventario (nombre + fecha_creacion + fecha_exportacion) ya estaba cargado."""
+
+
 def _to_num(val) -> float:
     if val is None:
         return 0.0
@@ -59,127 +65,341 @@ def _to_num(val) -> float:
             return 0.0
 
 
-def importar_excel(
-    path_excel: str,
-    # Soporta ambas variantes: por *nombre* o por *id* (backward compatible)
-    sucursal_nombre: Optional[str] = None,
-    responsable_nombre: Optional[str] = None,
-    sucursal_id: Optional[int] = None,
-    responsable_id: Optional[int] = None,
-) -> int:
+def _celda_txt(v) -> str:
+    # 7791234567890.0 → "7791234567890": pandas convierte a float una columna de
+    # enteros con celdas vacías, y eso depende de cada lote
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v).strip()
+
+
+def _txt(s: pd.Series) -> pd.Series:
     """
-    Importa el Excel (hojas: 'resumen' y 'vencimientos').
-    Valida duplicados por (nombre + fecha_creacion + fecha_exportacion).
-    Inserta: inventories, inventory_rows, upsert a stock y registra movements.
-    Devuelve el inventory_id creado.
+    Texto limpio por columna (NaN → ""). Los números enteros quedan sin ".0",
+    así un EAN/código da la misma clave en cualquier lote (tenga o no vacíos).
     """
+    return s.astype(object).map(_celda_txt).where(s.notna(), "")
+
+
+def _leer_resumen(path_excel: str) -> Dict[str, Any]:
+    """Lee la hoja 'resumen' y devuelve los datos de cabecera del inventario."""
+    return _datos_resumen(workbook_cache.get_sheet(path_excel, "resumen"))
+
 
-    # ---- Leer 'resumen'
-    resumen_df = pd.read_excel(path_excel, sheet_name="resumen")
-    resumen_df.columns = canonicalize_columns(resumen_df.columns)
+def _datos_resumen(resumen_df: pd.DataFrame) -> Dict[str, Any]:
+    """Datos de cabecera del inventario a partir de la hoja 'resumen' ya leída."""
     resumen = resumen_df.iloc[0].to_dict()
 
     for k in ("nombre", "fecha de creacion", "fecha de exportacion", "tipo", "total filas"):
         if k not in resumen:
             raise ValueError(f"Falta columna '{k}' en hoja 'resumen'.")
 
-    nombre = str(resumen["nombre"]).strip()
-    observacion = resumen.get("observacion")
-    fecha_creacion = resumen["fecha de creacion"]
-    fecha_exportacion = resumen["fecha de exportacion"]
-    tipo = str(resumen["tipo"]).strip()
     try:
         total_filas = int(resumen["total filas"])
     except Exception:
         total_filas = None
 
-    # ---- Duplicado
-    if inventory_dao.find_duplicate(nombre, fecha_creacion, fecha_exportacion):
-        raise ValueError(
-            f"Este inventario ya fue cargado: '{nombre}' "
-            f"({fecha_creacion} / {fecha_exportacion})."
+    return {
+        "nombre": str(resumen["nombre"]).strip(),
+        "observacion": resumen.get("observacion"),
+        "fecha_creacion": resumen["fecha de creacion"],
+        "fecha_exportacion": resumen["fecha de exportacion"],
+        "tipo": str(resumen["tipo"]).strip(),
+        "total_filas": total_filas,
+    }
+
+
+def _check_duplicate(resumen: Dict[str, Any], conn=None) -> None:
+    if inventory_dao.find_duplicate(resumen["nombre"], resumen["fecha_creacion"],
+                                    resumen["fecha_exportacion"], conn=conn):
+        raise DuplicateInventoryError(
+            f"Este inventario ya fue cargado: '{resumen['nombre']}' "
+            f"({resumen['fecha_creacion']} / {resumen['fecha_exportacion']})."
         )
 
-    archivo_hash = md5_file(path_excel)
 
-    # ---- Resolver sucursal y responsable (por id o por nombre)
-    if sucursal_id is None:
-        sucursal_nombre = (sucursal_nombre or "Sucursal 1").strip()
-        sucursal_id = location_dao.ensure_location(sucursal_nombre, "sucursal")
-    if responsable_id is None:
-        responsable_nombre = (responsable_nombre or "Sistema").strip()
-        responsable_id = responsible_dao.ensure_responsible(
-            responsable_nombre, "")
+def _preparar_vencimientos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Deja un lote de la hoja 'vencimientos' (columnas ya canónicas) listo para grabar:
+    columnas ean, codigo, descripcion, upb, bultos, cantidad, cantidad_total,
+    fecha_venc (ISO o None) y fecha_ingreso.
+    """
+    for col in VENC_REQ:
+        if col not in df.columns:
+            df[col] = None
+
+    out = pd.DataFrame({
+        "ean": _txt(df["ean"]),
+        "codigo": _txt(df["codigo articulo"]),
+        "descripcion": _txt(df["descripcion"]),
+        "upb": df["unidades por bulto"].map(_to_num),
+        "bultos": df["bultos"].map(_to_num),
+        "cantidad": df["cantidad"].map(_to_num),
+    })
+    out["cantidad_total"] = (out["bultos"] * out["upb"]) + out["cantidad"]
+
+    fechas = to_date_series(df["fecha de vencimiento"])
+    out["fecha_venc"] = fechas.map(lambda d: d.isoformat() if d else None)
+
+    fi = df["fecha de ingreso"].astype(object)
+    out["fecha_ingreso"] = fi.where(fi.notna(), None)
+    return out
+
 
-    # ---- Insertar inventario
+def _iter_vencimientos(path_excel: str, chunk_size: int) -> Iterable[pd.DataFrame]:
+    """Hoja 'vencimientos' por lotes, ya preparados (memoria acotada a chunk_size)."""
+    for batch in workbook_cache.iter_batches(path_excel, "vencimientos", batch_size=chunk_size):
+        yield _preparar_vencimientos(batch)
+
+
+def _grabar_inventario(
+    conn,
+    resumen: Dict[str, Any],
+    batches: Iterable[pd.DataFrame],
+    sucursal_id: int,
+    responsable_id: int,
+    archivo_hash: str,
+    progress: Optional[Callable] = None,
+) -> Tuple[int, int]:
+    """
+    Graba cabecera, filas, stock y movimientos sobre la conexión recibida,
+    lote por lote. Devuelve (inventory_id, filas grabadas).
+    progress(filas, total) se llama después de cada lote (puede lanzar Cancelled).
+    """
     inv_id = inventory_dao.insert_inventory(
-        nombre=nombre,
-        observacion=observacion,
-        fecha_creacion=fecha_creacion,
-        fecha_exportacion=fecha_exportacion,
-        tipo=tipo,
-        total_filas=total_filas or 0,
+        nombre=resumen["nombre"],
+        observacion=resumen["observacion"],
+        fecha_creacion=resumen["fecha_creacion"],
+        fecha_exportacion=resumen["fecha_exportacion"],
+        tipo=resumen["tipo"],
+        total_filas=resumen["total_filas"] or 0,
         sucursal_id=sucursal_id,
         responsable_id=responsable_id,
         archivo_hash=archivo_hash,
+        conn=conn,
     )
+    origen = f"import:{inv_id}"
+    total = resumen["total_filas"] or None
 
-    # ---- Leer 'vencimientos'
-    df = pd.read_excel(path_excel, sheet_name="vencimientos")
-    df.columns = canonicalize_columns(df.columns)
-    for col in VENC_REQ:
-        if col not in df.columns:
-            df[col] = None
+    n = 0
+    if progress:
+        progress(0, total)
+    for df in batches:
+        item_ids = item_dao.resolve_many(
+            zip(df["codigo"], df["ean"], df["descripcion"]), conn=conn)
+        totales = df["cantidad_total"].tolist()
+        fechas = df["fecha_venc"].tolist()
 
-    df["unidades por bulto"] = df["unidades por bulto"].map(_to_num)
-    df["bultos"] = df["bultos"].map(_to_num)
-    df["cantidad"] = df["cantidad"].map(_to_num)
-
-    # ---- Recorrido por filas
-    for _, row in df.iterrows():
-        ean = (str(row["ean"]).strip() if pd.notna(row["ean"]) else "")
-        codigo = (str(row["codigo articulo"]).strip()
-                  if pd.notna(row["codigo articulo"]) else "")
-        desc = (str(row["descripcion"]).strip()
-                if pd.notna(row["descripcion"]) else "")
-
-        upb = _to_num(row["unidades por bulto"])
-        bultos = _to_num(row["bultos"])
-        cantidad = _to_num(row["cantidad"])
-
-        fecha_venc = to_date(row["fecha de vencimiento"])
-        fecha_ing = row["fecha de ingreso"]
-
-        item_id = item_dao.get_or_create(codigo or None, desc, ean or None)
-        cantidad_total = (bultos * upb) + cantidad
-
-        inventory_dao.insert_inventory_row(
-            inventory_id=inv_id,
-            item_id=item_id,
-            upb=upb,
-            bultos=bultos,
-            cantidad=cantidad,
-            cantidad_total=cantidad_total,
-            fecha_venc=fecha_venc,
-            fecha_ingreso=fecha_ing,
+        inventory_dao.bulk_insert_rows(
+            inv_id,
+            zip(item_ids, df["upb"].tolist(), df["bultos"].tolist(), df["cantidad"].tolist(),
+                totales, fechas, df["fecha_ingreso"].tolist()),
+            conn=conn,
         )
-
-        stock_dao.upsert_stock(
-            item_id=item_id,
-            location_id=sucursal_id,
-            lote=None,
-            fecha_venc=fecha_venc.isoformat() if fecha_venc else None,
-            delta=cantidad_total,
+        stock_dao.apply_deltas(
+            ((item_id, sucursal_id, None, fv, total)
+             for item_id, fv, total in zip(item_ids, fechas, totales)),
+            conn=conn,
+        )
+        movement_dao.bulk_insert_movements(
+            (("import", item_id, sucursal_id, total, None, fv, origen)
+             for item_id, fv, total in zip(item_ids, fechas, totales)),
+            conn=conn,
         )
+        n += len(df)
+        if progress:
+            progress(n, total)
+    return inv_id, n
+
+
+def importar_excel_bulk(
+    path_excel: str,
+    sucursal_nombre: Optional[str] = None,
+    responsable_nombre: Optional[str] = None,
+    sucursal_id: Optional[int] = None,
+    responsable_id: Optional[int] = None,
+    chunk_size: int = reader.DEFAULT_BATCH,
+    progress: Optional[Callable] = None,
+) -> Dict[str, Any]:
+    """
+    Importa el Excel (hojas: 'resumen' y 'vencimientos') en UNA conexión y UNA transacción.
+    Si algo falla a mitad de camino se revierte todo (no quedan inventarios a medias).
+    La hoja 'vencimientos' se lee y graba de a chunk_size filas.
+    progress(filas, total): avance por lote (ver app.utils.progress); si lanza
+    Cancelled la importación se revierte completa.
+    Devuelve {"status", "inventory_id", "rows", "seconds", "rows_per_sec"}.
+    """
+    t0 = time.perf_counter()
+    resumen = _leer_resumen(path_excel)
+    _check_duplicate(resumen)  # antes de leer la hoja grande
+    archivo_hash = workbook_cache.file_hash(path_excel)
+
+    with transaction() as conn:
+        # ---- Duplicado otra vez, ya dentro de la transacción (evita carreras)
+        _check_duplicate(resumen, conn=conn)
+
+        # ---- Resolver sucursal y responsable (por id o por nombre)
+        if sucursal_id is None:
+            sucursal_nombre = (sucursal_nombre or "Sucursal 1").strip()
+            sucursal_id = location_dao.ensure_location(sucursal_nombre, "sucursal", conn=conn)
+        if responsable_id is None:
+            responsable_nombre = (responsable_nombre or "Sistema").strip()
+            responsable_id = responsible_dao.ensure_responsible(responsable_nombre, "", conn=conn)
 
-        movement_dao.insert_movement(
-            tipo="import",
-            item_id=item_id,
-            location_id=sucursal_id,
-            delta=cantidad_total,
-            lote=None,
-            fecha_venc=fecha_venc.isoformat() if fecha_venc else None,
-            origen=f"import:{inv_id}",
+        inv_id, rows = _grabar_inventario(
+            conn, resumen, _iter_vencimientos(path_excel, chunk_size),
+            sucursal_id, responsable_id, archivo_hash, progress=progress,
         )
 
-    return inv_id
+    secs = time.perf_counter() - t0
+    return {
+        "status": "ok",
+        "inventory_id": inv_id,
+        "rows": rows,
+        "seconds": round(secs, 3),
+        "rows_per_sec": round(rows / secs, 1) if secs > 0 else None,
+    }
+
+
+def importar_excel(
+    path_excel: str,
+    # Soporta ambas variantes: por *nombre* o por *id* (backward compatible)
+    sucursal_nombre: Optional[str] = None,
+    responsable_nombre: Optional[str] = None,
+    sucursal_id: Optional[int] = None,
+    responsable_id: Optional[int] = None,
+) -> int:
+    """
+    Importa el Excel (hojas: 'resumen' y 'vencimientos').
+    Valida duplicados por (nombre + fecha_creacion + fecha_exportacion).
+    Inserta: inventories, inventory_rows, upsert a stock y registra movements.
+    Devuelve el inventory_id creado (ver importar_excel_bulk para las métricas).
+    """
+    res = importar_excel_bulk(
+        path_excel,
+        sucursal_nombre=sucursal_nombre,
+        responsable_nombre=responsable_nombre,
+        sucursal_id=sucursal_id,
+        responsable_id=responsable_id,
+    )
+    return res["inventory_id"]
+
+
+def undo_inventories(inv_ids: Iterable[int]) -> Dict[str, Any]:
+    """
+    Deshace importaciones completas, en UNA transacción (todo o nada):
+    - resta del stock lo que sumaron (un solo INSERT ... ON CONFLICT agregado),
+    - registra los movimientos 'reversa:<id>' (un solo INSERT ... SELECT),
+    - borra sus movimientos 'import:<id>', sus filas y la cabecera.
+    ValueError si algún id no existe (y no se toca nada).
+    Devuelve {"inventory_ids", "rows", "stock_keys", "seconds"}.
+    """
+    t0 = time.perf_counter()
+    ids = sorted({int(i) for i in inv_ids})
+    if not ids:
+        raise ValueError("No se indicó ningún inventario para deshacer.")
+
+    with transaction() as conn:
+        existentes = inventory_dao.inventory_locations(ids, conn=conn)
+        faltan = [i for i in ids if i not in existentes]
+        if faltan:
+            raise ValueError(f"No existe inventario id={', '.join(map(str, faltan))}")
+
+        stock_keys = stock_dao.revert_inventories(ids, conn=conn)
+        movement_dao.insert_inventory_reversals(ids, conn=conn)
+        movement_dao.delete_by_origen([f"import:{i}" for i in ids], conn=conn)
+        rows = inventory_dao.delete_inventories(ids, conn=conn)
+
+    return {
+        "inventory_ids": ids,
+        "rows": rows,
+        "stock_keys": stock_keys,
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+
+
+def undo_inventory(inv_id: int) -> Dict[str, Any]:
+    """Deshace una importación (ver undo_inventories)."""
+    return undo_inventories([inv_id])
+
+
+# ---------------------------------------------------------------------------
+# Importación de una carpeta completa (un inventario por sucursal)
+# ---------------------------------------------------------------------------
+
+def _parse_inventory_file(path_excel: str) -> Tuple[pd.DataFrame, str, float]:
+    """
+    Trabajo de CPU de un archivo (corre en un proceso hijo): lee y prepara 'vencimientos'
+    y calcula el hash (la única vez que se calcula). Devuelve (df, archivo_hash, segundos).
+    """
+    t0 = time.perf_counter()
+    df = _preparar_vencimientos(reader.read_sheet(path_excel, "vencimientos"))
+    archivo_hash = workbook_cache.file_hash(path_excel)
+    return df, archivo_hash, time.perf_counter() - t0
+
+
+def importar_carpeta(
+    directory: str,
+    sucursal_nombre: Optional[str] = None,
+    responsable_nombre: Optional[str] = None,
+    pattern: str = "*.xlsx",
+    workers: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Importa todos los Excel de inventario de una carpeta.
+    - Sucursal: sucursal_nombre para todos, o si es None el nombre del archivo (sin extensión).
+    - Duplicados: se descartan leyendo sólo 'resumen' (sin hashear el archivo),
+      antes del parseo pesado.
+    - El parseo corre en un pool de procesos; un único escritor (este proceso)
+      graba cada inventario en su propia transacción.
+    Devuelve un resumen por archivo: file, status (ok/duplicado/error), inventory_id,
+    rows, seconds y error.
+    """
+    files = sorted(str(p) for p in Path(directory).glob(pattern) if not p.name.startswith("~$"))
+    results: Dict[str, Dict[str, Any]] = {
+        f: {"file": f, "status": None, "inventory_id": None, "rows": 0, "seconds": 0.0, "error": None}
+        for f in files
+    }
+
+    # ---- Descartar duplicados antes de parsear (el hash lo calcula cada proceso hijo)
+    resumenes: Dict[str, Dict[str, Any]] = {}
+    for f in files:
+        t0 = time.perf_counter()
+        try:
+            resumen = _datos_resumen(reader.read_sheet(f, "resumen"))
+            _check_duplicate(resumen)
+            resumenes[f] = resumen
+        except DuplicateInventoryError as e:
+            results[f].update(status="duplicado", error=str(e))
+        except Exception as e:
+            results[f].update(status="error", error=str(e))
+        results[f]["seconds"] = round(time.perf_counter() - t0, 3)
+
+    responsable_nombre = (responsable_nombre or "Sistema").strip()
+
+    # ---- Parseo en paralelo, escritura serializada
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_parse_inventory_file, f): f for f in resumenes}
+        for fut in as_completed(futures):
+            f = futures[fut]
+            res = results[f]
+            t0 = time.perf_counter()
+            try:
+                df, archivo_hash, parse_secs = fut.result()
+                resumen = resumenes[f]
+                nombre_suc = (sucursal_nombre or Path(f).stem).strip()
+                with transaction() as conn:
+                    _check_duplicate(resumen, conn=conn)
+                    suc_id = location_dao.ensure_location(nombre_suc, "sucursal", conn=conn)
+                    resp_id = responsible_dao.ensure_responsible(responsable_nombre, "", conn=conn)
+                    inv_id, rows = _grabar_inventario(
+                        conn, resumen, [df], suc_id, resp_id, archivo_hash)
+                res.update(status="ok", inventory_id=inv_id, rows=rows)
+                res["seconds"] += parse_secs
+            except DuplicateInventoryError as e:
+                res.update(status="duplicado", error=str(e))
+            except Exception as e:
+                res.update(status="error", error=str(e))
+            res["seconds"] = round(res["seconds"] + time.perf_counter() - t0, 3)
+
+    return [results[f] for f in files]
@@ -0,0 +1,97 @@
+# app/services/maintenance_service.py
+"""
+Operaciones de mantenimiento de la base (las de tools/dev_reset.py y `python -m app reset`).
+Cada función devuelve un dict con lo que hizo; la presentación queda para quien llama.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from app.dao import item_dao, sales_dao, stock_dao
+from app.dao.connection import bump_data_version, get_conn, init_db, transaction
+
+# Tablas que borra reset_all (después init_db recrea schema + seed)
+RESET_TABLES = ["inventory_rows", "movements", "lot_summary", "stock", "inventories",
+                "items", "items_fts", "responsibles", "locations"]
+# Recalcula el lote de cada movimiento borrado (ver db/schema.sql)
+LOT_SUMMARY_DEL_TRIGGER = "trg_movements_lot_summary_del"
+
+
+def clear_inventories_and_stock() -> Dict[str, Any]:
+    """
+    Elimina:
+      - inventory_rows
+      - movements
+      - inventories
+      - stock
+      - lot_summary
+    Deja: locations, responsibles, items (para no perder maestros).
+    Todo en una transacción. lot_summary se vacía de una vez: el trigger que la
+    recalcula lote por lote al borrar movimientos se quita mientras se borran
+    (y se vuelve a crear con el mismo SQL al final).
+    Devuelve {tabla: filas borradas}.
+    """
+    deleted = {}
+    with transaction() as conn:
+        cur = conn.cursor()
+        deleted["lot_summary"] = cur.execute("DELETE FROM lot_summary").rowcount
+        trg = cur.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+            (LOT_SUMMARY_DEL_TRIGGER,),
+        ).fetchone()
+        cur.execute(f"DROP TRIGGER IF EXISTS {LOT_SUMMARY_DEL_TRIGGER}")
+        for t in ["inventory_rows", "movements", "inventories", "stock"]:
+            deleted[t] = cur.execute(f"DELETE FROM {t}").rowcount
+        if trg is not None:
+            cur.execute(trg[0])
+    return {"deleted": deleted}
+
+
+def delete_inventory(*inv_ids: int) -> Dict[str, Any]:
+    """
+    Elimina una o varias importaciones revirtiendo su impacto en stock
+    (import_service.undo_inventories: una sola transacción, operaciones por conjunto).
+    ValueError si algún inventario no existe.
+    """
+    # import_service carga pandas: sólo cuando hace falta
+    from app.services.import_service import undo_inventories
+    return undo_inventories(inv_ids)
+
+
+def reset_all() -> Dict[str, Any]:
+    """
+    Borra TODO y vuelve a crear el schema + seed (Sucursal 1, Sistema).
+    Útil cuando querés arrancar de cero.
+    """
+    # Drop todas las tablas conocidas y recrear schema
+    with get_conn() as conn:
+        cur = conn.cursor()
+        # Intento rápido de drop; si no existen, no pasa nada
+        for t in RESET_TABLES:
+            try:
+                cur.execute(f"DROP TABLE IF EXISTS {t}")
+            except Exception:
+                pass
+        # DROP TABLE no cuenta como escritura: avisar a las caches de lecturas
+        bump_data_version(conn=conn)
+        # ...y a la cache de ids de items (también a la de otros procesos)
+        cur.execute("UPDATE items_epoch SET epoch = epoch + 1 WHERE id = 1")
+        conn.commit()
+        # Schema incompleto: que init_db lo vuelva a aplicar
+        conn.execute("PRAGMA user_version = 0")
+
+    # Recrear schema + seed
+    init_db()
+    # Los ids de items cacheados en memoria apuntan a la tabla borrada
+    item_dao.clear_cache()
+    return {"dropped": list(RESET_TABLES)}
+
+
+def rebuild_lot_summary() -> Dict[str, Any]:
+    """Recalcula lot_summary completo desde movements (import/recepcion)."""
+    return {"lots": stock_dao.rebuild_lot_summary()}
+
+
+def rebuild_sales_daily() -> Dict[str, Any]:
+    """Recalcula sales_daily (totales diarios y acumulados) desde sales."""
+    return {"days": sales_dao.rebuild_daily()}
@@ -1,57 +1,146 @@
 # app/services/sales_service.py
 from __future__ import annotations
+import hashlib
+import numpy as np
 import pandas as pd
-from datetime import date
-from calendar import monthrange
-from typing import Optional, Dict, Any, Tuple, List, Iterable, DefaultDict
-from collections import defaultdict
+from typing import Optional, Dict, Any, Callable, Tuple, List, Iterable
 
 from app.dao import sales_dao, location_dao
-from app.utils.normalize import canonicalize_columns
-from app.utils.dates import to_date
-from app.utils.hashing import md5_file
-
-def _to_num(val) -> float:
-    if val is None:
-        return 0.0
-    if isinstance(val, (int, float)):
-        return float(val)
-    s = str(val).strip()
-    # 2.999,00 -> 2999.00 ; 4,000 -> 4.0
-    if "," in s:
-        s = s.replace(".", "").replace(",", ".")
-    else:
-        s = s.replace(",", "")
-    try:
-        return float(s)
-    except Exception:
-        import pandas as _pd
-        return float(_pd.to_numeric([val], errors="coerce").fillna(0.0)[0])
+from app.dao.connection import transaction
+from app.excel import reader, workbook_cache
+from app.utils.dates import to_date_series
+
+def _to_num_series(s: pd.Series) -> pd.Series:
+    """
+    Números con formato argentino sobre la columna entera:
+    2.999,00 -> 2999.00 ; 4,000 -> 4.0 ; 1.5 (sin coma) queda como está.
+    Vacío o inválido → 0.
+    """
+    if pd.api.types.is_numeric_dtype(s.dtype):
+        return s.astype(float).fillna(0.0)
+    # Se parsea cada texto distinto una sola vez (las cantidades se repiten mucho)
+    codes, uniques = pd.factorize(s)
+    txt = pd.Series(uniques, dtype="string").str.strip()
+    has_comma = txt.str.contains(",", regex=False).fillna(False)
+    txt = txt.where(
+        ~has_comma,
+        txt.str.replace(".", "", regex=False).str.replace(",", ".", regex=False),
+    )
+    nums = pd.to_numeric(txt, errors="coerce").astype("Float64").fillna(0.0).to_numpy(dtype=float)
+    nums = np.append(nums, 0.0)  # código -1 (vacío) → 0
+    return pd.Series(nums[codes], index=s.index)
+
+def _iso_dates(s: pd.Series) -> pd.Series:
+    """date/None → 'YYYY-MM-DD'/None, convirtiendo una vez por fecha distinta."""
+    codes, uniques = pd.factorize(s)
+    iso = np.array([d.isoformat() for d in uniques] + [None], dtype=object)
+    return pd.Series(iso[codes], index=s.index, dtype=object)  # código -1 → None
 
 def _months_in_df(df: pd.DataFrame, col_fecha: str) -> List[Tuple[int,int]]:
-    meses = sorted({(d.year, d.month) for d in df[col_fecha] if pd.notna(d)})
+    # col_fecha en ISO: alcanza con los distintos 'YYYY-MM'
+    meses = sorted({(int(f[:4]), int(f[5:7])) for f in df[col_fecha].dropna().unique()})
     return meses
 
-def _delete_by_months(meses: Iterable[Tuple[int,int]], loc_ids: Optional[Iterable[int]]):
+def _delete_by_months(meses: Iterable[Tuple[int,int]], loc_ids: Optional[Iterable[int]], conn=None):
     meses = list(meses)
     if not meses:
         return
     for (y, m) in meses:
-        sales_dao.delete_month(y, m, loc_ids if loc_ids else None)
+        sales_dao.delete_month(y, m, loc_ids if loc_ids else None, conn=conn)
+
+def _check_sales_columns(cols) -> str:
+    """Valida las columnas mínimas y devuelve cuál es la de código."""
+    col_cod = "codigo articulo" if "codigo articulo" in cols else "codigo"
+    for c in ("sucursal", "fecha", "cantidad"):
+        if c not in cols:
+            raise ValueError(f"Falta columna '{c}' en el Excel de ventas.")
+    if col_cod not in cols:
+        raise ValueError("Falta columna 'codigo' en el Excel de ventas.")
+    return col_cod
+
+def _prepare_sales_batch(df: pd.DataFrame, col_suc: str, col_cod: str, col_fec: str, col_can: str) -> pd.DataFrame:
+    """Parsea y filtra un lote, y lo devuelve agrupado por (sucursal, código, fecha ISO)."""
+    df = df[[col_suc, col_cod, col_fec, col_can]].copy()
+    df[col_suc] = df[col_suc].fillna("").astype(str).str.strip()
+    df[col_cod] = df[col_cod].fillna("").astype(str).str.strip()
+    df[col_fec] = _iso_dates(to_date_series(df[col_fec]))
+    df[col_can] = _to_num_series(df[col_can])
+
+    # Filtrar válidos
+    df = df[(df[col_suc] != "") & (df[col_cod] != "") & (df[col_fec].notnull()) & (df[col_can] > 0)]
+    return df.groupby([col_suc, col_cod, col_fec], as_index=False)[col_can].sum()
+
+def _location_ids(suc: pd.Series) -> np.ndarray:
+    """Sucursales (texto) → ids numéricos del ERP; falla con la primera inválida."""
+    bad = ~suc.str.fullmatch(r"\d+")
+    if bad.any():
+        raise ValueError(f"Sucursal inválida '{suc[bad].iloc[0]}'. Debe ser un ID numérico (ERP).")
+    return suc.astype(np.int64).to_numpy()
+
+def _day_buckets(loc_ids: np.ndarray, fechas: np.ndarray, item_ids: np.ndarray, cantidades: np.ndarray):
+    """
+    Agrupa las filas por día (sucursal, fecha) y calcula la huella de cada uno:
+    md5 de los pares (item_id, cantidad) ordenados. Devuelve
+    {(location_id, fecha_iso): (digest, índices de las filas de ese día)}.
+    """
+    fec_codes, _ = pd.factorize(fechas, sort=True)
+    order = np.lexsort((item_ids, fec_codes, loc_ids))
+    loc_s, fec_c = loc_ids[order], fec_codes[order]
+    items_s = np.ascontiguousarray(item_ids[order], dtype=np.int64)
+    cant_s = np.ascontiguousarray(np.round(cantidades[order], 6))
+
+    cortes = np.flatnonzero((loc_s[1:] != loc_s[:-1]) | (fec_c[1:] != fec_c[:-1])) + 1
+    bounds = np.concatenate(([0], cortes, [len(order)]))
+    out = {}
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        h = hashlib.md5(items_s[a:b].tobytes())
+        h.update(cant_s[a:b].tobytes())
+        out[(int(loc_s[a]), str(fechas[order[a]]))] = (h.hexdigest(), order[a:b])
+    return out
+
+def _parse_sales(path: str, chunk_size: int, progress: Optional[Callable]) -> pd.DataFrame:
+    col_suc, col_fec, col_can = "sucursal", "fecha", "cantidad"
+    col_cod = None
+    # Lectura por lotes: cada lote se parsea, filtra y pre-agrupa; sólo quedan
+    # en memoria las sumas por (sucursal, código, fecha).
+    parts = []
+    leidas = 0
+    for batch in reader.iter_batches(path, batch_size=chunk_size, dtype=str):
+        if col_cod is None:
+            col_cod = _check_sales_columns(batch.columns)
+        parts.append(_prepare_sales_batch(batch, col_suc, col_cod, col_fec, col_can))
+        leidas += len(batch)
+        if progress:
+            progress(leidas)
+
+    if not parts:
+        raise ValueError("No se detectaron fechas válidas en el archivo de ventas.")
+    df = (pd.concat(parts, ignore_index=True)
+            .groupby([col_suc, col_cod, col_fec], as_index=False)[col_can].sum())
+    return df.rename(columns={col_cod: "codigo"})
 
-def _iter_rows_grouped(df: pd.DataFrame, col_suc: str, col_cod: str, col_fec: str, col_can: str):
-    # Devuelve (loc_id, codigo, fecha_iso, cantidad_sum)
-    grp = df.groupby([col_suc, col_cod, col_fec], as_index=False)[col_can].sum()
-    for _, r in grp.iterrows():
-        loc_txt = r[col_suc]
-        if not str(loc_txt).isdigit():
-            raise ValueError(f"Sucursal inválida '{loc_txt}'. Debe ser un ID numérico (ERP).")
-        yield int(loc_txt), str(r[col_cod]).strip(), r[col_fec].isoformat(), float(r[col_can])
+def read_sales(path: str, chunk_size: int = reader.DEFAULT_BATCH,
+               progress: Optional[Callable] = None) -> pd.DataFrame:
+    """
+    Ventas del archivo ya parseadas y agrupadas: columnas sucursal, codigo, fecha (ISO)
+    y cantidad (suma). Se parsea una sola vez por versión del archivo (workbook_cache):
+    la vista previa de meses y la importación comparten el resultado.
+    progress(filas) sólo se llama si hay que leer el archivo. No modificar el DataFrame.
+    """
+    return workbook_cache.get_parsed(
+        path, "ventas", lambda: _parse_sales(path, chunk_size, progress))
+
+def sales_months(path: str, progress: Optional[Callable] = None) -> List[Tuple[int, int]]:
+    """Meses (año, mes) presentes en el archivo de ventas (deja el parseo en cache)."""
+    return _months_in_df(read_sales(path, progress=progress), "fecha")
 
 def import_sales_from_excel(
     path: str,
     import_name: Optional[str] = None,
-    allow_multi_month: bool = False
+    allow_multi_month: bool = False,
+    chunk_size: int = reader.DEFAULT_BATCH,
+    mode: str = "replace",
+    progress: Optional[Callable] = None,
 ) -> Dict[str, Any]:
     """
     Importa ventas desde un Excel:
@@ -62,29 +151,22 @@ def import_sales_from_excel(
       - Fecha
       - Código (o 'Código Artículo')
       - Cantidad
+    El archivo se lee de a chunk_size filas (memoria acotada al lote, no al archivo),
+    o se toma ya agrupado de la cache si la vista previa lo leyó (read_sales).
+    Todo el parseo es por columna; la grabación es una sola transacción.
+    mode:
+      - "replace": delete+insert de los meses del archivo (comportamiento clásico).
+      - "upsert": compara la huella de cada día (sucursal, fecha) con la grabada y
+        reescribe sólo los días nuevos o cambiados; borra los días del mes que ya
+        no vienen en el archivo. Resultado final idéntico a "replace".
+    El resultado incluye "days": {added, changed, unchanged, removed}.
+    progress(filas, total): primero cuenta filas leídas (total None; no hay lectura si
+    el archivo ya estaba en cache), después filas grabadas sobre el total a grabar. Si lanza Cancelled no queda nada grabado.
     """
-    df = pd.read_excel(path, dtype=str)
-    df.columns = canonicalize_columns(df.columns)
-
-    col_suc = "sucursal"
-    col_fec = "fecha"
-    col_can = "cantidad"
-    col_cod = "codigo articulo" if "codigo articulo" in df.columns else "codigo"
-
-    for c in (col_suc, col_fec, col_can):
-        if c not in df.columns:
-            raise ValueError(f"Falta columna '{c}' en el Excel de ventas.")
-    if col_cod not in df.columns:
-        raise ValueError("Falta columna 'codigo' en el Excel de ventas.")
-
-    # Parseo
-    df[col_suc] = df[col_suc].fillna("").astype(str).str.strip()
-    df[col_cod] = df[col_cod].fillna("").astype(str).str.strip()
-    df[col_fec] = df[col_fec].map(to_date)
-    df[col_can] = df[col_can].map(_to_num)
-
-    # Filtrar válidos
-    df = df[(df[col_suc] != "") & (df[col_cod] != "") & (df[col_fec].notnull()) & (df[col_can] > 0)].copy()
+    if mode not in ("replace", "upsert"):
+        raise ValueError(f"Modo de importación desconocido: '{mode}'.")
+    col_suc, col_cod, col_fec, col_can = "sucursal", "codigo", "fecha", "cantidad"
+    df = read_sales(path, chunk_size=chunk_size, progress=progress)
 
     # Detectar meses
     meses = _months_in_df(df, col_fec)
@@ -94,30 +176,85 @@ def import_sales_from_excel(
     if not allow_multi_month and len(meses) > 1:
         raise ValueError(f"El archivo contiene múltiples meses: {meses}. Activá la opción 'Permitir múltiples meses' para importarlo.")
 
-    # Crear import_id (anti-duplicados por hash del archivo)
-    h = md5_file(path)
-    import_id = sales_dao.create_sales_import(import_name or path, h)
-    if import_id is None:
-        return {"status": "skipped", "reason": "archivo ya importado (hash duplicado)", "rows": 0}
+    # Arrays de la grabación
+    loc_ids = _location_ids(df[col_suc])
+    cod_codes, cod_uniques = pd.factorize(df[col_cod])
+    fechas = df[col_fec].to_numpy(dtype=object)
+    cantidades = df[col_can].to_numpy(dtype=float)
+
+    h = workbook_cache.file_hash(path)
+    with transaction() as conn:
+        # Crear import_id (anti-duplicados por hash del archivo)
+        import_id = sales_dao.create_sales_import(import_name or path, h, conn=conn)
+        if import_id is None:
+            return {"status": "skipped", "reason": "archivo ya importado (hash duplicado)", "rows": 0}
+
+        # Ids de sucursal presentes
+        suc_ids = sorted(int(x) for x in np.unique(loc_ids))
 
-    # Ids de sucursal presentes
-    suc_ids = sorted({int(s) for s in df[col_suc].unique() if str(s).isdigit()}) or None
+        # Sucursales por ID (una pasada) e items por código distinto
+        location_dao.ensure_ids(suc_ids, conn=conn)
+        ids_por_codigo = np.asarray(sales_dao.resolve_item_ids(cod_uniques, conn=conn), dtype=np.int64)
+        item_ids = ids_por_codigo[cod_codes]
 
-    # Borrar por mes/meses
-    _delete_by_months(meses, suc_ids)
+        buckets = _day_buckets(loc_ids, fechas, item_ids, cantidades)
 
-    # Insertar filas (resuelve item_id por código y asegura sucursales por ID)
-    rows = []
-    for loc_id, codigo, fecha_iso, cant in _iter_rows_grouped(df, col_suc, col_cod, col_fec, col_can):
-        location_dao.create_with_id(loc_id, f"Suc {loc_id}", "sucursal")
-        item_id = sales_dao.resolve_item_id(codigo)
-        rows.append((loc_id, item_id, fecha_iso, cant))
+        # Días ya grabados (con su huella) en los meses/sucursales del archivo
+        stored = {}
+        for (y, m) in meses:
+            stored.update(sales_dao.month_days(y, m, suc_ids, conn=conn))
+        removed = [k for k in stored if k not in buckets]
 
-    sales_dao.bulk_insert_rows(import_id, rows)
+        if mode == "replace":
+            # Borrar por mes/meses y grabar todo
+            _delete_by_months(meses, suc_ids, conn=conn)
+            to_write = list(buckets)
+        else:
+            to_write = [k for k, (dig, _) in buckets.items() if stored.get(k) != dig]
+            sales_dao.delete_days(to_write + removed, conn=conn)
+
+        idx = (np.concatenate([buckets[k][1] for k in to_write])
+               if to_write else np.array([], dtype=np.int64))
+        if progress:
+            progress(0, len(idx))
+        for start in range(0, len(idx), chunk_size):
+            part = idx[start:start + chunk_size]
+            sales_dao.bulk_insert_rows(
+                import_id,
+                zip(loc_ids[part].tolist(), item_ids[part].tolist(),
+                    fechas[part].tolist(), cantidades[part].tolist()),
+                conn=conn,
+            )
+            if progress:
+                progress(start + len(part), len(idx))
+        sales_dao.save_day_digests(
+            ((k[0], k[1], buckets[k][0], len(buckets[k][1])) for k in to_write),
+            conn=conn,
+        )
+
+        # Rollup diario: sólo los meses con días reescritos o borrados
+        if mode == "replace":
+            touched = meses
+        else:
+            touched = {(int(f[:4]), int(f[5:7])) for (_, f) in to_write + removed}
+        sales_dao.refresh_daily(touched, suc_ids, conn=conn)
+
+    # Misma cuenta en ambos modos (en "replace" igual se reescribe todo el mes)
+    added = sum(1 for k in buckets if k not in stored)
+    unchanged = sum(1 for k, (dig, _) in buckets.items() if stored.get(k) == dig)
+    days = {
+        "added": added,
+        "changed": len(buckets) - added - unchanged,
+        "unchanged": unchanged,
+        "removed": len(removed),
+    }
 
     return {
         "status": "ok",
         "import_id": import_id,
-        "rows": len(rows),
+        "rows": len(df),
+        "rows_written": int(len(idx)),
+        "mode": mode,
+        "days": days,
         "months": [{"year": y, "month": m} for (y, m) in meses]
     }
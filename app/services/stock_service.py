@@ -0,0 +1,91 @@
+# app/services/stock_service.py
+"""
+Consultas de stock y exportaciones (vencimientos y stock actual) a Excel/CSV.
+Las exportaciones leen la base por páginas y escriben en streaming
+(app.excel.writer): sirven igual desde la UI que desde `python -m app`.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from app.dao import location_dao, stock_dao
+from app.excel import writer
+from app.services import expiry_service
+
+OUTPUT_DIR = Path(__file__).resolve().parents[2] / "data" / "outputs"
+
+EXPIRY_EXPORT_COLUMNS = (
+    "sucursal", "codigo", "descripcion", "ean", "lote",
+    "recepcion", "fecha_venc", "dias_restantes",
+    "ingresado_lote", "ventas_desde_recepcion", "restante_estimado",
+    "cantidad", "estado", "ultima_carga",
+)
+STOCK_EXPORT_COLUMNS = ("sucursal", "codigo", "descripcion", "ean", "lote", "fecha_venc", "cantidad")
+TITLES = {**expiry_service.COLUMN_TITLES, "sucursal": "Sucursal"}
+
+
+def default_export_path(kind: str, ext: str = ".xlsx") -> Path:
+    """data/outputs/<kind>_<fecha_hora><ext> (p.ej. vencimientos_20250815_0930.xlsx)."""
+    return OUTPUT_DIR / f"{kind}_{datetime.now():%Y%m%d_%H%M}{ext}"
+
+
+def _location_names() -> Dict[int, str]:
+    return {r["id"]: r["nombre"] for r in location_dao.list_locations()}
+
+
+def _with_names(rows: Iterator[Dict[str, Any]], names: Dict[int, str]) -> Iterator[Dict[str, Any]]:
+    for r in rows:
+        r["sucursal"] = names.get(r["location_id"], str(r["location_id"]))
+        yield r
+
+
+def export_expiries(
+    path=None,
+    location_id: Optional[int] = None,
+    q: Optional[str] = None,
+    include_expired: bool = True,
+    by_branch: bool = False,
+    estados: Optional[Iterable[str]] = None,
+    limit: Optional[int] = None,
+    progress: Optional[Callable] = None,
+) -> Dict[str, Any]:
+    """
+    Exporta la vista de vencimientos (mismos filtros que la pantalla) a .xlsx o .csv,
+    con el color de cada estado en la celda 'Estado'. by_branch: una hoja (o un
+    CSV) por sucursal. estados/limit: sólo esos estados / las primeras N filas.
+    Sin path, va a data/outputs. Devuelve el resumen de writer.write_report
+    ({"files", "rows", "sheets"}).
+    """
+    names = _location_names()
+    rows = expiry_service.iter_expiries(location_id, q, include_expired)
+    if estados:
+        estados = set(estados)
+        rows = (r for r in rows if r["estado"] in estados)
+    if limit is not None:
+        rows = islice(rows, limit)
+    rows = _with_names(rows, names)
+    return writer.write_report(
+        path or default_export_path("vencimientos"), rows, EXPIRY_EXPORT_COLUMNS, TITLES,
+        split_by="location_id" if by_branch else None, split_names=names,
+        sheet_name="vencimientos", fill_column="estado", fills=expiry_service.STATE_COLORS,
+        progress=progress,
+    )
+
+
+def export_stock(
+    path=None,
+    location_id: Optional[int] = None,
+    q: Optional[str] = None,
+    by_branch: bool = False,
+    progress: Optional[Callable] = None,
+) -> Dict[str, Any]:
+    """Exporta el stock actual (lotes con cantidad distinta de 0); igual que export_expiries."""
+    return writer.write_report(
+        path or default_export_path("stock"), stock_dao.iter_stock(location_id, q),
+        STOCK_EXPORT_COLUMNS, TITLES,
+        split_by="sucursal" if by_branch else None,
+        sheet_name="stock", progress=progress,
+    )
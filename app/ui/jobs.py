@@ -0,0 +1,162 @@
+# app/ui/jobs.py
+"""
+Trabajos largos fuera del hilo de Tk.
+- JobRunner: corre fn(progress) en un pool de hilos y entrega el resultado (o el
+  error) en el hilo de Tk, consultando el Future con after(). Los hilos nunca
+  tocan widgets. Los trabajos que escriben en la base (write=True) van a un
+  pool de un solo hilo: se encolan en vez de competir por el lock de SQLite.
+- JobPanel: barra de progreso + estado + botón Cancelar sobre un JobRunner.
+La cancelación es cooperativa: el trabajo recibe Progress.report como callback
+`progress` y, si se pidió cancelar, la próxima llamada lanza Cancelled (la
+transacción del servicio hace rollback).
+"""
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk
+
+from app.utils.progress import Cancelled, Progress
+
+POLL_MS = 100
+
+# Compartidos por todas las pestañas.
+# Lecturas (cargas de tablas, vistas previas, exportaciones): con WAL no se bloquean
+# entre sí ni con el escritor.
+_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="job")
+# Escrituras (importaciones): SQLite admite un solo escritor a la vez.
+_WRITE_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-write")
+
+
+class Job:
+    def __init__(self, future, progress: Progress):
+        self.future = future
+        self.progress = progress
+
+    def cancel(self):
+        self.progress.cancel()
+
+    @property
+    def done(self) -> bool:
+        return self.future.done()
+
+
+class JobRunner:
+    def __init__(self, widget):
+        self.widget = widget
+
+    def submit(self, fn, on_done=None, on_error=None, on_progress=None, write=False) -> Job:
+        """
+        fn(progress) corre en otro hilo (write=True: en el de escrituras, de a uno).
+        En el hilo de Tk:
+          - on_progress(snapshot) cada POLL_MS mientras corre,
+          - on_done(resultado) u on_error(excepción) al terminar.
+        """
+        progress = Progress()
+        pool = _WRITE_POOL if write else _POOL
+        job = Job(pool.submit(fn, progress.report), progress)
+
+        def poll():
+            if not job.done:
+                if on_progress:
+                    on_progress(progress.snapshot())
+                self.widget.after(POLL_MS, poll)
+                return
+            exc = job.future.exception()
+            if exc is None:
+                if on_done:
+                    on_done(job.future.result())
+            elif on_error:
+                on_error(exc)
+
+        self.widget.after(POLL_MS, poll)
+        return job
+
+
+class JobPanel(tk.Frame):
+    """Progreso del trabajo en curso de una pestaña (uno a la vez)."""
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.runner = JobRunner(self)
+        self._job = None
+
+        self.bar = ttk.Progressbar(self, mode="determinate", length=260, maximum=100)
+        self.bar.pack(side="left", padx=(0, 8))
+        self.btn = tk.Button(self, text="Cancelar", command=self.cancel, state="disabled")
+        self.btn.pack(side="left")
+        self.lbl = tk.Label(self, anchor="w", fg="#555")
+        self.lbl.pack(side="left", fill="x", expand=True, padx=8)
+
+    @property
+    def busy(self) -> bool:
+        return self._job is not None
+
+    def message(self, text: str):
+        self.lbl.config(text=text)
+
+    def cancel(self):
+        if self._job is not None:
+            self._job.cancel()
+            self.message("Cancelando...")
+
+    def run(self, fn, on_done=None, on_error=None, on_cancel=None, on_finish=None,
+            text="Procesando...", cancelable=True, write=False):
+        """
+        Corre fn(progress) en segundo plano (write=True si escribe en la base: espera
+        a que terminen las otras escrituras). Si ya había un trabajo en esta
+        pestaña se cancela y su resultado se descarta (no llama a nada).
+        Al terminar llama on_finish() y después on_done(resultado),
+        on_error(excepción) u on_cancel() según cómo terminó.
+        """
+        if self._job is not None:
+            self._job.cancel()
+        self.message(text)
+        self.bar.configure(mode="indeterminate", value=0)
+        self.btn.config(state="normal" if cancelable else "disabled")
+
+        def finished(job):
+            if self._job is not job:  # reemplazado por otro trabajo
+                return False
+            self._job = None
+            self.btn.config(state="disabled")
+            self.bar.configure(mode="determinate", value=0)
+            if on_finish:
+                on_finish()
+            return True
+
+        def done(res):
+            if finished(job):
+                self.message("")
+                if on_done:
+                    on_done(res)
+
+        def error(exc):
+            if not finished(job):
+                return
+            if isinstance(exc, Cancelled):
+                self.message("Cancelado.")
+                if on_cancel:
+                    on_cancel()
+            else:
+                self.message(f"Error: {exc}")
+                if on_error:
+                    on_error(exc)
+
+        job = self.runner.submit(fn, on_done=done, on_error=error,
+                                 on_progress=lambda snap: self._show(job, snap, text),
+                                 write=write)
+        self._job = job
+        return job
+
+    def _show(self, job, snap: dict, text: str):
+        if self._job is not job or job.progress.cancelled:
+            return
+        done, total = snap["done"], snap["total"]
+        if total:
+            self.bar.configure(mode="determinate", value=min(100.0, done * 100.0 / total))
+        else:
+            self.bar.configure(mode="indeterminate")
+            self.bar.step(4)
+        if done:
+            rate = f" ({snap['rows_per_sec']:,.0f} filas/s)" if snap["rows_per_sec"] else ""
+            of = f" de {total:,}" if total else ""
+            self.message(f"{text} {done:,}{of} filas{rate}")
@@ -0,0 +1,57 @@
+# app/ui/tree_sync.py
+"""
+Actualización por diferencias de un ttk.Treeview cuyas filas tienen clave estable
+(id de sucursal, id de stock...). En vez de borrar y volver a insertar todo:
+- inserta las claves nuevas, borra las que ya no están,
+- reescribe sólo las filas cuyos valores o tags cambiaron,
+- reordena con una sola llamada si cambió el orden.
+Las filas que siguen existen no se tocan: se conservan selección y scroll.
+"""
+
+
+class TreeSync:
+    def __init__(self, tree):
+        self.tree = tree
+        self._shown = {}   # iid -> (values, tags) tal como se cargaron
+        self._order = []   # iids en el orden mostrado
+
+    def sync(self, rows) -> dict:
+        """
+        rows: iterable de (clave, values, tags), en el orden a mostrar.
+        Devuelve cuántas filas se insertaron, actualizaron y borraron, y si se reordenó.
+        """
+        tree = self.tree
+        new = {}
+        order = []
+        for key, values, tags in rows:
+            iid = str(key)
+            new[iid] = (tuple(values), tuple(tags))
+            order.append(iid)
+
+        deleted = [iid for iid in self._order if iid not in new]
+        if deleted:
+            tree.delete(*deleted)
+
+        inserted = updated = 0
+        for iid in order:
+            cur = self._shown.get(iid)
+            values, tags = new[iid]
+            if cur is None:
+                tree.insert("", "end", iid=iid, values=values, tags=tags)
+                inserted += 1
+            elif cur != (values, tags):
+                tree.item(iid, values=values, tags=tags)
+                updated += 1
+
+        # Orden actual: las que quedaron (en su lugar) y las nuevas al final
+        current = [iid for iid in self._order if iid in new]
+        current += [iid for iid in order if iid not in self._shown]
+        moved = current != order
+        if moved:
+            top = tree.yview()[0]
+            tree.set_children("", *order)
+            tree.yview_moveto(top)
+
+        self._shown = new
+        self._order = order
+        return {"inserted": inserted, "updated": updated, "deleted": len(deleted), "moved": moved}
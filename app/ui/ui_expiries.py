@@ -1,15 +1,11 @@
 # app/ui/ui_expiries.py
 import tkinter as tk
-from tkinter import ttk
-from app.services.expiry_service import get_expiries
+from tkinter import filedialog, messagebox, ttk
+from app.services.expiry_service import COLUMN_TITLES, STATE_COLORS, get_expiries_page
+from app.services.stock_service import OUTPUT_DIR, default_export_path, export_expiries
 from app.dao.location_dao import list_locations
-
-STATE_COLORS = {
-    "CRITICO": "#ffdddd",
-    "PROXIMO": "#fff3cd",
-    "OK": "#ddffdd",
-    "SIN_FECHA": "#e0e0e0"
-}
+from app.ui.virtual_table import VirtualTable
+from app.ui.jobs import JobPanel
 
 class ExpiryFrame(tk.Frame):
     def __init__(self, master):
@@ -17,6 +13,7 @@ class ExpiryFrame(tk.Frame):
         self.loc_id = tk.IntVar(value=0)
         self.query_var = tk.StringVar()
         self.show_expired_var = tk.BooleanVar(value=True)
+        self.by_branch_var = tk.BooleanVar(value=False)
 
         # Filtros
         top = tk.Frame(self)
@@ -34,6 +31,8 @@ class ExpiryFrame(tk.Frame):
 
         ttk.Checkbutton(top, text="Mostrar vencidos", variable=self.show_expired_var).pack(side="left", padx=10)
         tk.Button(top, text="Actualizar vista", command=self.refresh).pack(side="left", padx=8)
+        tk.Button(top, text="Exportar...", command=self.export).pack(side="left", padx=8)
+        ttk.Checkbutton(top, text="Una hoja por sucursal", variable=self.by_branch_var).pack(side="left")
 
         # Tabla
         cols = (
@@ -42,38 +41,27 @@ class ExpiryFrame(tk.Frame):
             "ingresado_lote", "ventas_desde_recepcion", "restante_estimado",
             "cantidad", "estado", "ultima_carga"
         )
-        self.tree = ttk.Treeview(self, columns=cols, show="headings", height=20)
-
-        headers = {
-            "codigo": "Código",
-            "descripcion": "Descripción",
-            "ean": "EAN",
-            "recepcion": "Recepción",
-            "fecha_venc": "Vence",
-            "dias_restantes": "Días",
-            "ingresado_lote": "Ingresado (lote)",
-            "ventas_desde_recepcion": "Ventas desde recepción",
-            "restante_estimado": "Restante estimado (lote)",
-            "cantidad": "Stock actual",
-            "estado": "Estado",
-            "ultima_carga": "Última carga",
-        }
+        headers = {c: COLUMN_TITLES[c] for c in cols}
         widths = {
             "codigo": 120, "descripcion": 320, "ean": 130,
             "recepcion": 150, "fecha_venc": 110, "dias_restantes": 80,
             "ingresado_lote": 130, "ventas_desde_recepcion": 170, "restante_estimado": 170,
             "cantidad": 110, "estado": 110, "ultima_carga": 150
         }
-        for c in cols:
-            self.tree.heading(c, text=headers[c])
-            self.tree.column(c, width=widths[c], anchor="w")
-        self.tree.pack(fill="both", expand=True, padx=8, pady=8)
+        # Sólo se crean los items visibles; el resto se pide por páginas al scrollear
+        self.table = VirtualTable(self, cols, headers, widths, height=20, on_load=self._on_load)
+        self.table.pack(fill="both", expand=True, padx=8, pady=(8, 0))
+        self._filters = None  # filtros de lo que muestra la tabla
 
         for state, color in STATE_COLORS.items():
-            self.tree.tag_configure(state, background=color)
+            self.table.tag_configure(state, background=color)
+
+        # Estado / progreso: la primera página se consulta en segundo plano
+        self.jobs = JobPanel(self)
+        self.jobs.pack(fill="x", padx=8, pady=(2, 8))
 
         # Eventos: recargar sucursales cuando cambian en "Maestros"
-        self.winfo_toplevel().bind("<<LocationsChanged>>", lambda e: self._load_locations())
+        self.winfo_toplevel().bind("<<LocationsChanged>>", lambda e: self._load_locations(), add="+")
 
         # Cargar sucursales inicial
         self._load_locations()
@@ -103,24 +91,65 @@ class ExpiryFrame(tk.Frame):
         # opcional: refrescar inmediatamente la vista
         # self.refresh()
 
+    def _on_load(self, loaded: int, complete: bool):
+        self.jobs.message(f"{loaded} lotes" + ("" if complete else " (bajá para ver más)"))
+
     def refresh(self):
-        for i in self.tree.get_children():
-            self.tree.delete(i)
         loc = self.loc_id.get() or None
         q = self.query_var.get().strip() or None
         include_expired = self.show_expired_var.get()
-        try:
-            rows = get_expiries(loc, q, include_expired)
-        except Exception as e:
-            self.tree.insert("", "end", values=("",
-                f"No se pudo cargar: {e}", "", "", "", "", "", "", "", "", "", ""))
+
+        def fetch(after):
+            rows, nxt = get_expiries_page(loc, q, include_expired, after=after)
+            return [(self._values(r), (r["estado"],), r["id"]) for r in rows], nxt
+
+        # Mismos filtros: se actualiza en el lugar (scroll, selección y sólo lo que cambió)
+        filters = (loc, q, include_expired)
+        keep = filters == self._filters
+
+        def done(first):
+            self._filters = filters
+            self.table.load(fetch, first_page=first, keep_position=keep)
+
+        # Un refresh nuevo descarta el resultado del anterior si todavía no llegó
+        self.jobs.run(
+            lambda progress: fetch(None),
+            on_done=done,
+            on_error=lambda e: self.table.show_message(f"No se pudo cargar: {e}"),
+            text="Cargando vencimientos...", cancelable=False,
+        )
+
+    def export(self):
+        """Exporta la vista con los filtros actuales (todas las filas, no sólo las cargadas)."""
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        default = default_export_path("vencimientos")
+        path = filedialog.asksaveasfilename(
+            initialdir=str(OUTPUT_DIR), initialfile=default.name, defaultextension=".xlsx",
+            filetypes=[("Excel", "*.xlsx"), ("CSV", "*.csv")],
+        )
+        if not path:
             return
+        loc = self.loc_id.get() or None
+        q = self.query_var.get().strip() or None
+        include_expired = self.show_expired_var.get()
+        by_branch = self.by_branch_var.get()
 
-        for r in rows:
-            iid = self.tree.insert("", "end", values=(
-                r["codigo"], r["descripcion"], r["ean"],
-                r.get("recepcion",""), r["fecha_venc"], r["dias_restantes"],
-                r.get("ingresado_lote",""), r.get("ventas_desde_recepcion",""), r.get("restante_estimado",""),
-                r["cantidad"], r["estado"], r.get("ultima_carga","")
-            ))
-            self.tree.item(iid, tags=(r["estado"],))
+        def done(res):
+            messagebox.showinfo("Exportación", f"{res['rows']} lotes exportados a:\n" + "\n".join(res["files"]))
+
+        self.jobs.run(
+            lambda progress: export_expiries(path, loc, q, include_expired,
+                                             by_branch=by_branch, progress=progress),
+            on_done=done,
+            on_error=lambda e: messagebox.showerror("Error", f"No se pudo exportar: {e}"),
+            text="Exportando...",
+        )
+
+    @staticmethod
+    def _values(r) -> tuple:
+        return (
+            r["codigo"], r["descripcion"], r["ean"],
+            r.get("recepcion",""), r["fecha_venc"], r["dias_restantes"],
+            r.get("ingresado_lote",""), r.get("ventas_desde_recepcion",""), r.get("restante_estimado",""),
+            r["cantidad"], r["estado"], r.get("ultima_carga","")
+        )
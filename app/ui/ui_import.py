@@ -1,8 +1,8 @@
 # app/ui/ui_import.py
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from app.services.import_service import importar_excel
 from app.dao.location_dao import list_locations
+from app.ui.jobs import JobPanel
 
 class ImportFrame(tk.Frame):
     def __init__(self, master):
@@ -23,10 +23,15 @@ class ImportFrame(tk.Frame):
         tk.Label(self, text="Responsable (nombre):").grid(row=2, column=0, sticky="w", padx=8, pady=8)
         tk.Entry(self, textvariable=self.resp_var, width=40).grid(row=2, column=1, padx=8, pady=8, sticky="w")
 
-        tk.Button(self, text="Importar", command=self._import).grid(row=3, column=1, padx=8, pady=16, sticky="w")
+        self.btn_import = tk.Button(self, text="Importar", command=self._import)
+        self.btn_import.grid(row=3, column=1, padx=8, pady=16, sticky="w")
+
+        # Progreso (la importación corre en segundo plano)
+        self.jobs = JobPanel(self)
+        self.jobs.grid(row=4, column=0, columnspan=3, sticky="ew", padx=8, pady=4)
 
         # Escucha cambios de sucursales globales
-        self.winfo_toplevel().bind("<<LocationsChanged>>", lambda e: self._load_locations())
+        self.winfo_toplevel().bind("<<LocationsChanged>>", lambda e: self._load_locations(), add="+")
 
     def _pick(self):
         p = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx")])
@@ -55,12 +60,31 @@ class ImportFrame(tk.Frame):
             return
 
         responsable_nombre = self.resp_var.get().strip() or "Sistema"
-        try:
-            inv_id = importar_excel(
+
+        def done(res):
+            messagebox.showinfo(
+                "Éxito",
+                f"Inventario cargado con ID {res['inventory_id']}\n"
+                f"Filas: {res['rows']} ({res['rows_per_sec']} filas/s)",
+            )
+
+        def error(e):
+            messagebox.showerror("Error", str(e))
+
+        def work(progress):
+            # pandas/openpyxl se cargan recién al importar (y en el hilo del trabajo)
+            from app.services.import_service import importar_excel_bulk
+            return importar_excel_bulk(
                 path_excel=path,
                 sucursal_nombre=sucursal_nombre,
                 responsable_nombre=responsable_nombre,
+                progress=progress,
             )
-            messagebox.showinfo("Éxito", f"Inventario cargado con ID {inv_id}")
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+
+        self.btn_import.config(state="disabled")
+        self.jobs.run(
+            work,
+            on_done=done, on_error=error, text="Importando",
+            on_finish=lambda: self.btn_import.config(state="normal"),
+            write=True,
+        )
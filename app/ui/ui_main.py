@@ -1,11 +1,19 @@
 # app/ui/ui_main.py
+import importlib
 import tkinter as tk
 from tkinter import ttk
 
-from app.ui.ui_import import ImportFrame
-from app.ui.ui_expiries import ExpiryFrame
-from app.ui.ui_masters import MastersFrame
-from app.ui.ui_sales_import import SalesImportFrame  # <<< NUEVA PESTAÑA
+# Pestañas: (módulo, clase, título). Cada una se importa y construye recién la
+# primera vez que se selecciona (su módulo puede cargar numpy y consultar la base).
+TABS = [
+    ("app.ui.ui_import", "ImportFrame", "Recepciones/Inventarios"),      # importar recepciones/inventarios
+    ("app.ui.ui_sales_import", "SalesImportFrame", "Ventas (importar)"),  # importar ventas del mes
+    ("app.ui.ui_expiries", "ExpiryFrame", "Vencimientos"),               # con ventas desde recepción
+    ("app.ui.ui_masters", "MastersFrame", "Maestros"),                   # sucursales con ID
+    # Si tenés más:
+    # ("app.ui.ui_movements", "MovementsFrame", "Movimientos"),
+    # ("app.ui.ui_stock", "StockFrame", "Stock"),
+]
 
 
 class MainWindow(tk.Tk):
@@ -14,28 +22,30 @@ class MainWindow(tk.Tk):
         self.title("Logística - Vencimientos y Ventas")
         self.geometry("1200x700")
 
-        nb = ttk.Notebook(self)
-        nb.pack(fill="both", expand=True)
-
-        # Tab: Importar recepciones/inventarios
-        tab_import = ImportFrame(nb)
-        nb.add(tab_import, text="Recepciones/Inventarios")
-
-        # Tab: Importar ventas del mes (NUEVO)
-        tab_sales = SalesImportFrame(nb)
-        nb.add(tab_sales, text="Ventas (importar)")
-
-        # Tab: Vencimientos (con ventas desde recepción)
-        tab_exp = ExpiryFrame(nb)
-        nb.add(tab_exp, text="Vencimientos")
-
-        # Tab: Maestros (sucursales con ID)
-        tab_master = MastersFrame(nb)
-        nb.add(tab_master, text="Maestros")
-
-        # Si tenés más:
-        # tab_mov = MovementsFrame(nb); nb.add(tab_mov, text="Movimientos")
-        # tab_stock = StockFrame(nb); nb.add(tab_stock, text="Stock")
+        self.nb = ttk.Notebook(self)
+        self.nb.pack(fill="both", expand=True)
+
+        # Un contenedor vacío por pestaña; el frame real se arma al seleccionarla
+        self._pending = {}
+        self.tabs = {}
+        for module, cls, text in TABS:
+            holder = tk.Frame(self.nb)
+            self.nb.add(holder, text=text)
+            self._pending[str(holder)] = (holder, module, cls)
+
+        self.nb.bind("<<NotebookTabChanged>>", self._build_selected)
+        # La primera pestaña se arma apenas la ventana queda visible
+        self.after_idle(self._build_selected)
+
+    def _build_selected(self, event=None):
+        key = self.nb.select()
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        holder, module, cls = pending
+        frame = getattr(importlib.import_module(module), cls)(holder)
+        frame.pack(fill="both", expand=True)
+        self.tabs[cls] = frame
 
 def run():
     app = MainWindow()
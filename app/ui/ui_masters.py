@@ -2,6 +2,7 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from app.dao.location_dao import ensure_location, list_locations, delete_location, create_with_id
+from app.ui.tree_sync import TreeSync
 
 class MastersFrame(tk.Frame):
     def __init__(self, master):
@@ -30,6 +31,7 @@ class MastersFrame(tk.Frame):
         self.tree.column("id", width=80, anchor="w")
         self.tree.column("nombre", width=320, anchor="w")
         self.tree.pack(fill="both", expand=True, padx=6, pady=6)
+        self._rows = TreeSync(self.tree)
 
         btns = tk.Frame(self)
         btns.pack(pady=6)
@@ -65,11 +67,9 @@ class MastersFrame(tk.Frame):
             messagebox.showerror("Error", str(e))
 
     def _refresh_list(self):
-        for i in self.tree.get_children():
-            self.tree.delete(i)
+        # Por diferencias contra lo mostrado (clave = id de sucursal)
         try:
-            for r in list_locations():
-                self.tree.insert("", "end", iid=str(r["id"]), values=(r["id"], r["nombre"]))
+            self._rows.sync((r["id"], (r["id"], r["nombre"]), ()) for r in list_locations())
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo listar sucursales: {e}")
 
@@ -1,21 +1,18 @@
 # app/ui/ui_sales_import.py
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import pandas as pd
 
-from app.services.sales_service import import_sales_from_excel
-from app.utils.normalize import canonicalize_columns
-from app.utils.dates import to_date
+from app.ui.jobs import JobPanel
 
-def _detectar_meses(path: str):
+# pandas/openpyxl (vía sales_service y app.excel) se importan recién al
+# leer un archivo, dentro del trabajo en segundo plano: no demoran el arranque.
+
+def _detectar_meses(path: str, progress=None):
+    from app.services.sales_service import sales_months
     try:
-        df = pd.read_excel(path, dtype=str)
-        df.columns = canonicalize_columns(df.columns)
-        if "fecha" not in df.columns:
-            return []
-        fechas = df["fecha"].map(to_date)
-        meses = sorted({(d.year, d.month) for d in fechas if d is not None})
-        return meses
+        # Parseo completo y agrupado (memoria acotada por lotes); queda en cache y
+        # la importación posterior del mismo archivo no lo vuelve a leer.
+        return sales_months(path, progress)
     except Exception:
         return []
 
@@ -25,6 +22,7 @@ class SalesImportFrame(tk.Frame):
         self.path_var = tk.StringVar()
         self.mes_var = tk.StringVar(value="(sin detectar)")
         self.multi_var = tk.BooleanVar(value=False)
+        self.upsert_var = tk.BooleanVar(value=False)
 
         # --- Archivo
         tk.Label(self, text="Archivo Excel (ventas):").grid(row=0, column=0, sticky="w", padx=8, pady=8)
@@ -40,28 +38,42 @@ class SalesImportFrame(tk.Frame):
             row=2, column=1, sticky="w", padx=8, pady=4
         )
 
-        # --- Botón Importar
-        tk.Button(self, text="Importar ventas", command=self._import).grid(row=3, column=1, sticky="w", padx=8, pady=12)
+        # --- Opción re-importación incremental
+        ttk.Checkbutton(self, text="Reescribir sólo los días que cambiaron (re-importación corregida)", variable=self.upsert_var).grid(
+            row=3, column=1, sticky="w", padx=8, pady=4
+        )
+
+        # --- Botón Importar + progreso (corre en segundo plano)
+        self.btn_import = tk.Button(self, text="Importar ventas", command=self._import)
+        self.btn_import.grid(row=4, column=0, sticky="w", padx=8, pady=12)
+        self.jobs = JobPanel(self)
+        self.jobs.grid(row=4, column=1, columnspan=2, sticky="ew", padx=8, pady=12)
 
         # --- Log
         sep = ttk.Separator(self, orient="horizontal")
-        sep.grid(row=4, column=0, columnspan=3, sticky="ew", padx=8, pady=(8,4))
+        sep.grid(row=5, column=0, columnspan=3, sticky="ew", padx=8, pady=(8,4))
 
-        tk.Label(self, text="Estado:").grid(row=5, column=0, sticky="nw", padx=8, pady=4)
+        tk.Label(self, text="Estado:").grid(row=6, column=0, sticky="nw", padx=8, pady=4)
         self.txt = tk.Text(self, height=10, width=90, state="disabled")
-        self.txt.grid(row=5, column=1, columnspan=2, sticky="nsew", padx=8, pady=4)
-        self.grid_rowconfigure(5, weight=1)
+        self.txt.grid(row=6, column=1, columnspan=2, sticky="nsew", padx=8, pady=4)
+        self.grid_rowconfigure(6, weight=1)
         self.grid_columnconfigure(1, weight=1)
 
     def _pick(self):
         p = filedialog.askopenfilename(filetypes=[("Excel files", "*.xlsx")])
         if p:
             self.path_var.set(p)
-            meses = _detectar_meses(p)
-            if meses:
-                self.mes_var.set(", ".join(f"{y}-{m:02d}" for y, m in meses))
-            else:
-                self.mes_var.set("(sin detectar)")
+            self.mes_var.set("(detectando...)")
+
+            def done(meses):
+                if meses:
+                    self.mes_var.set(", ".join(f"{y}-{m:02d}" for y, m in meses))
+                else:
+                    self.mes_var.set("(sin detectar)")
+
+            # Parsea en segundo plano; el resultado queda en cache para la importación
+            self.jobs.run(lambda progress: _detectar_meses(p, progress), on_done=done,
+                          text="Leyendo archivo", cancelable=False)
 
     def _log(self, msg: str):
         self.txt.configure(state="normal")
@@ -74,20 +86,45 @@ class SalesImportFrame(tk.Frame):
         if not path:
             messagebox.showwarning("Atención", "Seleccioná un archivo Excel.")
             return
+        if self.jobs.busy:
+            messagebox.showwarning("Atención", "Esperá a que termine la lectura del archivo.")
+            return
         self._log(f"Iniciando importación: {path}")
+        import_name = f"ventas-{self.mes_var.get()}"
+        allow_multi = self.multi_var.get()
+        mode = "upsert" if self.upsert_var.get() else "replace"
 
-        try:
-            res = import_sales_from_excel(path, import_name=f"ventas-{self.mes_var.get()}", allow_multi_month=self.multi_var.get())
-            if res.get("status") == "ok":
-                months = res.get("months", [])
-                meses_txt = ", ".join(f"{m['year']}-{m['month']:02d}" for m in months) if months else "(sin info)"
-                self._log(f"OK: meses {meses_txt}, filas insertadas: {res['rows']}, import_id: {res['import_id']}")
-                messagebox.showinfo("Éxito", f"Ventas importadas para: {meses_txt}\nFilas: {res['rows']}")
-            elif res.get("status") == "skipped":
-                self._log(f"Saltado: {res.get('reason')}")
-                messagebox.showinfo("Aviso", f"Importación omitida: {res.get('reason')}")
-            else:
-                self._log(str(res))
-        except Exception as e:
+        def error(e):
             self._log(f"ERROR: {e}")
             messagebox.showerror("Error", str(e))
+
+        def work(progress):
+            from app.services.sales_service import import_sales_from_excel
+            return import_sales_from_excel(
+                path, import_name=import_name, allow_multi_month=allow_multi,
+                mode=mode, progress=progress,
+            )
+
+        self.btn_import.config(state="disabled")
+        self.jobs.run(
+            work,
+            on_done=self._show_result, on_error=error,
+            on_cancel=lambda: self._log("Cancelado: no se grabó nada."),
+            on_finish=lambda: self.btn_import.config(state="normal"),
+            text="Importando", write=True,
+        )
+
+    def _show_result(self, res):
+        if res.get("status") == "ok":
+            months = res.get("months", [])
+            meses_txt = ", ".join(f"{m['year']}-{m['month']:02d}" for m in months) if months else "(sin info)"
+            self._log(f"OK: meses {meses_txt}, filas insertadas: {res['rows_written']} de {res['rows']}, import_id: {res['import_id']}")
+            d = res["days"]
+            self._log(f"    días: {d['added']} nuevos, {d['changed']} cambiados, "
+                      f"{d['unchanged']} sin cambios, {d['removed']} eliminados")
+            messagebox.showinfo("Éxito", f"Ventas importadas para: {meses_txt}\nFilas: {res['rows']}")
+        elif res.get("status") == "skipped":
+            self._log(f"Saltado: {res.get('reason')}")
+            messagebox.showinfo("Aviso", f"Importación omitida: {res.get('reason')}")
+        else:
+            self._log(str(res))
@@ -0,0 +1,282 @@
+# app/ui/virtual_table.py
+"""
+Treeview virtualizado para listas grandes.
+- Sólo existen tantos items de Tk como filas entran en pantalla ("slots");
+  al scrollear se reescriben sus valores, no se crean ni se borran items.
+- Los datos llegan por páginas: fetch(after) -> (filas, siguiente), donde cada
+  fila es (values, tags) o (values, tags, clave) y `siguiente` es None en la
+  última página. Se pide la página que sigue cuando el scroll se acerca al final
+  de lo cargado; fetch corre en segundo plano (JobRunner) y mientras tanto las
+  filas que faltan se muestran como "Cargando...".
+- Cada slot recuerda lo que muestra: sólo se reescriben los que cambiaron.
+  La selección sigue a la clave de la fila (no al slot), también al scrollear
+  y al recargar con load(..., keep_position=True).
+El primer pintado cuesta una página, sin importar el total de filas.
+"""
+import tkinter as tk
+from tkinter import ttk
+
+from app.ui.jobs import JobRunner
+
+LOADING = "Cargando..."
+
+
+class VirtualTable(tk.Frame):
+    def __init__(self, master, columns, headers, widths, height=20, on_load=None):
+        super().__init__(master)
+        self.columns = tuple(columns)
+        # on_load(cargadas, completo): se llama después de cada página
+        self._on_load = on_load
+        self._runner = JobRunner(self)
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings", height=height)
+        for c in self.columns:
+            self.tree.heading(c, text=headers.get(c, c))
+            self.tree.column(c, width=widths.get(c, 100), anchor="w")
+        # El scrollbar lo maneja la tabla (posición sobre los datos, no sobre los slots)
+        self.vsb = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.vsb.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self._rows = []        # [(values, tags)] cargadas hasta ahora
+        self._top = 0          # índice de la primera fila visible
+        self._fetch = None
+        self._after = None
+        self._done = True
+        self._gen = 0          # sube en cada load(): descarta páginas de cargas viejas
+        self._loading = False  # hay una página pedida que todavía no llegó
+        self._want = 0         # filas que hacen falta para la posición actual
+        self._keep_top = None  # posición pedida que todavía no está cargada
+        self._hold = False     # recarga en el lugar: se sigue viendo lo anterior hasta llegar
+        self._slots = []
+        self._shown = []       # (values, tags) que muestra cada slot (None si oculto)
+        self._slot_keys = []   # clave de la fila de cada slot visible
+        self._sel_keys = set() # claves seleccionadas (aunque estén fuera de pantalla)
+        self._resize(height)
+
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(seq, self._on_wheel)
+        for seq, step in (("<Prior>", -1), ("<Next>", 1)):
+            self.tree.bind(seq, lambda e, s=step: self._scroll_pages(s))
+        self.tree.bind("<Configure>", lambda e: self._fit())
+
+    # ----------------------------------------------------------------- API
+    @property
+    def loaded(self) -> int:
+        return len(self._rows)
+
+    @property
+    def complete(self) -> bool:
+        return self._done
+
+    def tag_configure(self, tag, **kw):
+        self.tree.tag_configure(tag, **kw)
+
+    def selected_keys(self) -> set:
+        self._track_selection()
+        return set(self._sel_keys)
+
+    def load(self, fetch, first_page=None, keep_position=False):
+        """
+        Descarta lo cargado y muestra la primera página.
+        first_page: resultado de fetch(None) ya obtenido (p.ej. en segundo plano);
+        sin ella, la primera página también se pide en segundo plano.
+        keep_position: recarga los mismos datos actualizados; mantiene la posición
+        del scroll y la selección, y sólo reescribe las filas visibles que cambiaron.
+        """
+        self._track_selection()
+        top = self._top if keep_position else 0
+        if not keep_position:
+            self._sel_keys = set()
+        self._gen += 1
+        self._loading = False
+        self._fetch = fetch
+        self._rows = []
+        self._after = None
+        self._done = False
+        self._want = 0
+        self._top = top
+        self._keep_top = top or None
+        if first_page is not None:
+            self._add_page(first_page)
+            self._restore_top()
+        self._ensure(top + 2 * len(self._slots))
+        # Recarga en el lugar con la posición todavía sin cargar: no pintar "Cargando..."
+        # sobre las filas que se estaban viendo, esperar a que lleguen las páginas
+        self._hold = self._keep_top is not None
+        if not self._hold:
+            self._clamp()
+            self._render()
+        self.after_idle(self._fit)
+
+    def show_message(self, text: str):
+        """Una sola fila con un mensaje en la segunda columna (p.ej. un error)."""
+        self._gen += 1
+        self._loading = False
+        self._hold = False
+        self._fetch = None
+        self._done = True
+        self._top = 0
+        self._rows = [(self._message_values(text), ())]
+        self._render()
+
+    # ------------------------------------------------------------- páginas
+    def _add_page(self, page):
+        rows, self._after = page
+        self._rows.extend(rows)
+        self._done = self._after is None
+        if self._on_load:
+            self._on_load(len(self._rows), self._done)
+
+    def _ensure(self, upto: int):
+        """
+        Pide páginas (de a una, en segundo plano) hasta tener `upto` filas o llegar
+        al final. No bloquea: lo que falta se pinta como LOADING hasta que llega.
+        """
+        self._want = max(self._want, upto)
+        if self._done or self._loading or len(self._rows) >= self._want:
+            return
+        self._loading = True
+        gen, fetch, after = self._gen, self._fetch, self._after
+
+        def done(page):
+            if gen != self._gen:  # llegó tarde: hubo otro load() o show_message()
+                return
+            self._loading = False
+            self._track_selection()
+            self._add_page(page)
+            self._restore_top()
+            self._hold = self._hold and self._keep_top is not None
+            if not self._hold:
+                self._clamp()
+                self._render()
+            self._ensure(self._want)
+
+        def error(exc):
+            if gen != self._gen:
+                return
+            self._loading = False
+            self._done = True
+            self._hold = False
+            self._rows.append((self._message_values(f"No se pudo cargar más: {exc}"), ()))
+            self._clamp()
+            self._render()
+
+        self._runner.submit(lambda progress: fetch(after), on_done=done, on_error=error)
+
+    def _restore_top(self):
+        """Ir a la posición pedida (scroll o recarga con keep_position) a medida que se carga."""
+        if self._keep_top is None:
+            return
+        self._top = self._keep_top
+        if self._done or len(self._rows) >= self._keep_top + len(self._slots):
+            self._keep_top = None
+
+    def _message_values(self, text: str) -> tuple:
+        return tuple(text if i == 1 else "" for i in range(len(self.columns)))
+
+    def _total(self) -> int:
+        """Filas a recorrer: las cargadas más una pantalla de LOADING si faltan páginas."""
+        return len(self._rows) + (0 if self._done else len(self._slots))
+
+    def _clamp(self):
+        self._top = max(0, min(self._top, self._total() - len(self._slots)))
+
+    # -------------------------------------------------------------- scroll
+    def _scroll_to(self, top: int):
+        n = len(self._slots)
+        # Precarga una pantalla más allá de la que se va a mostrar
+        self._want = 0
+        held, self._hold = self._hold, False
+        self._ensure(top + 2 * n)
+        self._keep_top = top if not self._done and top > self._total() - n else None
+        top = max(0, min(top, self._total() - n))
+        if top != self._top or held:
+            self._track_selection()
+            self._top = top
+            self._render()
+
+    def _scroll_pages(self, pages: int):
+        self._scroll_to(self._top + pages * max(1, len(self._slots) - 1))
+        return "break"
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self._scroll_to(int(float(args[1]) * self._total()))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= max(1, len(self._slots) - 1)
+            self._scroll_to(self._top + step)
+
+    def _on_wheel(self, event):
+        if event.num == 4:
+            step = -3
+        elif event.num == 5:
+            step = 3
+        else:
+            step = -3 if event.delta > 0 else 3
+        self._scroll_to(self._top + step)
+        return "break"
+
+    # ---------------------------------------------------------------- slots
+    def _resize(self, n: int):
+        self._track_selection()
+        while len(self._slots) < n:
+            self._slots.append(self.tree.insert("", "end"))
+            self._shown.append(())  # recién creado: vacío pero enganchado
+        while len(self._slots) > n:
+            self.tree.delete(self._slots.pop())
+            self._shown.pop()
+
+    def _fit(self):
+        """Ajusta la cantidad de slots al alto disponible del Treeview."""
+        bbox = self.tree.bbox(self._slots[0]) if self._slots else ""
+        if not bbox:  # sin filas visibles todavía no hay alto de fila para medir
+            return
+        header, row_h = bbox[1], bbox[3]
+        n = max(1, (self.tree.winfo_height() - header) // max(1, row_h))
+        if n != len(self._slots):
+            self._resize(n)
+            self._ensure(self._top + 2 * n)
+            self._clamp()
+            self._render()
+
+    def _track_selection(self):
+        """Pasa la selección de los slots visibles a claves de fila."""
+        selected = set(self.tree.selection())
+        visible = set(self._slot_keys)
+        now = {k for iid, k in zip(self._slots, self._slot_keys) if iid in selected}
+        self._sel_keys = (self._sel_keys - visible) | now
+
+    def _render(self):
+        loaded = len(self._rows)
+        total = self._total()
+        loading = (self._message_values(LOADING), ())
+        keys = []
+        select = []
+        for i, iid in enumerate(self._slots):
+            idx = self._top + i
+            if idx < total:
+                row = self._rows[idx] if idx < loaded else loading
+                shown = (row[0], row[1])
+                if self._shown[i] is None:
+                    self.tree.move(iid, "", i)  # re-engancha si estaba oculto
+                if self._shown[i] != shown:
+                    self.tree.item(iid, values=row[0], tags=row[1])
+                    self._shown[i] = shown
+                key = row[2] if len(row) > 2 else None
+                keys.append(key)
+                if key is not None and key in self._sel_keys:
+                    select.append(iid)
+            elif self._shown[i] is not None:
+                self.tree.detach(iid)
+                self._shown[i] = None
+        self._slot_keys = keys
+        if set(select) != set(self.tree.selection()):
+            self.tree.selection_set(select)
+        if total:
+            n = len(self._slots)
+            self.vsb.set(self._top / total, min(1.0, (self._top + n) / total))
+        else:
+            self.vsb.set(0.0, 1.0)
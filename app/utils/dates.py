@@ -1,6 +1,7 @@
 # app/utils/dates.py
 from __future__ import annotations
 from datetime import datetime, date
+from functools import lru_cache
 from typing import Optional
 
 # Formatos comunes que pueden venir en tu Excel
@@ -44,6 +45,69 @@ def to_date(val) -> Optional[date]:
     return None
 
 
+@lru_cache(maxsize=65536)
+def _to_date_str(s: str) -> Optional[date]:
+    """to_date memoizado para strings (los exports del ERP repiten pocas fechas)."""
+    return to_date(s)
+
+
+def _dominant_format(sample) -> Optional[str]:
+    """El formato de FORMATS que más valores de la muestra parsea (o None)."""
+    best, best_hits = None, 0
+    for fmt in FORMATS:
+        hits = 0
+        for s in sample:
+            try:
+                datetime.strptime(s, fmt)
+                hits += 1
+            except Exception:
+                pass
+        if hits > best_hits:
+            best, best_hits = fmt, hits
+    return best
+
+
+def to_date_series(values, sample_size: int = 200):
+    """
+    Versión por columna de to_date: devuelve una Series (object) de date/None,
+    con el mismo resultado que values.map(to_date).
+    - Trabaja sobre los valores distintos (factorize) y después expande.
+    - Detecta el formato dominante con una muestra y convierte todos los strings
+      de una sola pasada con pandas.
+    - Lo que no entra en ese formato va a to_date, memoizado por string.
+    Única diferencia: NaT da None (to_date devuelve el propio NaT).
+    """
+    import pandas as pd
+
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(s.dtype):
+        return s.dt.date.astype(object).where(s.notna(), None)
+
+    codes, uniques = pd.factorize(s.astype(object))
+    if len(uniques) == 0:  # todo vacío (p.ej. un lote sin fechas)
+        return pd.Series([None] * len(s), index=s.index, dtype=object)
+    uniques = pd.Series(uniques, dtype=object)
+    parsed = pd.Series([None] * len(uniques), dtype=object)
+
+    is_str = uniques.map(type).eq(str)
+    if is_str.any():
+        stripped = uniques[is_str].str.strip()
+        fmt = _dominant_format(stripped.iloc[:sample_size].tolist())
+        if fmt is not None:
+            conv = pd.to_datetime(stripped, format=fmt, errors="coerce")
+            ok = conv.notna()
+            parsed[ok[ok].index] = conv[ok].dt.date.astype(object)
+
+    # Lento: lo que quedó sin parsear (otros formatos, datetime, números...)
+    for i in parsed[parsed.isna()].index:
+        v = uniques[i]
+        parsed[i] = _to_date_str(v) if isinstance(v, str) else to_date(v)
+
+    out = parsed.to_numpy()[codes]
+    out[codes == -1] = None
+    return pd.Series(out, index=s.index, dtype=object)
+
+
 def days_left(d: Optional[date]) -> Optional[int]:
     """Devuelve días restantes desde hoy; None si no hay fecha."""
     if d is None:
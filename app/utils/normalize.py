@@ -28,6 +28,15 @@ ALIASES = {
 def _strip_accents(s: str) -> str:
     return ''.join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
 
+def search_text(s):
+    """Forma de búsqueda de un texto: sin acentos y en minúsculas (None → None)."""
+    if s is None:
+        return None
+    s = str(s)
+    if s.isascii():  # caso común (códigos, EAN): nada que descomponer
+        return s.lower()
+    return _strip_accents(s).lower()
+
 def clean_header(s: str) -> str:
     """Limpia y normaliza una cabecera (lower, quita espacios extra y acentos)."""
     s = s.strip()
@@ -0,0 +1,60 @@
+# app/utils/progress.py
+"""
+Avance y cancelación de trabajos largos (importaciones, consultas grandes).
+Los servicios reciben un callback `progress(hechas, total=None)` y lo llaman
+entre lotes; Progress.report es ese callback. Si se pidió cancelar, report
+lanza Cancelled dentro del trabajo: la transacción en curso hace rollback.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional
+
+
+class Cancelled(Exception):
+    """El usuario canceló la operación (lo grabado en la transacción se revirtió)."""
+
+
+class Progress:
+    """Estado compartido entre el hilo que trabaja (report) y la UI (snapshot/cancel)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._t0 = time.perf_counter()
+        self._phase_t0 = self._t0
+        self.done = 0
+        self.total: Optional[int] = None
+
+    def report(self, done: int, total: Optional[int] = None) -> None:
+        with self._lock:
+            # Un contador que vuelve a empezar es otra etapa (p.ej. leer → grabar)
+            if done < self.done:
+                self._phase_t0 = time.perf_counter()
+            self.done = done
+            self.total = total
+        self.check()
+
+    def check(self) -> None:
+        if self._cancel.is_set():
+            raise Cancelled("Operación cancelada.")
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def snapshot(self) -> dict:
+        """{done, total, rows_per_sec, seconds} para mostrar en pantalla."""
+        now = time.perf_counter()
+        with self._lock:
+            done, total, phase = self.done, self.total, now - self._phase_t0
+        return {
+            "done": done,
+            "total": total,
+            "rows_per_sec": round(done / phase, 1) if phase > 0 and done else None,
+            "seconds": round(now - self._t0, 1),
+        }
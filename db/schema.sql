@@ -55,6 +55,9 @@ CREATE TABLE IF NOT EXISTS stock (
     lote TEXT,
     fecha_venc DATE,
     cantidad REAL,
+    -- Clave normalizada del lote: NULL -> '' (el UNIQUE de abajo no ve NULLs iguales)
+    lote_key TEXT GENERATED ALWAYS AS (IFNULL(lote, '')) VIRTUAL,
+    venc_key TEXT GENERATED ALWAYS AS (IFNULL(fecha_venc, '')) VIRTUAL,
     UNIQUE(item_id, location_id, lote, fecha_venc)
 );
 
@@ -71,8 +74,35 @@ CREATE TABLE IF NOT EXISTS movements (
 );
 
 CREATE INDEX IF NOT EXISTS idx_stock_item_loc ON stock(item_id, location_id, fecha_venc);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_stock_lot_key
+    ON stock(item_id, location_id, lote_key, venc_key);
+-- Orden/paginación de la vista de vencimientos (misma expresión que stock_dao.ORDEN_VENC)
+CREATE INDEX IF NOT EXISTS idx_stock_orden_venc
+    ON stock(COALESCE(NULLIF(fecha_venc, ''), '9999-12-31'), id);
+CREATE INDEX IF NOT EXISTS idx_stock_loc_orden_venc
+    ON stock(location_id, COALESCE(NULLIF(fecha_venc, ''), '9999-12-31'), id);
 CREATE INDEX IF NOT EXISTS idx_items_ean_codigo ON items(ean, codigo);
 
+-- Búsqueda de texto sobre items (trigram = subcadenas, como LIKE '%q%').
+-- rowid = items.id; el texto se guarda sin acentos y en minúsculas.
+-- Lo llena item_dao al crear items (normaliza con search_text() en Python); no
+-- hay triggers de alta/modificación, así otros clientes pueden escribir en items.
+-- Items escritos por fuera de item_dao: item_dao.rebuild_search_index().
+-- (El trigram de SQLite recién quita acentos desde 3.45: remove_diacritics.)
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+    codigo, ean, descripcion,
+    tokenize = 'trigram'
+);
+
+-- Bases previas: los triggers llamaban a la función search_text() de la app
+DROP TRIGGER IF EXISTS trg_items_fts_ins;
+DROP TRIGGER IF EXISTS trg_items_fts_upd;
+
+CREATE TRIGGER IF NOT EXISTS trg_items_fts_del AFTER DELETE ON items
+BEGIN
+    DELETE FROM items_fts WHERE rowid = OLD.id;
+END;
+
 -- Índices útiles para lotes (MIN/MAX/ SUM por lote)
 CREATE INDEX IF NOT EXISTS idx_movements_lote_ts
 ON movements(item_id, location_id, fecha_venc, ts);
@@ -80,6 +110,62 @@ ON movements(item_id, location_id, fecha_venc, ts);
 CREATE INDEX IF NOT EXISTS idx_movements_tipo
 ON movements(tipo);
 
+-- Deshacer una importación: sus filas y sus movimientos (origen 'import:<id>')
+CREATE INDEX IF NOT EXISTS idx_inventory_rows_inventory
+ON inventory_rows(inventory_id);
+
+CREATE INDEX IF NOT EXISTS idx_movements_origen
+ON movements(origen);
+
+-- Resumen por lote de los ingresos (import/recepcion): primera/última carga y
+-- total ingresado. Lo mantienen los triggers de movements en la misma
+-- transacción; se reconstruye con stock_dao.rebuild_lot_summary().
+CREATE TABLE IF NOT EXISTS lot_summary (
+    item_id INTEGER NOT NULL,
+    location_id INTEGER NOT NULL,
+    lote_key TEXT NOT NULL,
+    venc_key TEXT NOT NULL,
+    primera_carga DATETIME,
+    ultima_carga DATETIME,
+    ingresado_total REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (item_id, location_id, lote_key, venc_key)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_movements_lot_summary_ins
+AFTER INSERT ON movements
+WHEN NEW.tipo IN ('import', 'recepcion')
+BEGIN
+    INSERT INTO lot_summary(item_id, location_id, lote_key, venc_key,
+                            primera_carga, ultima_carga, ingresado_total)
+    VALUES (NEW.item_id, NEW.location_id, IFNULL(NEW.lote, ''), IFNULL(NEW.fecha_venc, ''),
+            NEW.ts, NEW.ts, IFNULL(NEW.delta, 0))
+    ON CONFLICT(item_id, location_id, lote_key, venc_key) DO UPDATE SET
+        -- MIN/MAX escalares devuelven NULL si algún argumento es NULL
+        primera_carga = COALESCE(MIN(primera_carga, excluded.primera_carga), primera_carga, excluded.primera_carga),
+        ultima_carga = COALESCE(MAX(ultima_carga, excluded.ultima_carga), ultima_carga, excluded.ultima_carga),
+        ingresado_total = ingresado_total + excluded.ingresado_total;
+END;
+
+-- Al borrar un ingreso, MIN/MAX no se pueden "restar": se recalcula ese lote.
+CREATE TRIGGER IF NOT EXISTS trg_movements_lot_summary_del
+AFTER DELETE ON movements
+WHEN OLD.tipo IN ('import', 'recepcion')
+BEGIN
+    DELETE FROM lot_summary
+     WHERE item_id = OLD.item_id AND location_id = OLD.location_id
+       AND lote_key = IFNULL(OLD.lote, '') AND venc_key = IFNULL(OLD.fecha_venc, '');
+    INSERT INTO lot_summary(item_id, location_id, lote_key, venc_key,
+                            primera_carga, ultima_carga, ingresado_total)
+    SELECT item_id, location_id, IFNULL(lote, ''), IFNULL(fecha_venc, ''),
+           MIN(ts), MAX(ts), COALESCE(SUM(delta), 0)
+      FROM movements
+     WHERE item_id = OLD.item_id AND location_id = OLD.location_id
+       AND IFNULL(lote, '') = IFNULL(OLD.lote, '')
+       AND IFNULL(fecha_venc, '') = IFNULL(OLD.fecha_venc, '')
+       AND tipo IN ('import', 'recepcion')
+     GROUP BY item_id, location_id, IFNULL(lote, ''), IFNULL(fecha_venc, '');
+END;
+
 -- =========================
 --  VENTAS [NUEVO]
 -- =========================
@@ -102,3 +188,55 @@ CREATE TABLE IF NOT EXISTS sales (
 
 CREATE INDEX IF NOT EXISTS idx_sales_loc_item_fecha
     ON sales(location_id, item_id, fecha);
+
+CREATE INDEX IF NOT EXISTS idx_sales_loc_fecha
+    ON sales(location_id, fecha);
+
+-- Total diario por (sucursal, item, fecha) y acumulado desde la primera venta:
+-- la suma de un rango es acumulado(hasta) - acumulado(antes de desde), dos
+-- búsquedas por clave. La mantiene la importación de ventas (por mes tocado).
+CREATE TABLE IF NOT EXISTS sales_daily (
+    location_id INTEGER NOT NULL,
+    item_id INTEGER NOT NULL,
+    fecha DATE NOT NULL,
+    cantidad REAL NOT NULL,
+    acumulado REAL NOT NULL,
+    PRIMARY KEY (location_id, item_id, fecha)
+) WITHOUT ROWID;
+
+-- Huella por día (sucursal + fecha) del contenido de ventas, para re-importar
+-- sólo los días que cambiaron.
+CREATE TABLE IF NOT EXISTS sales_day_digests (
+    location_id INTEGER NOT NULL,
+    fecha DATE NOT NULL,
+    digest TEXT NOT NULL,
+    filas INTEGER,
+    PRIMARY KEY (location_id, fecha)
+);
+
+-- =========================
+--  VERSIÓN DE LOS DATOS
+-- =========================
+
+-- Una sola fila: la conexión de la app la incrementa en cada commit con escrituras.
+-- Las caches de lecturas (vencimientos) la usan como parte de la clave.
+CREATE TABLE IF NOT EXISTS data_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0);
+
+-- Época de items: cambia cuando se borran items (trigger) o se recrea la tabla
+-- (reset_all). La cache de ids de item_dao la usa como clave: los ids cacheados
+-- sólo valen mientras no cambie, aunque el borrado lo haga otro proceso.
+-- Arranca en un valor al azar: una base recreada desde cero no repite la época.
+CREATE TABLE IF NOT EXISTS items_epoch (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    epoch INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO items_epoch (id, epoch) VALUES (1, abs(random() % 1000000000));
+
+CREATE TRIGGER IF NOT EXISTS trg_items_epoch_del AFTER DELETE ON items
+BEGIN
+    UPDATE items_epoch SET epoch = epoch + 1 WHERE id = 1;
+END;
@@ -0,0 +1,67 @@
+# tests/conftest.py
+import sys
+from pathlib import Path
+
+import pytest
+from openpyxl import Workbook
+
+BASE = Path(__file__).resolve().parents[1]
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+from app.dao import connection, item_dao  # noqa: E402
+from app.excel import workbook_cache  # noqa: E402
+
+RESUMEN_COLS = ["Inventario_ID", "Nombre", "Observación", "Fecha de Creación",
+                "Fecha de Exportación", "Total Filas", "Tipo"]
+VENC_COLS = ["EAN", "Código Artículo", "Descripción", "Unidades por bulto", "Bultos",
+             "Cantidad", "Fecha de Vencimiento", "Fecha de Ingreso"]
+SALES_COLS = ["Sucursal", "Fecha", "Código Artículo", "Cantidad"]
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Base nueva (DB_PATH temporal) con schema + seed; caches en memoria vacías."""
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "test.db"))
+    connection.close_conn()
+    item_dao.clear_cache()
+    workbook_cache.clear()
+    connection.init_db()
+    yield connection.get_conn()
+    connection.close_conn()
+    item_dao.clear_cache()
+    workbook_cache.clear()
+
+
+def _write_xlsx(path: Path, sheets) -> Path:
+    wb = Workbook()
+    wb.remove(wb.active)
+    for name, (header, rows) in sheets.items():
+        ws = wb.create_sheet(name)
+        ws.append(list(header))
+        for row in rows:
+            ws.append(list(row))
+    wb.save(path)
+    return path
+
+
+@pytest.fixture
+def inventory_xlsx(tmp_path):
+    """
+    inventory_xlsx(nombre, filas) → ruta de un Excel de inventario.
+    filas: (ean, codigo, descripcion, upb, bultos, cantidad, vencimiento, ingreso),
+    con los tipos de celda que se quieran probar (números, texto, vacíos).
+    """
+    def make(nombre, rows, exportacion="02/09/2025 18:00"):
+        resumen = [(1, nombre, "test", "01/09/2025 09:00", exportacion, len(rows), "vencimientos")]
+        return _write_xlsx(tmp_path / f"{nombre}.xlsx",
+                           {"resumen": (RESUMEN_COLS, resumen), "vencimientos": (VENC_COLS, rows)})
+    return make
+
+
+@pytest.fixture
+def sales_xlsx(tmp_path):
+    """sales_xlsx(nombre, filas) → ruta de un Excel de ventas (sucursal, fecha, codigo, cantidad)."""
+    def make(nombre, rows):
+        return _write_xlsx(tmp_path / f"{nombre}.xlsx", {"ventas": (SALES_COLS, rows)})
+    return make
@@ -0,0 +1,108 @@
+# tests/test_cli.py
+import json
+import subprocess
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+from app import cli
+
+BASE = Path(__file__).resolve().parents[1]
+
+
+def _dmy(days):
+    return (date.today() + timedelta(days=days)).strftime("%d/%m/%Y")
+
+
+FILAS = [
+    ("7790000000011", "A1", "Arroz", 10, 1, 0, _dmy(3), "01/08/2025"),
+    ("7790000000012", "A2", "Fideos", 20, 0, 5, _dmy(20), "01/08/2025"),
+    ("7790000000013", "A3", "Aceite", 6, 2, 0, "", "01/08/2025"),
+]
+
+
+def _run(capsys, *argv):
+    """cli.main en el mismo proceso → (código de salida, JSON emitido)."""
+    code = cli.main(list(argv))
+    return code, json.loads(capsys.readouterr().out)
+
+
+def _python_m_app(*argv):
+    """`python -m app ...` en otro proceso (hereda DB_PATH del fixture db)."""
+    return subprocess.run([sys.executable, "-m", "app", *argv],
+                          cwd=BASE, capture_output=True, text=True)
+
+
+def test_python_m_app_prints_json(db, inventory_xlsx):
+    path = inventory_xlsx("norte", FILAS)
+    imp = _python_m_app("import-inventory", str(path), "--sucursal", "Norte")
+    assert imp.returncode == 0, imp.stderr
+    (res,) = json.loads(imp.stdout)
+    assert (res["status"], res["rows"]) == ("ok", 3)
+
+    exp = _python_m_app("expiries", "--estado", "CRITICO", "PROXIMO")
+    assert exp.returncode == 0, exp.stderr
+    out = json.loads(exp.stdout)
+    assert out["by_estado"] == {"CRITICO": 1, "PROXIMO": 1}
+    assert [r["codigo"] for r in out["items"]] == ["A1", "A2"]
+
+
+def test_import_inventory_reports_each_file(db, inventory_xlsx, tmp_path, capsys):
+    path = str(inventory_xlsx("norte", FILAS))
+    roto = tmp_path / "roto.xlsx"
+    roto.write_text("no es un excel")
+
+    code, res = _run(capsys, "import-inventory", path, path, str(roto))
+    assert code == 1  # hubo un error
+    assert [r["status"] for r in res] == ["ok", "duplicado", "error"]
+    assert res[0]["inventory_id"] and res[2]["error"]
+
+    code, res = _run(capsys, "import-inventory", path)
+    assert code == 0  # un duplicado no es un error
+    assert res[0]["status"] == "duplicado"
+
+
+def test_import_sales_and_skip_duplicate(db, sales_xlsx, capsys):
+    path = str(sales_xlsx("agosto", [("1", "01/08/2025", "A1", "2"), ("1", "02/08/2025", "A2", "1,5")]))
+
+    code, res = _run(capsys, "import-sales", path, "--mode", "upsert")
+    assert code == 0
+    assert res["status"] == "ok"
+    assert res["months"] == [{"year": 2025, "month": 8}]
+    assert res["days"]["added"] == 2
+
+    code, res = _run(capsys, "import-sales", path)
+    assert (code, res["status"]) == (0, "skipped")
+
+
+def test_expiries_limit_and_export(db, inventory_xlsx, tmp_path, capsys):
+    _run(capsys, "import-inventory", str(inventory_xlsx("norte", FILAS)), "--sucursal", "Norte")
+
+    code, res = _run(capsys, "expiries", "--limit", "1")
+    assert code == 0
+    assert res["rows"] == 1
+    assert sum(res["by_estado"].values()) == 3  # los conteos son sobre todas las filas
+
+    out = tmp_path / "v.csv"
+    code, res = _run(capsys, "expiries", "--estado", "SIN_FECHA", "--out", str(out))
+    assert (code, res["rows"], res["files"]) == (0, 1, [str(out)])
+
+    code, res = _run(capsys, "stock", "--q", "fideos", "--out", str(tmp_path / "s.xlsx"))
+    assert (code, res["rows"]) == (0, 1)
+
+
+def test_reset_requires_yes_and_errors_are_json(db, inventory_xlsx, capsys):
+    _run(capsys, "import-inventory", str(inventory_xlsx("norte", FILAS)))
+
+    code, res = _run(capsys, "reset", "inventories")
+    assert code == 1
+    assert res["status"] == "error" and res["command"] == "reset"
+    assert db.execute("SELECT COUNT(*) FROM stock").fetchone()[0] == 3
+
+    code, res = _run(capsys, "reset", "inventories", "--yes")
+    assert code == 0
+    assert res["deleted"]["stock"] == 3
+
+    code, res = _run(capsys, "reset", "delete-inventory", "999")
+    assert code == 1
+    assert "999" in res["error"]
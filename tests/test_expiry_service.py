@@ -0,0 +1,91 @@
+# tests/test_expiry_service.py
+import sqlite3
+from contextlib import closing
+from datetime import date, timedelta
+
+from app.dao import connection, stock_dao
+from app.services import expiry_service
+
+
+def _seed_stock(conn, fechas):
+    """Un item por fecha (None, '' o ISO) con 5 unidades en la sucursal 1."""
+    with connection.transaction() as tx:
+        for i, fv in enumerate(fechas):
+            cur = tx.execute("INSERT INTO items (codigo, descripcion) VALUES (?, ?)",
+                             (f"C{i}", f"Item {i}"))
+            tx.execute(
+                "INSERT INTO stock (item_id, location_id, lote, fecha_venc, cantidad) "
+                "VALUES (?, 1, NULL, ?, 5)", (cur.lastrowid, fv))
+    expiry_service.clear_cache()
+
+
+def _iso(days):
+    return (date.today() + timedelta(days=days)).isoformat()
+
+
+def test_undated_lots_kept_and_sorted_last(db):
+    _seed_stock(db, [None, "", _iso(-3), _iso(10), _iso(400)])
+
+    rows = stock_dao.list_expiries(min_venc=date.today().isoformat())
+    assert [r["fecha_venc"] for r in rows] == [_iso(10), _iso(400), None, ""]
+
+    todas = stock_dao.list_expiries()
+    assert [r["fecha_venc"] for r in todas][:3] == [_iso(-3), _iso(10), _iso(400)]
+    assert {r["orden_venc"] for r in todas[3:]} == {"9999-12-31"}
+
+    vista = expiry_service.get_expiries(include_expired=False)
+    assert [r["estado"] for r in vista][-2:] == ["SIN_FECHA", "SIN_FECHA"]
+
+
+def test_pages_cover_undated_lots_once(db):
+    fechas = [None, "", _iso(-1), _iso(5), "", _iso(30), None]
+    _seed_stock(db, fechas)
+    ids, after = [], None
+    while True:
+        rows, after = expiry_service.get_expiries_page(after=after, limit=2)
+        ids += [r["id"] for r in rows]
+        if after is None:
+            break
+    assert ids == [r["id"] for r in expiry_service.get_expiries()]
+    assert len(ids) == len(fechas)
+
+
+def test_orden_venc_index_migrated_and_used(db):
+    # Base vieja: índice con la expresión IFNULL
+    db.execute("DROP INDEX idx_stock_orden_venc")
+    db.execute("CREATE INDEX idx_stock_orden_venc ON stock(IFNULL(fecha_venc, '9999-12-31'), id)")
+    db.execute("PRAGMA user_version = 0")
+    db.commit()
+    connection.init_db()
+
+    sql = db.execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'idx_stock_orden_venc'").fetchone()[0]
+    assert "NULLIF" in sql
+    plan = " ".join(r[3] for r in db.execute(
+        f"EXPLAIN QUERY PLAN SELECT id FROM stock s ORDER BY {stock_dao.ORDEN_VENC}, s.id"))
+    assert "idx_stock_orden_venc" in plan
+
+
+def _cantidades():
+    return sorted(r["cantidad"] for r in expiry_service.get_expiries())
+
+
+def test_cache_invalidated_when_data_version_changes(db):
+    _seed_stock(db, [_iso(5), _iso(50)])
+    assert _cantidades() == [5, 5]
+    page, _ = expiry_service.get_expiries_page(limit=10)
+
+    # Escritura por fuera de get_conn (no incrementa data_version): sigue la cache
+    with closing(sqlite3.connect(connection.get_db_path())) as raw:
+        raw.execute("UPDATE stock SET cantidad = 7")
+        raw.commit()
+    assert _cantidades() == [5, 5]
+
+    connection.bump_data_version()
+    assert _cantidades() == [7, 7]
+    assert expiry_service.get_expiries_page(limit=10)[0] != page
+
+    # Una escritura de la app incrementa data_version sola al confirmar
+    with connection.transaction() as tx:
+        tx.execute("UPDATE stock SET cantidad = 9 WHERE fecha_venc = ?", (_iso(5),))
+    assert _cantidades() == [7, 9]
@@ -0,0 +1,288 @@
+# tests/test_import_service.py
+import shutil
+import sqlite3
+from contextlib import closing
+
+import pytest
+from openpyxl import load_workbook
+
+from app.dao import connection, inventory_dao, item_dao, location_dao, movement_dao, stock_dao
+from app.excel import workbook_cache
+from app.services import import_service, maintenance_service
+
+FILAS = [
+    ("7790000000011", "A1", "Arroz", 10, 1, 0, "10/10/2025", "01/08/2025"),
+    ("7790000000012", "A2", "Fideos", 20, 0, 5, "11/10/2025", "01/08/2025"),
+    ("7790000000013", "A3", "Aceite", 6, 2, 1, "", "01/08/2025"),
+]
+
+# Segundo inventario: repite un lote del primero (A1 10/10) y trae lotes nuevos
+FILAS_B = [
+    ("7790000000011", "A1", "Arroz", 10, 2, 0, "10/10/2025", "05/08/2025"),
+    ("7790000000011", "A1", "Arroz", 10, 1, 0, "20/12/2025", "05/08/2025"),
+    ("7790000000014", "A4", "Harina", 1, 0, 8, "", "05/08/2025"),
+]
+
+
+def _items(conn):
+    return conn.execute("SELECT id, codigo, ean, descripcion FROM items ORDER BY id").fetchall()
+
+
+def _counts(conn):
+    return {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+            for t in ("inventories", "inventory_rows", "stock", "movements", "items", "lot_summary")}
+
+
+def _stock(conn):
+    """{(item, sucursal, lote, venc): cantidad} sin las claves en cero."""
+    return {(r[0], r[1], r[2], r[3]): r[4] for r in conn.execute(
+        "SELECT item_id, location_id, lote, fecha_venc, cantidad FROM stock WHERE cantidad <> 0")}
+
+
+def _lots(conn):
+    return sorted(tuple(r) for r in conn.execute("SELECT * FROM lot_summary"))
+
+
+def _locations(conn):
+    return {r[0] for r in conn.execute("SELECT nombre FROM locations")}
+
+
+def _import(inventory_xlsx, nombre, rows):
+    return import_service.importar_excel_bulk(str(inventory_xlsx(nombre, rows)))["inventory_id"]
+
+
+def test_numeric_keys_same_item_across_batches(db, inventory_xlsx):
+    # Lote 1 (con un EAN vacío → pandas lo lee como float) y lote 2 (sin vacíos → int)
+    path = inventory_xlsx("numericos", [
+        (7791234567890, 1001, "Leche", 12, 1, 0, "10/10/2025", "01/08/2025"),
+        (None, 1002, "Pan", 1, 0, 3, "11/10/2025", "01/08/2025"),
+        (7790000000001, 1003, "Yerba", 6, 2, 0, "12/10/2025", "01/08/2025"),
+        (7791234567890, 1001, "Leche", 12, 0, 4, "13/10/2025", "01/08/2025"),
+    ])
+    res = import_service.importar_excel_bulk(str(path), chunk_size=2)
+    assert res["rows"] == 4
+
+    leche = [r for r in _items(db) if r["descripcion"] == "Leche"]
+    assert len(leche) == 1
+    assert (leche[0]["codigo"], leche[0]["ean"]) == ("1001", "7791234567890")
+    assert db.execute(
+        "SELECT SUM(cantidad) FROM stock WHERE item_id = ?", (leche[0]["id"],)
+    ).fetchone()[0] == 16
+
+
+def test_resolve_many_same_id_across_batches(db):
+    first = item_dao.resolve_many([("A1", "779001", "Arroz"), ("A2", None, "Fideos")])
+    # Otro lote: misma clave desde la cache, y también desde la base con la cache vacía
+    again = item_dao.resolve_many([("A2", None, "Fideos"), (" A1 ", "779001", "Arroz")])
+    item_dao.clear_cache()
+    fresh = item_dao.resolve_many([("A1", "779001", "Arroz"), ("A2", "", "Fideos")])
+
+    assert again == [first[1], first[0]]
+    assert fresh == first
+    assert db.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 2
+
+
+def test_resolve_many_forgets_ids_deleted_by_another_process(db):
+    item_dao.resolve_many([("A1", None, "Arroz"), ("A2", None, "Fideos")])
+    with closing(sqlite3.connect(connection.get_db_path())) as other:
+        # Borra A1 (MAX(id) no cambia: sigue A2)
+        other.execute("DELETE FROM items WHERE codigo = 'A1'")
+        other.commit()
+
+    # El id cacheado de A1 ya no existe: resolve_many vuelve a crear el item
+    (item_id,) = item_dao.resolve_many([("A1", None, "Arroz")])
+    row = db.execute("SELECT codigo FROM items WHERE id = ?", (item_id,)).fetchone()
+    assert row is not None and row[0] == "A1"
+
+
+def test_reset_all_forgets_cached_item_ids(db, inventory_xlsx):
+    _import(inventory_xlsx, "A", FILAS)
+    maintenance_service.reset_all()
+    # Items nuevos reciben los ids que tenían A1..A3
+    for codigo in ("X1", "X2", "X3", "X4"):
+        item_dao.get_or_create(codigo, "Otro", None)
+
+    _import(inventory_xlsx, "A", FILAS)
+    conn = connection.get_conn()
+    codigos = {r[0] for r in conn.execute(
+        "SELECT i.codigo FROM inventory_rows r JOIN items i ON i.id = r.item_id")}
+    assert codigos == {"A1", "A2", "A3"}
+
+
+def test_import_failing_midway_rolls_back_everything(db, inventory_xlsx, monkeypatch):
+    before = _counts(db)
+    path = inventory_xlsx("falla", FILAS)
+
+    real = movement_dao.bulk_insert_movements
+    calls = []
+
+    def boom(rows, conn=None):
+        calls.append(1)
+        if len(calls) == 2:  # el segundo lote ya grabó filas y stock del primero
+            raise RuntimeError("falla a mitad de la importación")
+        return real(rows, conn=conn)
+
+    monkeypatch.setattr(movement_dao, "bulk_insert_movements", boom)
+    with pytest.raises(RuntimeError):
+        import_service.importar_excel_bulk(str(path), chunk_size=1)
+
+    assert _counts(db) == before
+    assert connection.get_conn().tx_depth == 0
+
+    # Sin inventario a medias, el mismo archivo se puede importar después
+    monkeypatch.setattr(movement_dao, "bulk_insert_movements", real)
+    res = import_service.importar_excel_bulk(str(path), chunk_size=1)
+    assert res["rows"] == 3
+    after = _counts(db)
+    assert after["inventories"] == before["inventories"] + 1
+    assert after["inventory_rows"] == 3
+    assert after["movements"] == 3
+
+
+def test_nested_transaction_failure_rolls_back_only_savepoint(db):
+    with connection.transaction() as conn:
+        location_dao.ensure_location("Externa", conn=conn)
+        with pytest.raises(ValueError):
+            with connection.transaction() as inner:
+                location_dao.ensure_location("Interna", conn=inner)
+                raise ValueError("falla la interna")
+        location_dao.ensure_location("Despues", conn=conn)
+
+    nombres = _locations(db)
+    assert {"Externa", "Despues"} <= nombres
+    assert "Interna" not in nombres
+
+
+def test_outer_failure_rolls_back_released_savepoint(db):
+    with pytest.raises(RuntimeError):
+        with connection.transaction() as conn:
+            with connection.transaction() as inner:
+                location_dao.ensure_location("Interna", conn=inner)
+            location_dao.ensure_location("Externa", conn=conn)
+            raise RuntimeError("falla la externa")
+
+    nombres = _locations(db)
+    assert not {"Interna", "Externa"} & nombres
+    assert db.tx_depth == 0
+
+
+def test_undo_inventory_restores_stock_and_lot_summary(db, inventory_xlsx):
+    _import(inventory_xlsx, "A", FILAS)
+    stock_antes, lots_antes = _stock(db), _lots(db)
+    movs_antes = db.execute("SELECT COUNT(*) FROM movements").fetchone()[0]
+
+    inv_b = _import(inventory_xlsx, "B", FILAS_B)
+    assert _stock(db) != stock_antes
+
+    res = import_service.undo_inventory(inv_b)
+    assert res["inventory_ids"] == [inv_b]
+    assert res["rows"] == len(FILAS_B)
+
+    assert _stock(db) == stock_antes
+    assert _lots(db) == lots_antes
+    assert not db.execute("SELECT 1 FROM movements WHERE origen = ?", (f"import:{inv_b}",)).fetchall()
+    assert db.execute("SELECT COUNT(*) FROM movements WHERE origen = ?",
+                      (f"reversa:{inv_b}",)).fetchone()[0] == len(FILAS_B)
+    assert db.execute("SELECT COUNT(*) FROM movements").fetchone()[0] == movs_antes + len(FILAS_B)
+    assert not inventory_dao.inventory_locations([inv_b], conn=db)
+    assert not db.execute("SELECT 1 FROM inventory_rows WHERE inventory_id = ?", (inv_b,)).fetchall()
+
+
+def test_undo_batch_leaves_empty_stock(db, inventory_xlsx):
+    ids = [_import(inventory_xlsx, "A", FILAS), _import(inventory_xlsx, "B", FILAS_B)]
+    res = maintenance_service.delete_inventory(*ids)
+    assert res["inventory_ids"] == sorted(ids)
+    assert _stock(db) == {}
+    assert _lots(db) == []
+    assert stock_dao.rebuild_lot_summary() == 0
+
+
+def test_undo_unknown_inventory_raises_and_changes_nothing(db, inventory_xlsx):
+    inv_a = _import(inventory_xlsx, "A", FILAS)
+    antes = (_counts(db), _stock(db))
+    with pytest.raises(ValueError, match="999"):
+        import_service.undo_inventories([inv_a, 999])
+    assert (_counts(db), _stock(db)) == antes
+
+
+def test_undo_rolls_back_when_a_step_fails(db, inventory_xlsx, monkeypatch):
+    _import(inventory_xlsx, "A", FILAS)
+    inv_b = _import(inventory_xlsx, "B", FILAS_B)
+    antes = (_counts(db), _stock(db), _lots(db))
+
+    def boom(inv_ids, conn=None):
+        raise RuntimeError("falla al borrar el inventario")
+
+    # Último paso: stock, reversas y movimientos ya se tocaron en la transacción
+    monkeypatch.setattr(inventory_dao, "delete_inventories", boom)
+    with pytest.raises(RuntimeError):
+        import_service.undo_inventory(inv_b)
+    assert (_counts(db), _stock(db), _lots(db)) == antes
+
+
+def test_clear_inventories_skips_per_row_lot_summary_trigger(db, inventory_xlsx):
+    _import(inventory_xlsx, "A", FILAS)
+    _import(inventory_xlsx, "B", FILAS_B)  # lote A1 10/10 con dos ingresos
+    trigger_sql = "SELECT sql FROM sqlite_master WHERE name = 'trg_movements_lot_summary_del'"
+    trigger = db.execute(trigger_sql).fetchone()[0]
+    antes = db.total_changes
+
+    res = maintenance_service.clear_inventories_and_stock()
+    # Sólo las filas borradas + data_version: el trigger por fila no escribió nada
+    assert db.total_changes - antes == sum(res["deleted"].values()) + 1
+    assert res["deleted"]["movements"] == len(FILAS) + len(FILAS_B)
+    counts = _counts(db)
+    assert counts["items"] == 4
+    assert not any(n for t, n in counts.items() if t != "items")
+    assert db.execute(trigger_sql).fetchone()[0] == trigger
+
+    # El trigger sigue vigente: deshacer una importación posterior recalcula sus lotes
+    inv_a = _import(inventory_xlsx, "A2", FILAS)
+    _import(inventory_xlsx, "B2", FILAS_B)
+    import_service.undo_inventory(inv_a)
+    lots = _lots(db)
+    assert stock_dao.rebuild_lot_summary() == len(lots)
+    assert _lots(db) == lots
+
+
+def test_folder_import_hashes_only_in_workers(db, inventory_xlsx, tmp_path, monkeypatch):
+    inventory_xlsx("suc_a", FILAS)
+    inventory_xlsx("suc_b", FILAS_B, exportacion="03/09/2025 18:00")
+    hashes = []
+    real = workbook_cache.md5_file
+    monkeypatch.setattr(workbook_cache, "md5_file", lambda p: hashes.append(p) or real(p))
+
+    res = import_service.importar_carpeta(str(tmp_path), workers=2)
+    assert [r["status"] for r in res] == ["ok", "ok"]
+    assert hashes == []  # el proceso principal sólo lee 'resumen'
+
+
+def test_folder_import_duplicates_and_errors_per_file(db, inventory_xlsx, tmp_path):
+    a = inventory_xlsx("suc_a", FILAS)
+    _import(inventory_xlsx, "ya_importado", FILAS_B)
+    shutil.copy(a, tmp_path / "suc_a_copia.xlsx")  # mismo inventario que suc_a
+    sin_venc = inventory_xlsx("sin_venc", FILAS, exportacion="04/09/2025 18:00")
+    wb = load_workbook(sin_venc)
+    del wb["vencimientos"]
+    wb.save(sin_venc)
+    (tmp_path / "roto.xlsx").write_text("no es un excel")
+    (tmp_path / "~$suc_a.xlsx").write_text("lock de Excel")  # se ignora
+
+    res = {r["file"].rsplit("/", 1)[-1]: r for r in import_service.importar_carpeta(str(tmp_path), workers=2)}
+    assert list(res) == ["roto.xlsx", "sin_venc.xlsx", "suc_a.xlsx", "suc_a_copia.xlsx", "ya_importado.xlsx"]
+    assert {f: r["status"] for f, r in res.items()} == {
+        "roto.xlsx": "error",  # no se pudo leer 'resumen'
+        "sin_venc.xlsx": "error",  # falla el parseo en el proceso hijo
+        "suc_a.xlsx": "ok",
+        "suc_a_copia.xlsx": "duplicado",  # detectado al grabar (misma carpeta)
+        "ya_importado.xlsx": "duplicado",  # detectado antes de parsear
+    }
+    assert all(r["error"] for r in res.values() if r["status"] != "ok")
+
+    ok = res["suc_a.xlsx"]
+    assert ok["rows"] == len(FILAS)
+    suc = db.execute(
+        "SELECT l.nombre FROM inventories i JOIN locations l ON l.id = i.sucursal_id WHERE i.id = ?",
+        (ok["inventory_id"],)).fetchone()[0]
+    assert suc == "suc_a"  # sucursal = nombre del archivo
+    assert db.execute("SELECT COUNT(*) FROM inventories").fetchone()[0] == 2
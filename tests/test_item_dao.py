@@ -0,0 +1,59 @@
+# tests/test_item_dao.py
+import sqlite3
+from contextlib import closing
+
+from app.dao import connection, item_dao
+
+
+def test_other_clients_can_write_items(db):
+    # Conexión sin la función search_text() de la app (otro proceso, sqlite3 CLI)
+    with closing(sqlite3.connect(connection.get_db_path())) as other:
+        other.execute("INSERT INTO items (codigo, descripcion) VALUES ('EXT1', 'Externo')")
+        other.execute("UPDATE items SET descripcion = 'Externo 2' WHERE codigo = 'EXT1'")
+        other.commit()
+
+    assert item_dao.search_item_ids("externo") == []  # todavía fuera del índice
+    assert item_dao.rebuild_search_index() == 1
+    assert len(item_dao.search_item_ids("externo 2")) == 1
+
+
+def test_created_items_are_indexed(db):
+    uno = item_dao.get_or_create("C1", "Azúcar común", None)
+    otros = item_dao.resolve_many([("C2", None, "Té en hebras"), ("C3", "7790001", "Café")])
+
+    assert item_dao.search_item_ids("azucar") == [uno]
+    assert item_dao.search_item_ids("hebras") == [otros[0]]
+    assert item_dao.search_item_ids("7790001") == [otros[1]]
+    assert db.execute("SELECT COUNT(*) FROM items_fts").fetchone()[0] == 3
+
+
+def _seed_items():
+    return {d: item_dao.get_or_create(c, d, e) for c, d, e in [
+        ("A1", "Café molido", "7790001"),
+        ("B22", "Té en hebras", None),
+        ("C3", "CAFETERA Ñandú", "7790002"),
+        ("D4", "Yerba mate", None),
+    ]}
+
+
+def test_short_queries_use_like_and_long_ones_match(db):
+    ids = _seed_items()
+    assert "LIKE" in item_dao.search_filter("te")[0]
+    assert "MATCH" in item_dao.search_filter("caf")[0]
+
+    # 1-2 caracteres: subcadena en cualquier columna, por id
+    assert item_dao.search_item_ids("b2") == [ids["Té en hebras"]]
+    assert item_dao.search_item_ids("te") == [ids["Té en hebras"], ids["CAFETERA Ñandú"], ids["Yerba mate"]]
+    # 3+: trigram (también subcadenas), con ranking y límite
+    assert set(item_dao.search_item_ids("cafe")) == {ids["Café molido"], ids["CAFETERA Ñandú"]}
+    assert len(item_dao.search_item_ids("cafe", limit=1)) == 1
+    assert item_dao.search_item_ids("790002") == [ids["CAFETERA Ñandú"]]
+
+
+def test_search_ignores_accents_and_case(db):
+    ids = _seed_items()
+    for q in ("CAFÉ MOL", "cafe mol", "Cafe Molido"):
+        assert item_dao.search_item_ids(q) == [ids["Café molido"]]
+    assert item_dao.search_item_ids("nandu") == [ids["CAFETERA Ñandú"]]
+    assert item_dao.search_item_ids("tÉ") == item_dao.search_item_ids("te")
+    assert item_dao.search_item_ids('molido "') == []  # comillas: frase literal, sin error de sintaxis
@@ -0,0 +1,26 @@
+# tests/test_profiler.py
+from app.dao import connection, profiler
+
+
+def test_slow_plan_decided_with_fetch_time(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, "_slow_ms", None)
+    profiler.enable(slow_ms=1.0, out=str(tmp_path / "profile.json"))
+    try:
+        conn = connection.get_conn()
+        assert getattr(conn, "profiled", False)
+        conn.execute("CREATE TABLE t (a, b)")
+        conn.executemany("INSERT INTO t VALUES (?, ?)", ((i, i * 7 % 1000) for i in range(100_000)))
+        conn.commit()
+        profiler.reset()
+
+        # Scan grande: execute() sólo trae la primera fila, el resto del tiempo está en los fetch
+        sql = "SELECT a, b FROM t WHERE b >= 0"
+        assert sum(1 for _ in conn.execute(sql)) == 100_000
+
+        st = next(s for s in profiler.snapshot() if s["sql"] == sql)
+        assert st["total_ms"] >= 1.0
+        assert st["plan"] and any("SCAN t" in p for p in st["plan"])
+    finally:
+        profiler.disable()
+        profiler.reset()
+        connection.close_conn()
@@ -0,0 +1,96 @@
+# tests/test_sales_service.py
+from app.dao import connection, item_dao, sales_dao
+from app.excel import reader
+from app.services.sales_service import import_sales_from_excel, sales_months
+
+JULIO = [("1", "31/07/2025", "A1", "4"), ("1", "31/07/2025", "A2", "1")]
+AGOSTO = [
+    ("1", "01/08/2025", "A1", "2"), ("1", "01/08/2025", "A2", "3"),
+    ("1", "02/08/2025", "A1", "1,5"),
+    ("1", "03/08/2025", "A2", "7"), ("2", "03/08/2025", "A1", "5"),
+]
+# Mismo mes con un solo día distinto (sucursal 1, 02/08): otra cantidad y un artículo más
+AGOSTO_V2 = [r for r in AGOSTO if r[1] != "02/08/2025"] + [
+    ("1", "02/08/2025", "A1", "2,5"), ("1", "02/08/2025", "A3", "1"),
+]
+
+
+def _sales(conn):
+    return sorted(
+        (r["location_id"], r["codigo"], r["fecha"], r["cantidad"], r["import_id"])
+        for r in conn.execute(
+            "SELECT s.location_id, i.codigo, s.fecha, s.cantidad, s.import_id "
+            "FROM sales s JOIN items i ON i.id = s.item_id"
+        )
+    )
+
+
+def _daily(conn):
+    return sorted(tuple(r) for r in conn.execute(
+        "SELECT d.location_id, i.codigo, d.fecha, d.cantidad, d.acumulado "
+        "FROM sales_daily d JOIN items i ON i.id = d.item_id"
+    ))
+
+
+def _import_all(sales_xlsx, mode):
+    ids = []
+    for name, rows in (("julio", JULIO), ("agosto", AGOSTO), ("agosto_v2", AGOSTO_V2)):
+        res = import_sales_from_excel(str(sales_xlsx(f"{name}_{mode}", rows)), mode=mode)
+        assert res["status"] == "ok"
+        ids.append(res["import_id"])
+    return res, ids
+
+
+def test_upsert_rewrites_only_changed_day(db, sales_xlsx):
+    res, (_, agosto_id, v2_id) = _import_all(sales_xlsx, "upsert")
+
+    assert res["days"] == {"added": 0, "changed": 1, "unchanged": 3, "removed": 0}
+    assert res["rows_written"] == 2
+
+    by_day = {}
+    for loc, _, fecha, _, import_id in _sales(db):
+        by_day.setdefault((loc, fecha), set()).add(import_id)
+    assert by_day[(1, "2025-08-02")] == {v2_id}
+    for day in [(1, "2025-08-01"), (1, "2025-08-03"), (2, "2025-08-03")]:
+        assert by_day[day] == {agosto_id}
+
+    # Rollup incremental == reconstrucción completa desde sales
+    daily = _daily(db)
+    sales_dao.rebuild_daily()
+    assert daily == _daily(db)
+    assert (1, "A1", "2025-08-02", 2.5, 8.5) in daily  # 4 (julio) + 2 + 2,5
+
+
+def test_upsert_and_replace_end_in_same_state(db, sales_xlsx, tmp_path, monkeypatch):
+    res_upsert, _ = _import_all(sales_xlsx, "upsert")
+    upsert = ([r[:4] for r in _sales(db)], _daily(db))
+
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "replace.db"))
+    connection.close_conn()
+    item_dao.clear_cache()
+    connection.init_db()
+    res_replace, _ = _import_all(sales_xlsx, "replace")
+    conn = connection.get_conn()
+    replace = ([r[:4] for r in _sales(conn)], _daily(conn))
+
+    assert upsert == replace
+    assert res_upsert["days"] == res_replace["days"]
+    assert res_replace["rows_written"] == 6  # replace reescribe el mes entero
+
+
+def test_preview_and_import_parse_file_once(db, sales_xlsx, monkeypatch):
+    lecturas = []
+    real = reader.iter_batches
+
+    def counting(*args, **kwargs):
+        lecturas.append(args[0])
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(reader, "iter_batches", counting)
+    path = str(sales_xlsx("julio_agosto", JULIO + AGOSTO))
+
+    assert sales_months(path) == [(2025, 7), (2025, 8)]
+    res = import_sales_from_excel(path, allow_multi_month=True)
+    assert res["status"] == "ok"
+    assert res["rows"] == len(JULIO + AGOSTO)
+    assert lecturas == [path]
@@ -0,0 +1,143 @@
+# tests/test_stock_service.py
+import csv
+import glob
+import tempfile
+from datetime import date, timedelta
+
+import pytest
+from openpyxl import load_workbook
+
+from app.excel import writer
+from app.services import expiry_service, import_service, stock_service
+
+
+def _dmy(days):
+    return (date.today() + timedelta(days=days)).strftime("%d/%m/%Y")
+
+
+def _seed(inventory_xlsx):
+    """Norte: A1 crítico, A2 próximo, A3 ok. Sur: A1 sin fecha, A4 crítico."""
+    norte = [
+        ("7790000000011", "A1", "Arroz", 10, 1, 0, _dmy(3), "01/08/2025"),
+        ("7790000000012", "A2", "Fideos", 20, 0, 5, _dmy(20), "01/08/2025"),
+        ("7790000000013", "A3", "Aceite", 6, 2, 0, _dmy(200), "01/08/2025"),
+    ]
+    sur = [
+        ("7790000000011", "A1", "Arroz", 10, 0, 4, "", "01/08/2025"),
+        ("7790000000014", "A4", "Harina", 1, 0, 8, _dmy(3), "01/08/2025"),
+    ]
+    for nombre, rows in (("Norte", norte), ("Sur", sur)):
+        import_service.importar_excel_bulk(str(inventory_xlsx(nombre, rows)), sucursal_nombre=nombre)
+
+
+def _fill(cell):
+    return cell.fill.fgColor.rgb[-6:] if cell.fill.fill_type == "solid" else None
+
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return list(csv.reader(f))
+
+
+ROWS = [
+    {"loc": 1, "codigo": "A1", "estado": "CRITICO", "cantidad": 10.0},
+    {"loc": 2, "codigo": "A2", "estado": "OK", "cantidad": None},
+    {"loc": 1, "codigo": "A3", "estado": "PROXIMO", "cantidad": 3.0},
+]
+COLS = ["codigo", "estado", "cantidad"]
+
+
+def test_write_report_xlsx_header_and_fills(tmp_path):
+    res = writer.write_report(tmp_path / "r.xlsx", iter(ROWS), COLS, {"codigo": "Código"},
+                              fill_column="estado", fills={"CRITICO": "#ffdddd", "PROXIMO": "#FFF3CD"})
+    assert res == {"files": [str(tmp_path / "r.xlsx")], "rows": 3, "sheets": {"datos": 3}}
+
+    ws = load_workbook(tmp_path / "r.xlsx")["datos"]
+    values = [[c.value for c in row] for row in ws.iter_rows()]
+    assert values[0] == ["Código", "estado", "cantidad"]
+    assert values[1:] == [["A1", "CRITICO", 10], ["A2", "OK", None], ["A3", "PROXIMO", 3]]
+    assert [_fill(ws.cell(row=r, column=2)) for r in (2, 3, 4)] == ["FFDDDD", None, "FFF3CD"]
+    assert _fill(ws.cell(row=2, column=1)) is None  # sólo la celda de fill_column
+
+
+def test_write_report_split_by_one_sheet_per_value(tmp_path):
+    res = writer.write_report(tmp_path / "r.xlsx", ROWS, COLS, split_by="loc",
+                              split_names={1: "Norte/Centro", 2: "Sur"})
+    assert res["sheets"] == {"Norte/Centro": 2, "Sur": 1}
+
+    wb = load_workbook(tmp_path / "r.xlsx")
+    assert wb.sheetnames == ["Norte_Centro", "Sur"]  # '/' no vale en un nombre de hoja
+    assert [r[0] for r in wb["Norte_Centro"].iter_rows(min_row=2, values_only=True)] == ["A1", "A3"]
+
+
+def test_write_report_csv_one_file_per_value(tmp_path):
+    res = writer.write_report(tmp_path / "r.csv", ROWS, COLS, split_by="loc",
+                              split_names={1: "Norte", 2: "Sur"}, delimiter=";")
+    assert res["files"] == [str(tmp_path / "r_Norte.csv"), str(tmp_path / "r_Sur.csv")]
+    assert _read_csv(tmp_path / "r_Sur.csv") == [["codigo;estado;cantidad"], ["A2;OK;"]]
+
+    res = writer.write_report(tmp_path / "vacio.csv", [], COLS)
+    assert res["rows"] == 0
+    assert _read_csv(tmp_path / "vacio.csv") == [COLS]
+
+
+@pytest.mark.parametrize("nombre", ["r.csv", "r.xlsx"])
+def test_write_report_abort_leaves_no_files(tmp_path, nombre):
+    def rows():
+        yield from ROWS
+        raise RuntimeError("falla a mitad de la exportación")
+
+    temporales = set(glob.glob(f"{tempfile.gettempdir()}/openpyxl.*"))
+    with pytest.raises(RuntimeError):
+        writer.write_report(tmp_path / nombre, rows(), COLS, split_by="loc")
+    assert list(tmp_path.iterdir()) == []
+    assert set(glob.glob(f"{tempfile.gettempdir()}/openpyxl.*")) == temporales
+
+
+def test_write_report_rejects_unknown_format(tmp_path):
+    with pytest.raises(ValueError, match=".txt"):
+        writer.write_report(tmp_path / "r.txt", ROWS, COLS)
+
+
+def test_export_expiries_by_branch_with_state_colors(db, inventory_xlsx, tmp_path):
+    _seed(inventory_xlsx)
+    res = stock_service.export_expiries(tmp_path / "v.xlsx", by_branch=True)
+    assert res["rows"] == 5
+    assert res["sheets"] == {"Norte": 3, "Sur": 2}
+
+    wb = load_workbook(tmp_path / "v.xlsx")
+    ws = wb["Norte"]
+    header = [c.value for c in ws[1]]
+    assert header[0] == stock_service.TITLES["sucursal"]
+    col = header.index(stock_service.TITLES["estado"]) + 1
+    estados = {ws.cell(row=r, column=col).value: _fill(ws.cell(row=r, column=col))
+               for r in range(2, ws.max_row + 1)}
+    assert set(estados) == {"CRITICO", "PROXIMO", "OK"}
+    for estado, color in estados.items():
+        esperado = expiry_service.STATE_COLORS.get(estado)
+        assert color == (esperado.lstrip("#").upper() if esperado else None)
+
+
+def test_export_expiries_filters_by_state_and_limit(db, inventory_xlsx, tmp_path):
+    _seed(inventory_xlsx)
+    res = stock_service.export_expiries(tmp_path / "v.csv", estados=["CRITICO"])
+    rows = _read_csv(tmp_path / "v.csv")
+    assert res["rows"] == len(rows) - 1 == 2
+    assert {r[1] for r in rows[1:]} == {"A1", "A4"}
+
+    norte = db.execute("SELECT id FROM locations WHERE nombre = 'Norte'").fetchone()[0]
+    res = stock_service.export_expiries(tmp_path / "uno.csv", location_id=norte, limit=1)
+    assert res["rows"] == 1
+
+
+def test_export_stock_search_and_by_branch(db, inventory_xlsx, tmp_path):
+    _seed(inventory_xlsx)
+    res = stock_service.export_stock(tmp_path / "s.csv", q="arroz", by_branch=True)
+    assert res["sheets"] == {"Norte": 1, "Sur": 1}
+
+    header, fila = _read_csv(tmp_path / "s_Sur.csv")
+    assert header == [stock_service.TITLES.get(c, c) for c in stock_service.STOCK_EXPORT_COLUMNS]
+    assert dict(zip(stock_service.STOCK_EXPORT_COLUMNS, fila)) == {
+        "sucursal": "Sur", "codigo": "A1", "descripcion": "Arroz", "ean": "7790000000011",
+        "lote": "", "fecha_venc": "", "cantidad": "4.0",
+    }
@@ -0,0 +1,114 @@
+# tools/bench_connection.py
+# Latencia por llamada de DAO: conexión nueva por llamada (como antes) contra la
+# conexión reusada del hilo con pragmas (app.dao.connection.get_conn).
+# Trabaja sobre bases temporales (no toca db/logistica.db).
+# Uso:
+#   python -m tools.bench_connection
+#   python -m tools.bench_connection --calls 5000
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Asegurar path del proyecto
+BASE = Path(__file__).resolve().parents[1]
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+from app.dao import (  # noqa: E402
+    connection, inventory_dao, item_dao, location_dao, movement_dao,
+    responsible_dao, sales_dao, stock_dao,
+)
+from app.utils.normalize import search_text  # noqa: E402
+
+DAO_MODULES = (connection, inventory_dao, item_dao, location_dao, movement_dao,
+               responsible_dao, sales_dao, stock_dao)
+
+
+def legacy_get_conn():
+    """El get_conn anterior: ruta resuelta y conexión nueva en cada llamada, sin pragmas."""
+    path = os.environ.get("DB_PATH")
+    if not path:
+        env_path = BASE / ".env"
+        path = str(BASE / "db" / "logistica.db")
+        if env_path.exists():
+            for line in env_path.read_text(encoding="utf-8").splitlines():
+                if line.strip().startswith("DB_PATH"):
+                    path = line.split("=", 1)[1].strip()
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.create_function("search_text", 1, search_text, deterministic=True)
+    return conn
+
+
+def seed() -> None:
+    with connection.get_conn() as conn:
+        cur = conn.cursor()
+        cur.executemany(
+            "INSERT INTO items(id, codigo, descripcion, ean) VALUES(?, ?, ?, ?)",
+            ((i, f"A{i}", f"Articulo {i}", f"779{i:010d}") for i in range(1, 1001)),
+        )
+        cur.executemany(
+            "INSERT INTO sales(import_id, location_id, item_id, fecha, cantidad) VALUES(NULL, 1, ?, ?, 1)",
+            ((i % 1000 + 1, f"2026-09-{i % 28 + 1:02d}") for i in range(20000)),
+        )
+        sales_dao.rebuild_daily(conn=conn)
+
+
+CASES = [
+    ("list_locations (lectura)", lambda i: location_dao.list_locations()),
+    ("get_or_create existente (lectura)", lambda i: item_dao.get_or_create(f"A{i % 1000 + 1}", "", f"779{i % 1000 + 1:010d}")),
+    ("sum_sales_between (lectura)", lambda i: sales_dao.sum_sales_between(1, i % 1000 + 1, "2026-09-01", "2026-09-30")),
+    ("apply_deltas (escritura + commit)",
+     lambda i: stock_dao.apply_deltas([(i % 1000 + 1, 1, None, "2026-12-31", 1.0)])),
+]
+
+
+def measure(calls: int, legacy: bool) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_PATH"] = str(Path(tmp) / "bench.db")
+        connection.init_db()
+        seed()
+        connection.close_conn()
+        if legacy:
+            # Modo de diario por defecto de antes (WAL queda grabado en el archivo)
+            with sqlite3.connect(os.environ["DB_PATH"]) as raw:
+                raw.execute("PRAGMA journal_mode = DELETE")
+            raw.close()
+        saved = {m: m.get_conn for m in DAO_MODULES if hasattr(m, "get_conn")}
+        if legacy:
+            for m in saved:
+                m.get_conn = legacy_get_conn
+        try:
+            out = {}
+            for name, fn in CASES:
+                t0 = time.perf_counter()
+                for i in range(calls):
+                    fn(i)
+                out[name] = (time.perf_counter() - t0) / calls * 1e6
+        finally:
+            for m, fn in saved.items():
+                m.get_conn = fn
+            connection.close_conn()
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Latencia de llamadas DAO: conexión por llamada vs reusada")
+    ap.add_argument("--calls", type=int, default=2000)
+    args = ap.parse_args()
+
+    before = measure(args.calls, legacy=True)
+    after = measure(args.calls, legacy=False)
+    print(f"{'llamada':<36} {'antes µs':>10} {'ahora µs':>10} {'x':>6}")
+    for name, _ in CASES:
+        b, a = before[name], after[name]
+        print(f"{name:<36} {b:>10.1f} {a:>10.1f} {b / a:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# tools/bench_dates.py
+# Compara to_date celda por celda contra to_date_series sobre una columna grande.
+# Uso:
+#   python -m tools.bench_dates
+#   python -m tools.bench_dates --rows 1000000 --distinct 400
+
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+# Asegurar path del proyecto
+BASE = Path(__file__).resolve().parents[1]
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+import pandas as pd  # noqa: E402
+
+from app.utils.dates import to_date, to_date_series  # noqa: E402
+
+
+def make_column(rows: int, distinct: int, seed: int = 42) -> pd.Series:
+    """Columna estilo ERP: pocas fechas distintas (dd/mm/yyyy), repetidas, con algo de basura."""
+    rnd = random.Random(seed)
+    base = date(2025, 1, 1)
+    pool = [(base + timedelta(days=i)).strftime("%d/%m/%Y") for i in range(distinct)]
+    pool += ["2025-03-01", "01/02/2025 10:30", "", "sin fecha"]  # formatos minoritarios
+    return pd.Series([rnd.choice(pool) for _ in range(rows)], dtype=object)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de parseo de fechas por columna")
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--distinct", type=int, default=400)
+    args = ap.parse_args()
+
+    col = make_column(args.rows, args.distinct)
+
+    t0 = time.perf_counter()
+    slow = col.map(to_date)
+    t_slow = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    fast = to_date_series(col)
+    t_fast = time.perf_counter() - t0
+
+    if slow.tolist() != fast.tolist():
+        print("✖ to_date_series no coincide con to_date")
+        sys.exit(1)
+
+    print(f"filas: {args.rows:,}  distintas: {args.distinct}")
+    print(f"to_date (.map):   {t_slow:8.3f} s")
+    print(f"to_date_series:   {t_fast:8.3f} s")
+    print(f"speedup:          {t_slow / t_fast:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
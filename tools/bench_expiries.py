@@ -0,0 +1,121 @@
+# tools/bench_expiries.py
+# Regresión de get_expiries: la cantidad de sentencias SQL NO debe crecer con las filas.
+# Trabaja sobre una base temporal (no toca db/logistica.db).
+# Uso:
+#   python -m tools.bench_expiries
+#   python -m tools.bench_expiries --sizes 100 1000 30000
+#   python -m tools.bench_expiries --classify 500000   (sólo la clasificación, en memoria)
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+# Asegurar path del proyecto
+BASE = Path(__file__).resolve().parents[1]
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+from app.dao import connection, sales_dao  # noqa: E402
+from app.dao.connection import get_conn, init_db  # noqa: E402
+from app.services.expiry_service import classify, get_expiries  # noqa: E402
+
+
+def seed(lots: int, seed: int = 7) -> None:
+    """Base con `lots` lotes en stock, su movimiento de import y ventas diarias."""
+    rnd = random.Random(seed)
+    today = date.today()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.executemany(
+            "INSERT INTO items(id, codigo, descripcion, ean) VALUES(?, ?, ?, ?)",
+            ((i, f"A{i}", f"Articulo {i}", f"779{i:010d}") for i in range(1, lots + 1)),
+        )
+        stock, movs, sales = [], [], []
+        for i in range(1, lots + 1):
+            fv = (today + timedelta(days=rnd.randint(-10, 120))).isoformat()
+            recep = today - timedelta(days=rnd.randint(1, 60))
+            stock.append((i, 1, fv, 100.0))
+            movs.append(("import", i, 1, 100.0, fv, f"{recep.isoformat()} 10:00:00", "import:1"))
+            for d in range(0, 5):
+                sales.append((1, i, (recep + timedelta(days=d)).isoformat(), 1.0))
+        cur.executemany(
+            "INSERT INTO stock(item_id, location_id, fecha_venc, cantidad) VALUES(?, ?, ?, ?)", stock)
+        cur.executemany(
+            "INSERT INTO movements(tipo, item_id, location_id, delta, fecha_venc, ts, origen) "
+            "VALUES(?, ?, ?, ?, ?, ?, ?)", movs)
+        cur.executemany(
+            "INSERT INTO sales(import_id, location_id, item_id, fecha, cantidad) VALUES(NULL, ?, ?, ?, ?)",
+            sales)
+        # Las ventas se cargan directo: el rollup diario se arma de una vez
+        sales_dao.rebuild_daily(conn=conn)
+
+
+def measure(lots: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_PATH"] = str(Path(tmp) / "bench.db")
+        init_db()
+        seed(lots)
+
+        statements = []
+        connection.set_trace(statements.append)
+        try:
+            t0 = time.perf_counter()
+            rows = get_expiries(None, None, True)
+            secs = time.perf_counter() - t0
+        finally:
+            connection.set_trace(None)
+        # Misma vista sin escrituras de por medio: sale de la cache de resultados
+        t0 = time.perf_counter()
+        get_expiries(None, None, True)
+        cached = time.perf_counter() - t0
+        connection.close_conn()
+    return {"lots": lots, "rows": len(rows), "statements": len(statements), "seconds": secs,
+            "cached": cached}
+
+
+def measure_classify(lots: int, seed: int = 7) -> float:
+    """Segundos de classify (días, estado, restante) sobre `lots` lotes sintéticos."""
+    rnd = random.Random(seed)
+    today = date.today()
+    fechas = [None if rnd.random() < 0.05 else (today + timedelta(days=rnd.randint(-30, 365))).isoformat()
+              for _ in range(lots)]
+    ingresado = [float(rnd.randint(1, 500)) for _ in range(lots)]
+    ventas = [float(rnd.randint(0, 500)) for _ in range(lots)]
+    recepcion = [rnd.random() < 0.9 for _ in range(lots)]
+    t0 = time.perf_counter()
+    classify(fechas, ingresado, ventas, recepcion, 7, 30, include_expired=False, today=today)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark / regresión de consultas de get_expiries")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    ap.add_argument("--classify", type=int, metavar="LOTES",
+                    help="Mide sólo la clasificación por columnas con LOTES lotes")
+    args = ap.parse_args()
+
+    if args.classify:
+        secs = measure_classify(args.classify)
+        print(f"classify: {args.classify:,} lotes en {secs:.3f} s")
+        return
+
+    results = [measure(n) for n in args.sizes]
+    for r in results:
+        print(f"lotes: {r['lots']:>8,}  filas: {r['rows']:>8,}  "
+              f"sentencias SQL: {r['statements']:>4}  tiempo: {r['seconds']:.3f} s  "
+              f"repetida: {r['cached'] * 1000:.2f} ms")
+
+    counts = {r["statements"] for r in results}
+    if len(counts) > 1:
+        print("✖ La cantidad de consultas crece con el tamaño del resultado (N+1).")
+        sys.exit(1)
+    print("✔ Cantidad de consultas constante.")
+
+
+if __name__ == "__main__":
+    main()
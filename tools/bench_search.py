@@ -0,0 +1,84 @@
+# tools/bench_search.py
+# Búsqueda de items: índice items_fts (trigram) contra el LIKE '%q%' de antes.
+# Trabaja sobre una base temporal (no toca db/logistica.db).
+# Uso:
+#   python -m tools.bench_search
+#   python -m tools.bench_search --items 300000 --queries leche 7790001 "dulce de"
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Asegurar path del proyecto
+BASE = Path(__file__).resolve().parents[1]
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+from app.dao.connection import close_conn, get_conn, init_db  # noqa: E402
+from app.dao.item_dao import resolve_many, search_item_ids  # noqa: E402
+
+WORDS = ["leche", "yerba", "azúcar", "galletitas", "dulce de leche", "fideos", "arroz",
+         "aceite", "café", "jabón", "queso", "pan", "manteca", "té", "gaseosa", "agua"]
+BRANDS = ["La Serenísima", "Playadito", "Ledesma", "Bagley", "Arcor", "Lucchetti",
+          "Gallo", "Cocinero", "La Virginia", "Dove", "Sancor", "Cañuelas"]
+
+
+def seed(n: int, seed: int = 7) -> None:
+    """Alta por resolve_many (como la importación): un INSERT ... SELECT masivo."""
+    rnd = random.Random(seed)
+    resolve_many(
+        (f"A{i}", f"779{i:010d}", f"{rnd.choice(WORDS)} {rnd.choice(BRANDS)} {rnd.randint(1, 999)}g")
+        for i in range(1, n + 1)
+    )
+
+
+def like_ids(q: str) -> list:
+    like = f"%{q}%"
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT id FROM items WHERE codigo LIKE ? OR ean LIKE ? OR descripcion LIKE ?",
+            (like, like, like),
+        )
+        return [r[0] for r in cur.fetchall()]
+
+
+def timed(fn, q: str, repeat: int):
+    best, res = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        res = fn(q)
+        secs = time.perf_counter() - t0
+        best = secs if best is None else min(best, secs)
+    return res, best
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de búsqueda de items (FTS5 vs LIKE)")
+    ap.add_argument("--items", type=int, default=100_000)
+    ap.add_argument("--queries", nargs="+",
+                    default=["serenisima", "0000012", "dulce de", "cafe gallo", "A99"])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_PATH"] = str(Path(tmp) / "bench.db")
+        init_db()
+        t0 = time.perf_counter()
+        seed(args.items)
+        print(f"items: {args.items:,}  (alta con índice: {time.perf_counter() - t0:.2f} s)")
+
+        for q in args.queries:
+            fts, t_fts = timed(search_item_ids, q, args.repeat)
+            like, t_like = timed(like_ids, q, args.repeat)
+            print(f"{q!r:>16}  fts: {len(fts):>7,} en {t_fts * 1000:8.2f} ms   "
+                  f"like: {len(like):>7,} en {t_like * 1000:8.2f} ms")
+        close_conn()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# tools/bench_startup.py
+# Tiempo de arranque: imports (estilo `python -X importtime`) e init_db.
+# - imports: cada módulo se importa en un proceso nuevo con -X importtime; se toma
+#   el acumulado del módulo y se listan los más pesados y si cargó pandas/numpy/etc.
+# - init_db: en frío (base nueva) y en caliente (schema al día, PRAGMA user_version).
+# - --window: además construye MainWindow (necesita display).
+# Uso:
+#   python -m tools.bench_startup
+#   python -m tools.bench_startup --top 15 --repeat 5
+#   python -m tools.bench_startup --json
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Asegurar path del proyecto
+BASE = Path(__file__).resolve().parents[1]
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+# Lo que importa cada punto de entrada (main.py = UI; python -m app = CLI)
+ENTRY_MODULES = {
+    "ui": "app.ui.ui_main",
+    "cli": "app.cli",
+}
+HEAVY = ("pandas", "numpy", "openpyxl", "tkcalendar", "python_calamine")
+
+
+def import_time(module: str, top: int = 10) -> dict:
+    """Importa `module` en un proceso nuevo con -X importtime y resume la salida."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(BASE), env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []  # (self_us, cumulative_us, nombre)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(self_us), int(cum_us), name.strip()))
+    total = next((c for _, c, n in rows if n == module), sum(s for s, _, _ in rows))
+    loaded = {n.split(".")[0] for _, _, n in rows}
+    return {
+        "module": module,
+        "ms": round(total / 1000, 2),
+        "modules": len(rows),
+        "heavy": sorted(h for h in HEAVY if h in loaded),
+        "top": [{"module": n, "self_ms": round(s / 1000, 2)}
+                for s, _, n in sorted(rows, reverse=True)[:top]],
+    }
+
+
+def init_db_times(repeat: int = 3) -> dict:
+    """init_db en una base nueva (frío) y repetido con el schema al día (caliente)."""
+    from app.dao import connection
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old = os.environ.get("DB_PATH")
+        os.environ["DB_PATH"] = str(Path(tmp) / "startup.db")
+        try:
+            t0 = time.perf_counter()
+            connection.init_db()
+            cold = time.perf_counter() - t0
+            warm = None
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                connection.init_db()
+                secs = time.perf_counter() - t0
+                warm = secs if warm is None else min(warm, secs)
+        finally:
+            connection.close_conn()
+            if old is None:
+                os.environ.pop("DB_PATH", None)
+            else:
+                os.environ["DB_PATH"] = old
+    return {"cold_ms": round(cold * 1000, 3), "warm_ms": round(warm * 1000, 3)}
+
+
+def window_time() -> dict:
+    """Construcción de MainWindow hasta el primer pintado (None sin display)."""
+    import tkinter as tk
+    try:
+        t0 = time.perf_counter()
+        from app.ui.ui_main import MainWindow
+        win = MainWindow()
+        win.update()
+        secs = time.perf_counter() - t0
+        win.destroy()
+    except tk.TclError as e:
+        return {"ms": None, "error": str(e)}
+    return {"ms": round(secs * 1000, 2)}
+
+
+def measure(repeat: int = 3, top: int = 10, window: bool = False) -> dict:
+    """Todas las mediciones; para imports se toma la mejor de `repeat` corridas."""
+    out = {}
+    for key, module in ENTRY_MODULES.items():
+        runs = [import_time(module, top) for _ in range(repeat)]
+        out[f"import_{key}"] = min(runs, key=lambda r: r["ms"])
+    out["init_db"] = init_db_times(repeat)
+    if window:
+        out["window"] = window_time()
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de arranque (imports + init_db)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--top", type=int, default=10, help="Módulos más pesados a listar")
+    ap.add_argument("--window", action="store_true", help="Medir también MainWindow (requiere display)")
+    ap.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = ap.parse_args()
+
+    res = measure(args.repeat, args.top, args.window)
+    if args.json:
+        print(json.dumps(res, ensure_ascii=False, indent=2))
+        return
+
+    for key in ENTRY_MODULES:
+        r = res[f"import_{key}"]
+        heavy = ", ".join(r["heavy"]) or "ninguno"
+        print(f"import {r['module']:<20} {r['ms']:>9.1f} ms  {r['modules']:>4} módulos  pesados: {heavy}")
+        for t in r["top"]:
+            print(f"    {t['self_ms']:>8.2f} ms  {t['module']}")
+    d = res["init_db"]
+    print(f"init_db: frío {d['cold_ms']:.1f} ms, caliente {d['warm_ms']:.3f} ms")
+    if "window" in res:
+        w = res["window"]
+        print(f"MainWindow: {w['ms']} ms" if w["ms"] is not None else f"MainWindow: sin display ({w['error']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+# tools/bench_suite.py
+# Suite de benchmarks sobre datos sintéticos (tools/synth_data.py) a varias escalas:
+# importación de inventarios, importación de ventas, vista de vencimientos y búsqueda.
+# Además el arranque (imports de UI/CLI e init_db, ver tools/bench_startup.py).
+# Cada escala corre en una carpeta/base temporal (no toca db/logistica.db).
+# La salida es JSON, para guardar y comparar entre corridas.
+# Uso:
+#   python -m tools.bench_suite                               (escalas s y m, JSON a stdout)
+#   python -m tools.bench_suite --scales s m l --out bench.json
+#   python -m tools.bench_suite --scales s --compare bench.json   (falla si algo empeora)
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Asegurar path del proyecto
+BASE = Path(__file__).resolve().parents[1]
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+from app.dao import connection, location_dao  # noqa: E402
+from app.dao.item_dao import search_item_ids  # noqa: E402
+from app.services import expiry_service  # noqa: E402
+from app.services.import_service import importar_excel_bulk  # noqa: E402
+from app.services.sales_service import import_sales_from_excel  # noqa: E402
+from tools import bench_startup  # noqa: E402
+from tools.synth_data import build_dataset  # noqa: E402
+
+SCALES = {
+    "s": dict(branches=2, items=500, lots=2, months=2, items_per_day=50),
+    "m": dict(branches=4, items=5000, lots=3, months=3, items_per_day=300),
+    "l": dict(branches=8, items=20000, lots=4, months=6, items_per_day=1000),
+}
+QUERIES = ["serenisima", "dulce de", "779000000", "A0001", "cafe"]
+
+
+def _timed(fn, repeat: int = 1):
+    """(resultado de la última corrida, mejor tiempo en segundos)."""
+    best, res = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        res = fn()
+        secs = time.perf_counter() - t0
+        best = secs if best is None else min(best, secs)
+    return res, best
+
+
+def run_scale(name: str, repeat: int = 3) -> dict:
+    params = SCALES[name]
+    out = {"params": params}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_PATH"] = str(Path(tmp) / "bench.db")
+        try:
+            ds, secs = _timed(lambda: build_dataset(Path(tmp) / "xlsx", **params))
+            out["generate_s"] = round(secs, 3)
+
+            connection.init_db()
+            location_dao.ensure_ids(ds["branches"])
+
+            rows = sum(inv["rows"] for inv in ds["inventories"])
+            _, secs = _timed(lambda: [
+                importar_excel_bulk(inv["path"], sucursal_id=inv["branch"], responsable_nombre="Sistema")
+                for inv in ds["inventories"]
+            ])
+            out["import_inventory"] = {"rows": rows, "seconds": round(secs, 3),
+                                       "rows_per_sec": round(rows / secs, 1)}
+
+            res, secs = _timed(lambda: import_sales_from_excel(
+                ds["sales"]["path"], import_name="bench", allow_multi_month=True))
+            out["import_sales"] = {"rows": res["rows"], "seconds": round(secs, 3),
+                                   "rows_per_sec": round(res["rows"] / secs, 1)}
+
+            # Vista de vencimientos: sin cache (cold) y repetida (cache de resultados)
+            expiry_service.clear_cache()
+            res, secs = _timed(lambda: expiry_service.get_expiries(None, None, True))
+            out["expiries_all"] = {"rows": len(res), "seconds": round(secs, 4)}
+            _, secs = _timed(lambda: expiry_service.get_expiries(None, None, True), repeat)
+            out["expiries_all_cached_s"] = round(secs, 6)
+
+            def first_page():
+                expiry_service.clear_cache()
+                return expiry_service.get_expiries_page(ds["branches"][0], None, False)
+            _, secs = _timed(first_page, repeat)
+            out["expiries_first_page_s"] = round(secs, 5)
+
+            def last_page():
+                expiry_service.clear_cache()
+                page, nxt = expiry_service.get_expiries_page(None, None, True)
+                while nxt is not None:
+                    page, nxt = expiry_service.get_expiries_page(None, None, True, after=nxt)
+                return page
+            _, secs = _timed(last_page)
+            out["expiries_scroll_all_s"] = round(secs, 4)
+
+            search = {}
+            for q in QUERIES:
+                ids, secs = _timed(lambda: search_item_ids(q), repeat)
+                search[q] = {"hits": len(ids), "seconds": round(secs, 5)}
+            out["search"] = search
+        finally:
+            connection.close_conn()
+            expiry_service.clear_cache()
+    return out
+
+
+# Métricas comparables (menor es mejor): ruta dentro del resultado de una escala
+METRICS = [
+    ("import_inventory", "seconds"),
+    ("import_sales", "seconds"),
+    ("expiries_all", "seconds"),
+    ("expiries_all_cached_s",),
+    ("expiries_first_page_s",),
+    ("expiries_scroll_all_s",),
+]
+
+
+def _metrics(scale_result: dict) -> dict:
+    out = {}
+    for path in METRICS:
+        v = scale_result
+        for k in path:
+            v = v.get(k) if isinstance(v, dict) else None
+        if v is not None:
+            out[".".join(path)] = v
+    for q, r in scale_result.get("search", {}).items():
+        out[f"search.{q}"] = r["seconds"]
+    return out
+
+
+# Arranque (no depende de la escala). init_db en caliente no entra: son µs, puro ruido.
+STARTUP_METRICS = [
+    ("import_ui", "ms"),
+    ("import_cli", "ms"),
+    ("init_db", "cold_ms"),
+]
+
+
+def _startup_metrics(startup: dict) -> dict:
+    out = {}
+    for a, b in STARTUP_METRICS:
+        v = startup.get(a, {}).get(b)
+        if v is not None:
+            out[f"{a}.{b}"] = v
+    return out
+
+
+def compare(old: dict, new: dict, tolerance: float) -> bool:
+    """Imprime la comparación por métrica; False si alguna empeoró más que tolerance."""
+    ok = True
+    pairs = [(scale, _metrics(old["results"][scale]), _metrics(res))
+             for scale, res in new["results"].items() if scale in old.get("results", {})]
+    if "startup" in old and "startup" in new:
+        pairs.append(("startup", _startup_metrics(old["startup"]), _startup_metrics(new["startup"])))
+    for scale, before, after in pairs:
+        print(f"[{scale}]", file=sys.stderr)
+        for k, b in before.items():
+            a = after.get(k)
+            if a is None or not b:
+                continue
+            ratio = a / b
+            worse = ratio > 1 + tolerance
+            ok = ok and not worse
+            mark = "✖" if worse else "✔"
+            print(f"  {mark} {k:<32} {b:>11.5f} → {a:>11.5f}  ({ratio:5.2f}x)", file=sys.stderr)
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Suite de benchmarks sobre datos sintéticos")
+    ap.add_argument("--scales", nargs="+", choices=sorted(SCALES), default=["s", "m"])
+    ap.add_argument("--repeat", type=int, default=3,
+                    help="Repeticiones de las mediciones rápidas (se toma la mejor)")
+    ap.add_argument("--out", help="Guardar el JSON en este archivo (además de stdout)")
+    ap.add_argument("--compare", help="JSON de una corrida anterior para comparar")
+    ap.add_argument("--tolerance", type=float, default=0.25,
+                    help="Empeoramiento tolerado en --compare (0.25 = 25%%)")
+    args = ap.parse_args()
+
+    result = {
+        "meta": {
+            "when": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "startup": bench_startup.measure(args.repeat, top=5),
+        "results": {name: run_scale(name, args.repeat) for name in args.scales},
+    }
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+
+    if args.compare:
+        old = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if not compare(old, result, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
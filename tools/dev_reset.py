@@ -1,12 +1,12 @@
 # tools/dev_reset.py
-# Limpieza de datos para desarrollo.
+# Limpieza de datos para desarrollo (sin display: también `python -m app reset ...`).
 # Uso:
 #   python tools/dev_reset.py --only-inventories
 #   python tools/dev_reset.py --all
-#   python tools/dev_reset.py --delete-inventory 35
+#   python tools/dev_reset.py --delete-inventory 35 36
+#   python tools/dev_reset.py --rebuild-lot-summary
+#   python tools/dev_reset.py --rebuild-sales-daily
 
-from app.dao import stock_dao, movement_dao
-from app.dao.connection import get_conn, init_db
 import argparse
 import sys
 from pathlib import Path
@@ -16,103 +16,47 @@ BASE = Path(__file__).resolve().parents[1]
 if str(BASE) not in sys.path:
     sys.path.insert(0, str(BASE))
 
+from app.services import maintenance_service  # noqa: E402
+
 
 def clear_inventories_and_stock():
-    """
-    Elimina:
-      - inventory_rows
-      - movements
-      - inventories
-      - stock
-    Deja: locations, responsibles, items (para no perder maestros).
-    """
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("DELETE FROM inventory_rows")
-        cur.execute("DELETE FROM movements")
-        cur.execute("DELETE FROM inventories")
-        cur.execute("DELETE FROM stock")
-        conn.commit()
+    """Inventarios, filas, movimientos y stock (ver maintenance_service)."""
+    res = maintenance_service.clear_inventories_and_stock()
     print("✔ Inventarios, filas, movimientos y stock eliminados (maestros conservados).")
+    return res
 
 
-def delete_inventory(inv_id: int):
-    """
-    Elimina una importación específica revirtiendo su impacto en stock.
-    - Resta del stock cada 'cantidad_total' de esa importación.
-    - Inserta movimientos de reversa.
-    - Borra inventory_rows, movimientos del origen import:inv_id, y el inventory.
-    """
-    with get_conn() as conn:
-        cur = conn.cursor()
-
-        # Obtener sucursal del inventario
-        cur.execute(
-            "SELECT id, sucursal_id FROM inventories WHERE id=?", (inv_id,))
-        inv = cur.fetchone()
-        if not inv:
-            print(f"✖ No existe inventario id={inv_id}")
-            return
-        sucursal_id = inv["sucursal_id"]
-
-        # Traer filas del inventario
-        cur.execute("""
-            SELECT ir.item_id, ir.cantidad_total, ir.fecha_vencimiento
-            FROM inventory_rows ir
-            WHERE ir.inventory_id=?
-        """, (inv_id,))
-        rows = cur.fetchall()
-
-        # Revertir stock y crear movimiento de reversa
-        for r in rows:
-            item_id = r["item_id"]
-            delta = -float(r["cantidad_total"] or 0.0)
-            fv = r["fecha_vencimiento"]
-            # upsert negativo
-            stock_dao.upsert_stock(item_id, sucursal_id, None, fv, delta)
-            # movimiento de reversa
-            movement_dao.insert_movement(
-                tipo="reversa",
-                item_id=item_id,
-                location_id=sucursal_id,
-                delta=delta,
-                lote=None,
-                fecha_venc=(fv if isinstance(fv, str)
-                            or fv is None else str(fv)),
-                origen=f"reversa:{inv_id}",
-            )
-
-        # Borrar movimientos de ese import
-        cur.execute("DELETE FROM movements WHERE origen=?",
-                    (f"import:{inv_id}",))
-        # Borrar filas e inventario
-        cur.execute(
-            "DELETE FROM inventory_rows WHERE inventory_id=?", (inv_id,))
-        cur.execute("DELETE FROM inventories WHERE id=?", (inv_id,))
-        conn.commit()
-
-    print(f"✔ Inventario {inv_id} eliminado y stock revertido.")
+def delete_inventory(*inv_ids: int):
+    """Elimina una o varias importaciones revirtiendo su impacto en stock (todo o nada)."""
+    try:
+        res = maintenance_service.delete_inventory(*inv_ids)
+    except ValueError as e:
+        print(f"✖ {e}")
+        return None
+    ids = ", ".join(map(str, res["inventory_ids"]))
+    print(f"✔ Inventario(s) {ids} eliminado(s) y stock revertido ({res['rows']} filas, {res['seconds']} s).")
+    return res
 
 
 def reset_all():
-    """
-    Borra TODO y vuelve a crear el schema + seed (Sucursal 1, Sistema).
-    Útil cuando querés arrancar de cero.
-    """
-    # Drop todas las tablas conocidas y recrear schema
-    with get_conn() as conn:
-        cur = conn.cursor()
-        # Intento rápido de drop; si no existen, no pasa nada
-        for t in ["inventory_rows", "movements", "stock", "inventories", "items", "responsibles", "locations"]:
-            try:
-                cur.execute(f"DROP TABLE IF EXISTS {t}")
-            except Exception:
-                pass
-        conn.commit()
-
-    # Recrear schema + seed
-    init_db()
+    """Borra TODO y vuelve a crear el schema + seed (Sucursal 1, Sistema)."""
+    res = maintenance_service.reset_all()
     print("✔ Base recreada y semillada (Sucursal 1 / Sistema).")
+    return res
+
+
+def rebuild_lot_summary():
+    """Recalcula lot_summary completo desde movements (import/recepcion)."""
+    res = maintenance_service.rebuild_lot_summary()
+    print(f"✔ lot_summary reconstruida ({res['lots']} lotes).")
+    return res
+
+
+def rebuild_sales_daily():
+    """Recalcula sales_daily (totales diarios y acumulados) desde sales."""
+    res = maintenance_service.rebuild_sales_daily()
+    print(f"✔ sales_daily reconstruida ({res['days']} días).")
+    return res
 
 
 def main():
@@ -122,8 +66,12 @@ def main():
                     help="Elimina inventories, inventory_rows, movements y stock")
     ap.add_argument("--all", action="store_true",
                     help="Borra TODO y recrea schema + seed")
-    ap.add_argument("--delete-inventory", type=int,
-                    help="Elimina una importación por ID (revirtiendo stock)")
+    ap.add_argument("--delete-inventory", type=int, nargs="+", metavar="ID",
+                    help="Elimina una o varias importaciones por ID (revirtiendo stock)")
+    ap.add_argument("--rebuild-lot-summary", action="store_true",
+                    help="Recalcula lot_summary desde movements")
+    ap.add_argument("--rebuild-sales-daily", action="store_true",
+                    help="Recalcula sales_daily desde sales")
 
     args = ap.parse_args()
 
@@ -136,7 +84,15 @@ def main():
         return
 
     if args.delete_inventory is not None:
-        delete_inventory(args.delete_inventory)
+        delete_inventory(*args.delete_inventory)
+        return
+
+    if args.rebuild_lot_summary:
+        rebuild_lot_summary()
+        return
+
+    if args.rebuild_sales_daily:
+        rebuild_sales_daily()
         return
 
     ap.print_help()
@@ -0,0 +1,60 @@
+# tools/import_folder.py
+# Importa todos los inventarios (.xlsx) de una carpeta, uno por sucursal.
+# Uso:
+#   python -m tools.import_folder data/inputs/semana
+#   python -m tools.import_folder data/inputs/semana --sucursal Corrientes --workers 4
+#   python -m tools.import_folder data/inputs/semana --json
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Asegurar path del proyecto
+BASE = Path(__file__).resolve().parents[1]
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+from app.dao.connection import init_db  # noqa: E402
+from app.services.import_service import importar_carpeta  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Importación en lote de una carpeta de inventarios")
+    ap.add_argument("directory", help="Carpeta con los Excel (resumen + vencimientos)")
+    ap.add_argument("--sucursal",
+                    help="Sucursal para todos los archivos (por defecto: nombre del archivo)")
+    ap.add_argument("--responsable", default="Sistema")
+    ap.add_argument("--pattern", default="*.xlsx")
+    ap.add_argument("--workers", type=int, default=None,
+                    help="Procesos de parseo (por defecto: CPUs disponibles)")
+    ap.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = ap.parse_args()
+
+    init_db()
+    results = importar_carpeta(
+        args.directory,
+        sucursal_nombre=args.sucursal,
+        responsable_nombre=args.responsable,
+        pattern=args.pattern,
+        workers=args.workers,
+    )
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        for r in results:
+            mark = {"ok": "✔", "duplicado": "•"}.get(r["status"], "✖")
+            extra = f"inventario {r['inventory_id']}" if r["status"] == "ok" else (r["error"] or "")
+            print(f"{mark} {Path(r['file']).name:40s} {r['status']:10s} "
+                  f"{r['rows']:>8} filas {r['seconds']:>8.2f} s  {extra}")
+        ok = sum(1 for r in results if r["status"] == "ok")
+        print(f"{ok}/{len(results)} archivos importados.")
+
+    if any(r["status"] == "error" for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
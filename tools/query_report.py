@@ -0,0 +1,85 @@
+# tools/query_report.py
+# Reporte de las consultas más costosas a partir del volcado de app/dao/profiler.py.
+# Para generar el volcado, correr la app (o un script) con DB_PROFILE=1:
+#   DB_PROFILE=1 DB_PROFILE_SLOW_MS=20 python main.py
+# Al salir se escribe db/query_profile.json (o DB_PROFILE_OUT).
+# Uso:
+#   python -m tools.query_report
+#   python -m tools.query_report --sort calls --top 10
+#   python -m tools.query_report otro_perfil.json --plans
+#   python -m tools.query_report --json        (las N primeras sentencias en JSON)
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Asegurar path del proyecto
+BASE = Path(__file__).resolve().parents[1]
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+from app.dao.profiler import DEFAULT_OUT  # noqa: E402
+
+SORTS = {
+    "total": "total_ms",
+    "calls": "calls",
+    "avg": "avg_ms",
+    "p95": "p95_ms",
+    "rows": "rows",
+}
+
+
+def top_statements(statements, sort: str = "total", top: int = 20):
+    key = SORTS[sort]
+    return sorted(statements, key=lambda s: s[key], reverse=True)[:top]
+
+
+def _short(sql: str, width: int) -> str:
+    return sql if len(sql) <= width else sql[: width - 1] + "…"
+
+
+def print_report(profile: dict, sort: str, top: int, plans: bool, width: int) -> None:
+    stmts = profile.get("statements", [])
+    total_ms = sum(s["total_ms"] for s in stmts) or 1.0
+    total_calls = sum(s["calls"] for s in stmts)
+    print(f"Perfil de {profile.get('when', '?')} (pid {profile.get('pid', '?')}): "
+          f"{len(stmts)} sentencias distintas, {total_calls} llamadas, {total_ms:.1f} ms en SQL")
+    print(f"{'llamadas':>9} {'total ms':>10} {'%':>5} {'prom ms':>9} {'p95 ms':>9} {'filas':>9}  sentencia")
+    for s in top_statements(stmts, sort, top):
+        pct = 100 * s["total_ms"] / total_ms
+        print(f"{s['calls']:>9} {s['total_ms']:>10.1f} {pct:>5.1f} {s['avg_ms']:>9.3f} "
+              f"{s['p95_ms']:>9.3f} {s['rows']:>9}  {_short(s['sql'], width)}")
+        callers = sorted(s.get("callers", {}).items(), key=lambda kv: kv[1], reverse=True)[:3]
+        if callers:
+            print(" " * 56 + "desde: " + ", ".join(f"{c} ({n})" for c, n in callers))
+        if plans and s.get("plan"):
+            for line in s["plan"]:
+                print(" " * 58 + line)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Consultas SQL más costosas (volcado de DB_PROFILE=1)")
+    ap.add_argument("path", nargs="?", default=str(DEFAULT_OUT), help="Archivo JSON del perfil")
+    ap.add_argument("--top", type=int, default=20)
+    ap.add_argument("--sort", choices=sorted(SORTS), default="total")
+    ap.add_argument("--plans", action="store_true",
+                    help="Mostrar EXPLAIN QUERY PLAN (si se capturó con DB_PROFILE_SLOW_MS)")
+    ap.add_argument("--width", type=int, default=100, help="Ancho máximo del texto SQL")
+    ap.add_argument("--json", action="store_true", help="Salida JSON en vez de tabla")
+    args = ap.parse_args()
+
+    path = Path(args.path)
+    if not path.exists():
+        sys.exit(f"No existe {path}. Correr la app con DB_PROFILE=1 para generarlo.")
+    profile = json.loads(path.read_text(encoding="utf-8"))
+
+    if args.json:
+        print(json.dumps(top_statements(profile.get("statements", []), args.sort, args.top),
+                         ensure_ascii=False, indent=2))
+    else:
+        print_report(profile, args.sort, args.top, args.plans, args.width)
+
+
+if __name__ == "__main__":
+    main()
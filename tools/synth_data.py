@@ -0,0 +1,214 @@
+# tools/synth_data.py
+# Datos sintéticos con la forma de los exports del ERP, para pruebas y benchmarks.
+# - Inventarios: un Excel por sucursal con hojas 'resumen' y 'vencimientos'
+#   (M items, K lotes por item; cantidades con coma decimal "0,5").
+# - Ventas: un Excel con Sucursal / Fecha / Código Artículo / Cantidad por día,
+#   varios meses, con los formatos argentinos que acepta la importación
+#   ("1.200,00", "2,500", "3").
+# Todo es determinístico para una misma semilla.
+# Uso:
+#   python -m tools.synth_data data/synth
+#   python -m tools.synth_data data/synth --branches 4 --items 5000 --lots 3 --months 3
+#   python -m tools.synth_data data/synth --load        (además importa a la base de DB_PATH/.env)
+
+import argparse
+import json
+import random
+import sys
+from calendar import monthrange
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Asegurar path del proyecto
+BASE = Path(__file__).resolve().parents[1]
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+from openpyxl import Workbook  # noqa: E402
+
+PRODUCTOS = [
+    "Leche entera", "Leche descremada", "Yogur bebible", "Dulce de leche", "Queso cremoso",
+    "Manteca", "Crema de leche", "Yerba mate", "Café molido", "Té en saquitos",
+    "Galletitas de agua", "Galletitas dulces", "Fideos tirabuzón", "Arroz largo fino",
+    "Aceite de girasol", "Puré de tomate", "Mermelada de durazno", "Jugo en polvo",
+    "Gaseosa cola", "Agua mineral", "Jabón en polvo", "Lavandina", "Harina 0000",
+    "Azúcar", "Sal fina", "Picadillo", "Atún en aceite", "Arvejas", "Choclo cremoso",
+]
+MARCAS = [
+    "La Serenísima", "SanCor", "Taragüí", "Playadito", "Rosamonte", "Cabrales",
+    "Bagley", "Terrabusi", "Matarazzo", "Lucchetti", "Gallo", "Natura", "Cocinero",
+    "Arcor", "Knorr", "Tang", "Villavicencio", "Ledesma", "Celusal", "Swift",
+]
+PRESENTACIONES = ["200 g", "500 g", "1 kg", "1 L", "1,5 L", "2,25 L", "x 6", "x 12", "250 cc", "400 g"]
+
+RESUMEN_COLS = ["Inventario_ID", "Nombre", "Observación", "Fecha de Creación",
+                "Fecha de Exportación", "Total Filas", "Tipo"]
+VENC_COLS = ["EAN", "Código Artículo", "Descripción", "Unidades por bulto", "Bultos",
+             "Cantidad", "Fecha de Vencimiento", "Fecha de Ingreso"]
+SALES_COLS = ["Sucursal", "Fecha", "Código Artículo", "Cantidad"]
+
+
+def catalog(items: int, seed: int = 7) -> List[Tuple[str, str, str]]:
+    """M artículos (codigo, ean, descripcion) con descripciones realistas (acentos incluidos)."""
+    rnd = random.Random(seed)
+    out = []
+    for i in range(1, items + 1):
+        desc = f"{rnd.choice(PRODUCTOS)} {rnd.choice(MARCAS)} {rnd.choice(PRESENTACIONES)}"
+        out.append((f"A{i:06d}", f"779{i:010d}", desc))
+    return out
+
+
+def _ar_decimal(x: float, decimals: int = 2) -> str:
+    """1234.5 → '1.234,50' (formato argentino con separador de miles)."""
+    s = f"{x:,.{decimals}f}"
+    return s.replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+def _write(path: Path, sheets: Dict[str, Tuple[Sequence[str], object]]) -> None:
+    """Escribe hojas {nombre: (cabecera, filas)} en modo streaming."""
+    wb = Workbook(write_only=True)
+    for name, (header, rows) in sheets.items():
+        ws = wb.create_sheet(name)
+        ws.append(list(header))
+        for row in rows:
+            ws.append(list(row))
+    wb.save(path)
+
+
+def write_inventory(path: Path, items: List[Tuple[str, str, str]], branch: int, lots: int,
+                    export_day: date, seed: int = 7) -> int:
+    """
+    Inventario de una sucursal: K lotes por artículo (vencimientos distintos),
+    ~2% sin fecha. Devuelve la cantidad de filas de 'vencimientos'.
+    """
+    rnd = random.Random(seed * 1000 + branch)
+    rows = []
+    for codigo, ean, desc in items:
+        upb = rnd.choice([1, 6, 12, 24])
+        for _ in range(lots):
+            venc = ("" if rnd.random() < 0.02
+                    else (export_day + timedelta(days=rnd.randint(-20, 400))).strftime("%d/%m/%Y"))
+            ingreso = (export_day - timedelta(days=rnd.randint(1, 90))).strftime("%d/%m/%Y")
+            cantidad = rnd.choice(["0", "1", "3", "0,5", "2,25"])
+            rows.append((ean, codigo, desc, str(upb), str(rnd.randint(0, 20)), cantidad, venc, ingreso))
+
+    creada = export_day - timedelta(days=1)
+    resumen = [(branch, f"Inventario Suc {branch} {export_day.isoformat()}", "sintético",
+                creada.strftime("%d/%m/%Y 09:00"), export_day.strftime("%d/%m/%Y 18:00"),
+                len(rows), "vencimientos")]
+    _write(path, {"resumen": (RESUMEN_COLS, resumen), "vencimientos": (VENC_COLS, rows)})
+    return len(rows)
+
+
+def write_sales(path: Path, items: List[Tuple[str, str, str]], branches: Sequence[int],
+                months: Sequence[Tuple[int, int]], items_per_day: int, seed: int = 7) -> int:
+    """Ventas diarias de `items_per_day` artículos por sucursal; devuelve las filas escritas."""
+    rnd = random.Random(seed)
+    codigos = [c for c, _, _ in items]
+    per_day = min(items_per_day, len(codigos))
+
+    def rows():
+        for (y, m) in months:
+            for d in range(1, monthrange(y, m)[1] + 1):
+                fecha = date(y, m, d).strftime("%d/%m/%Y")
+                for b in branches:
+                    for codigo in rnd.sample(codigos, per_day):
+                        r = rnd.random()
+                        if r < 0.05:
+                            cant = _ar_decimal(rnd.uniform(1000, 3000))  # "1.234,56"
+                        elif r < 0.25:
+                            cant = _ar_decimal(rnd.randint(1, 40) / 4, 3)  # "2,250"
+                        else:
+                            cant = str(rnd.randint(1, 12))
+                        yield (str(b), fecha, codigo, cant)
+
+    _write(path, {"ventas": (SALES_COLS, rows())})
+    return sum(monthrange(y, m)[1] for y, m in months) * len(branches) * per_day
+
+
+def last_months(n: int, today: Optional[date] = None) -> List[Tuple[int, int]]:
+    """Los n meses que terminan en el mes actual, en orden."""
+    today = today or date.today()
+    y, m = today.year, today.month
+    out = []
+    for _ in range(n):
+        out.append((y, m))
+        y, m = (y - 1, 12) if m == 1 else (y, m - 1)
+    return out[::-1]
+
+
+def build_dataset(out_dir, branches: int = 3, items: int = 2000, lots: int = 3, months: int = 3,
+                  items_per_day: int = 200, seed: int = 7) -> Dict[str, object]:
+    """
+    Escribe los Excel del dataset en out_dir y devuelve su descripción:
+    {"branches": [ids], "inventories": [{"branch", "path", "rows"}], "sales": {"path", "rows", "months"}, ...}
+    Cada sucursal tiene su inventario con un subconjunto (~80%) del catálogo.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    cat = catalog(items, seed)
+    rnd = random.Random(seed)
+    branch_ids = list(range(1, branches + 1))
+    export_day = date.today()
+
+    inventories = []
+    for b in branch_ids:
+        subset = [it for it in cat if rnd.random() < 0.8] or cat
+        path = out_dir / f"inventario_suc{b}.xlsx"
+        n = write_inventory(path, subset, b, lots, export_day, seed)
+        inventories.append({"branch": b, "path": str(path), "rows": n})
+
+    meses = last_months(months, export_day)
+    sales_path = out_dir / "ventas.xlsx"
+    sales_rows = write_sales(sales_path, cat, branch_ids, meses, items_per_day, seed)
+    return {
+        "branches": branch_ids,
+        "items": items,
+        "lots": lots,
+        "inventories": inventories,
+        "sales": {"path": str(sales_path), "rows": sales_rows, "months": meses},
+    }
+
+
+def load_dataset(dataset: Dict[str, object]) -> Dict[str, object]:
+    """Importa el dataset en la base actual (DB_PATH/.env) con los servicios de la app."""
+    from app.dao import location_dao
+    from app.dao.connection import init_db
+    from app.services.import_service import importar_excel_bulk
+    from app.services.sales_service import import_sales_from_excel
+
+    init_db()
+    location_dao.ensure_ids(dataset["branches"])
+    inventories = [
+        importar_excel_bulk(inv["path"], sucursal_id=inv["branch"], responsable_nombre="Sistema")
+        for inv in dataset["inventories"]
+    ]
+    sales = import_sales_from_excel(dataset["sales"]["path"], import_name="ventas sintéticas",
+                                    allow_multi_month=True)
+    return {"inventories": inventories, "sales": sales}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Genera Excel sintéticos (inventarios + ventas) estilo ERP")
+    ap.add_argument("out_dir", help="Carpeta de salida")
+    ap.add_argument("--branches", type=int, default=3)
+    ap.add_argument("--items", type=int, default=2000)
+    ap.add_argument("--lots", type=int, default=3, help="Lotes por artículo en cada inventario")
+    ap.add_argument("--months", type=int, default=3, help="Meses de ventas (hasta el actual)")
+    ap.add_argument("--items-per-day", type=int, default=200,
+                    help="Artículos vendidos por día y sucursal")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--load", action="store_true", help="Importar el dataset a la base")
+    args = ap.parse_args()
+
+    ds = build_dataset(args.out_dir, args.branches, args.items, args.lots, args.months,
+                       args.items_per_day, args.seed)
+    out = {"dataset": ds}
+    if args.load:
+        out["load"] = load_dataset(ds)
+    print(json.dumps(out, ensure_ascii=False, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()